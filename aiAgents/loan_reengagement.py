@@ -1,13 +1,8 @@
 import os
-from openai import OpenAI
 from typing import List, Dict, Any, Optional
-from config.config import (
-    OPENAI_API_KEY,
-    OPENAI_MODEL,
-    OPENAI_TEMPERATURE
-)
-from util.utils import load_customer_data, format_currency, format_percentage, logger
-from agents import Agent,Runner
+from config import config
+from config.settings import get_settings
+from util.utils import init, load_customer_data, format_currency, format_percentage, logger
 
 
 def _load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
@@ -51,8 +46,10 @@ class LoanReengagementAgent:
         Args:
             customer_id: Optional customer ID to load specific customer data
         """
+        from openai import OpenAI
+
         super().__init__()
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.client = OpenAI(api_key=config.OPENAI_API_KEY)
         self.customer_data = _load_customer_data(customer_id)
         self.system_prompt = _get_system_prompt()
 
@@ -96,17 +93,23 @@ Application Link: {self.customer_data.get('application_link', '')}
             # Prepare messages list with system message
             chat_messages = [{"role": "system", "content": system_message}]
 
+            settings = get_settings()
+
             # Add conversation history if available
             if messages:
-                chat_messages.extend(messages)
+                window = settings.AGENT_HISTORY_MESSAGES
+                chat_messages.extend(messages[-window:] if window else messages)
 
             # Add current message
             chat_messages.append({"role": "user", "content": message})
 
+            # The client's own default timeout applies unless one is configured
+            options = {'timeout': settings.AGENT_RUN_TIMEOUT_SECONDS} if settings.AGENT_RUN_TIMEOUT_SECONDS else {}
             response = self.client.chat.completions.create(
-                model=OPENAI_MODEL,
+                model=settings.OPENAI_MODEL,
                 messages=chat_messages,
-                temperature=OPENAI_TEMPERATURE
+                temperature=settings.OPENAI_TEMPERATURE,
+                **options
             )
 
             return response.choices[0].message.content
@@ -119,6 +122,7 @@ Application Link: {self.customer_data.get('application_link', '')}
 
 def main():
     """Main function for command-line usage."""
+    init()
     try:
         # Initialize the agent - Fixed typo in class name
         agent = LoanReengagementAgent()
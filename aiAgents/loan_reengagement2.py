@@ -5,15 +5,22 @@ This module contains the main agent creation and runner logic,
 with tools imported from the separate tools module.
 """
 import asyncio
-from typing import Dict, Any, Optional, Tuple
-from agents import Agent, Runner
-import streamlit as st
-from config.config import OPENAI_MODEL
-from util.utils import load_customer_data, format_currency, format_percentage, logger
-from tools.loan_tools import LOAN_TOOLS
+import logging
+from typing import TYPE_CHECKING, Dict, Any, Optional, Tuple
+from config.settings import get_settings
+from util import event_loop
+from util.customer_record import CustomerRecord
+from util.log_events import EventLogger
+from util.utils import load_customer_data, load_customer_data_async, format_currency, format_percentage, logger
+from tools.customer_context import current_customer_data
 
+if TYPE_CHECKING:
+    from agents import Agent
 
-def _load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
+events = EventLogger(logging.getLogger(__name__))
+
+
+def _load_customer_data(customer_id: Optional[str] = None) -> CustomerRecord:
     """Load customer data with error handling."""
     try:
         return load_customer_data(customer_id)
@@ -22,20 +29,23 @@ def _load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
         raise
 
 
-def create_loan_reengagement_agent(customer_data: Dict[str, Any]) -> Agent:
+def create_loan_reengagement_agent(customer_data: CustomerRecord) -> 'Agent':
+    # The agents SDK and tool definitions are only needed once an agent is built
+    from agents import Agent
+    from tools.loan_tools import LOAN_TOOLS
 
     # Format customer context
     customer_context = f"""
-Name: {customer_data.get('name', '')}
-Loan Offer: {format_currency(customer_data.get('loan_offer', 0))}
-Interest Rate: {format_percentage(customer_data.get('interest_rate', 0))}
-minimumTenure: {customer_data.get('minimumtenure', '')} months
-maximumTenure: {customer_data.get('maximumtenure', '')} months
-Monthly EMI: {format_currency(customer_data.get('emi_amount', 0))}
-Processing Fee: {format_currency(customer_data.get('processing_fee', 0))}
-Foreclosure Charges: {format_currency(customer_data.get('foreclosure_charges', 0))}
-APR: {customer_data.get('apr', '')}
-Application Link: {customer_data.get('application_link', '')}
+Name: {customer_data.name}
+Loan Offer: {format_currency(customer_data.loan_offer)}
+Interest Rate: {format_percentage(customer_data.interest_rate)}
+minimumTenure: {customer_data.minimumtenure} months
+maximumTenure: {customer_data.maximumtenure} months
+Monthly EMI: {format_currency(customer_data.emi_amount)}
+Processing Fee: {format_currency(customer_data.processing_fee)}
+Foreclosure Charges: {format_currency(customer_data.foreclosure_charges)}
+APR: {customer_data.apr}
+Application Link: {customer_data.application_link}
 """
 
     instructions = f"""You are a Professional and empathetic assistant from a bank, helping existing customers understand and explore their personal loan offers.
@@ -68,14 +78,16 @@ Gently nudge eligible customers to consider taking a loan. If they show interest
 - calculate_loan_savings: Calculate savings with prepayment or different tenure
 """
 
-    logger.info(f"Available customer context: {customer_context}")
+    model = get_settings().OPENAI_MODEL
+    events.debug('agent_context', customer_id=customer_data.customer_id, context=customer_context)
     # Create the agent using the correct SDK pattern with imported tools
     agent = Agent(
         name="Loan Re-engagement Agent",
         instructions=instructions,
-        model=OPENAI_MODEL,
+        model=model,
         tools=LOAN_TOOLS
     )
+    events.info('agent_created', customer_id=customer_data.customer_id, model=model)
 
     return agent
 
@@ -119,58 +131,69 @@ def run_with_event_loop(coro):
     """
     Safely run async coroutine in Streamlit environment.
 
+    The coroutine runs on the shared background loop (see util.event_loop),
+    so the model client's connections are reused across messages.
+
     Args:
         coro: Coroutine to run
 
     Returns:
         Result of the coroutine
     """
-    try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # If there's a running loop, we need to run in a thread
-            import concurrent.futures
-            import threading
-
-            def run_in_thread():
-                # Create a new event loop for this thread
-                new_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(new_loop)
-                try:
-                    return new_loop.run_until_complete(coro)
-                finally:
-                    new_loop.close()
-
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(run_in_thread)
-                return future.result()
-        else:
-            return loop.run_until_complete(coro)
-    except RuntimeError:
-        return asyncio.run(coro)
+    return event_loop.run(coro)
+
+
+_run_slots: Optional[asyncio.Semaphore] = None
+_run_slots_limit = 0
+
+
+def _agent_run_slots() -> asyncio.Semaphore:
+    """Semaphore capping concurrent agent runs at AGENT_MAX_CONCURRENT_RUNS (only used on the event loop)."""
+    global _run_slots, _run_slots_limit
+    limit = get_settings().AGENT_MAX_CONCURRENT_RUNS
+    if _run_slots is None or limit != _run_slots_limit:
+        # A changed limit applies to runs started from now on
+        _run_slots, _run_slots_limit = asyncio.Semaphore(limit), limit
+    return _run_slots
 
 
 class StreamlitLoanReengagementRunner:
     """Custom runner for the loan re-engagement agent with Streamlit integration."""
 
-    def __init__(self, customer_id: Optional[str] = None):
-        """Initialize with loan re-engagement agent."""
-        self.customer_data = _load_customer_data(customer_id)
+    def __init__(self, customer_id: Optional[str] = None, customer_data: Optional[CustomerRecord] = None):
+        """Initialize with loan re-engagement agent, reusing the session's customer record if given."""
+        self.customer_id = customer_id
+        self.customer_data = customer_data if customer_data is not None else _load_customer_data(customer_id)
         self.agent = create_loan_reengagement_agent(self.customer_data)
-        logger.info("Agentic Loan Re-engagement Bot initialized for Streamlit")
+        events.info('runner_initialized', customer_id=customer_id)
+
+    @classmethod
+    async def create_async(cls, customer_id: Optional[str] = None,
+                           customer_data: Optional[CustomerRecord] = None) -> 'StreamlitLoanReengagementRunner':
+        """Build a runner from a coroutine; the data load and agent construction run on the data executor."""
+        if customer_data is None:
+            customer_data = await load_customer_data_async(customer_id)
+        # Building the agent (and the first import of the agents SDK) would otherwise stall the loop
+        return await event_loop.run_blocking(cls, customer_id=customer_id, customer_data=customer_data)
 
     async def _process_async(self, user_message: str, session_history: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
         """Internal async processing method."""
+        from agents import Runner
+
         try:
-            # Store customer data in session state for tools to access
-            if hasattr(st, 'session_state'):
-                st.session_state.customer_data = self.customer_data
+            # Tools read the customer from this context; it runs off Streamlit's script thread
+            current_customer_data.set(self.customer_data)
 
-            # Build conversation input from session history
+            settings = get_settings()
+
+            # Build conversation input from the most recent messages of the session history
             conversation_input = []
+            history = session_history.get('messages', [])
+            if settings.AGENT_HISTORY_MESSAGES:
+                history = history[-settings.AGENT_HISTORY_MESSAGES:]
 
             # Add previous messages to conversation context
-            for msg in session_history.get('messages', []):
+            for msg in history:
                 if msg.get('role') == 'user':
                     conversation_input.append({"role": "user", "content": msg['content']})
                 elif msg.get('role') == 'assistant':
@@ -178,10 +201,15 @@ class StreamlitLoanReengagementRunner:
 
             if conversation_input:
                 conversation_input.append({"role": "user", "content": user_message})
-                result = await Runner.run(self.agent, conversation_input)
             else:
                 # First message, use string input
-                result = await Runner.run(self.agent, user_message)
+                conversation_input = user_message
+
+            async with _agent_run_slots():
+                run = Runner.run(self.agent, conversation_input)
+                if settings.AGENT_RUN_TIMEOUT_SECONDS:
+                    run = asyncio.wait_for(run, settings.AGENT_RUN_TIMEOUT_SECONDS)
+                result = await run
 
             # Extract the response text
             response_text = str(result.final_output)
@@ -218,6 +246,8 @@ class StreamlitLoanReengagementRunner:
         Returns:
             Tuple of (response_message, updated_session_history)
         """
+        import streamlit as st
+
         try:
             # Initialize session history if None
             if session_history is None:
@@ -231,6 +261,10 @@ class StreamlitLoanReengagementRunner:
                     'conversation_topics': []
                 }
 
+            # Store customer data in session state for tools to access
+            if hasattr(st, 'session_state'):
+                st.session_state.customer_data = self.customer_data
+
             # Run the async processing with proper event loop handling
             response_text, updated_history = run_with_event_loop(
                 self._process_async(user_message, session_history)
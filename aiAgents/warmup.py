@@ -0,0 +1,117 @@
+"""
+Login-time warm-up of a customer's agent session.
+
+Right after login, the customer's data is loaded, the agent instructions
+built and the Agent constructed on the shared event loop (util.event_loop),
+with the data load offloaded to its data executor, while the model client
+opens its connection on the same loop.
+By the time the first message is sent, the runner is usually ready and the
+connection already established.
+
+Time to first answer is recorded in util.metrics under
+'agent.time_to_first_answer_seconds.warm' (warm-up finished before the
+first message) and '.cold' (the first message had to wait for, or do, the
+set-up itself). Set AGENT_WARMUP=false to measure the cold baseline.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from config.settings import get_settings
+from util import event_loop, metrics
+from util.customer_record import CustomerRecord
+from util.log_events import EventLogger
+from util.utils import logger
+from aiAgents.loan_reengagement2 import StreamlitLoanReengagementRunner
+
+events = EventLogger(logging.getLogger(__name__))
+
+# Keep the pre-opened connection alive between login and the first message
+_KEEPALIVE_SECONDS = 120.0
+
+_model_client = None
+_connection_future: Optional[Future] = None
+_connection_lock = threading.Lock()
+
+
+async def _open_model_connection() -> None:
+    """Install a shared model client on the background loop and open its connection."""
+    global _model_client
+    import httpx
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    from agents import set_default_openai_client
+
+    if _model_client is None:
+        limits = httpx.Limits(max_connections=1000, max_keepalive_connections=100,
+                              keepalive_expiry=_KEEPALIVE_SECONDS)
+        _model_client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(limits=limits))
+        set_default_openai_client(_model_client)
+    started = time.perf_counter()
+    # Cheap authenticated request: leaves a TLS connection in the client's pool
+    await _model_client.models.retrieve(get_settings().OPENAI_MODEL)
+    metrics.observe('agent.warmup.connection_seconds', time.perf_counter() - started)
+
+
+def _log_connection_result(future: Future) -> None:
+    error = future.exception()
+    if error is not None:
+        logger.warning(f"Could not pre-open model connection: {str(error)}")
+
+
+def warm_model_connection() -> Future:
+    """Open (or refresh) the shared model connection; concurrent logins share one attempt."""
+    global _connection_future
+    with _connection_lock:
+        if _connection_future is None or _connection_future.done():
+            _connection_future = event_loop.submit(_open_model_connection())
+            _connection_future.add_done_callback(_log_connection_result)
+        return _connection_future
+
+
+async def _build_runner(customer_id: Optional[str],
+                        customer_data: Optional[CustomerRecord]) -> StreamlitLoanReengagementRunner:
+    with metrics.timed('agent.warmup.runner_seconds'):
+        return await StreamlitLoanReengagementRunner.create_async(customer_id, customer_data)
+
+
+class SessionWarmup:
+    """Background set-up of one session's agent runner."""
+
+    def __init__(self, customer_id: Optional[str], customer_data: Optional[CustomerRecord] = None):
+        self.customer_id = customer_id
+        self.connection = warm_model_connection()
+        self.runner = event_loop.submit(_build_runner(customer_id, customer_data))
+
+    def ready(self) -> bool:
+        """True once the runner is built and the connection attempt has finished."""
+        return self.runner.done() and self.connection.done()
+
+    def result(self, timeout: Optional[float] = None) -> StreamlitLoanReengagementRunner:
+        """Wait for the runner; raises whatever building it raised."""
+        return self.runner.result(timeout)
+
+
+def start_warmup(customer_id: Optional[str],
+                 customer_data: Optional[CustomerRecord] = None) -> Optional[SessionWarmup]:
+    """
+    Start warming up a customer's session in the background.
+
+    Args:
+        customer_id: Customer the session is for
+        customer_data: The session's customer record, shared with the runner if given
+
+    Returns:
+        SessionWarmup, or None if warm-up is disabled
+    """
+    if not get_settings().AGENT_WARMUP:
+        return None
+    events.info('agent_warmup_started', customer_id=customer_id)
+    return SessionWarmup(customer_id, customer_data)
+
+
+def record_first_answer(seconds: float, warm: bool) -> None:
+    """Record the time to the first answer of a session."""
+    metrics.observe(f"agent.time_to_first_answer_seconds.{'warm' if warm else 'cold'}", seconds)
+    events.info('first_answer', seconds=round(seconds, 3), warm=warm)
@@ -1,10 +1,18 @@
+import time
 import streamlit as st
 from aiAgents.loan_reengagement2 import StreamlitLoanReengagementRunner, get_conversation_summary
-from util.utils import logger
-from config.config import LOG_FILE_PATH
-from auth.auth import initialize_session, login_form, logout
+from aiAgents.warmup import start_warmup, record_first_answer
+from util.utils import init, logger
+from util import metrics
+from util.storage import get_storage_backend
+from util.log_viewer import render_log_viewer
+from config import config, settings
+from auth.auth import initialize_session, login_form, logout, persist_session
 from datetime import datetime
 
+# Directories and logging (idempotent across Streamlit reruns)
+init()
+
 # Initialize session state
 initialize_session()
 
@@ -287,15 +295,20 @@ if not st.session_state.authenticated:
         st.rerun()
     st.stop()
 
-# Initialize agentic runner with customer ID
-if 'agent_runner' not in st.session_state:
-    try:
-        st.session_state.agent_runner = StreamlitLoanReengagementRunner(customer_id=st.session_state.customer_id)
-        logger.info(f"Agentic agent runner initialized successfully for customer {st.session_state.customer_id}")
-    except Exception as e:
-        logger.error(f"Failed to initialize agentic agent runner: {str(e)}")
-        st.error("Failed to initialize the chat assistant. Please try again later.")
-        st.stop()
+# Initialize agentic runner with customer ID; on the first run after login this
+# starts warming it up in the background instead of blocking the page
+if 'agent_runner' not in st.session_state and st.session_state.get('agent_warmup') is None:
+    st.session_state.agent_warmup = start_warmup(st.session_state.customer_id, st.session_state.customer_data)
+    if st.session_state.agent_warmup is None:
+        try:
+            st.session_state.agent_runner = StreamlitLoanReengagementRunner(
+                customer_id=st.session_state.customer_id, customer_data=st.session_state.customer_data)
+            st.session_state.agent_warm = False
+            logger.info(f"Agentic agent runner initialized successfully for customer {st.session_state.customer_id}")
+        except Exception as e:
+            logger.error(f"Failed to initialize agentic agent runner: {str(e)}")
+            st.error("Failed to initialize the chat assistant. Please try again later.")
+            st.stop()
 
 # Initialize session history in Streamlit session state
 if 'session_history' not in st.session_state:
@@ -372,6 +385,27 @@ with st.container():
     </div>
     """, unsafe_allow_html=True)
 
+# Effective performance settings (admin only)
+if hasattr(st.session_state, 'user_role') and st.session_state.user_role == 'admin':
+    with st.expander("⚙️ Performance Settings (Admin View)"):
+        st.dataframe(settings.describe_settings(), hide_index=True)
+        st.caption(f"Edit {settings.settings_file_path()} to change reloadable values without a restart")
+        if st.button("🔄 Reload Settings", key="admin_reload_settings"):
+            try:
+                settings.reload()
+                st.success("Settings reloaded")
+            except settings.SettingsError as e:
+                st.error(str(e))
+    if st.toggle("📊 Metrics (Admin View)", key="admin_metrics"):
+        metrics.render_metrics(get_storage_backend().bloom_stats())
+    # A toggle, not an expander: a collapsed expander still runs its body and would read the logs every rerun
+    if st.toggle("📋 Application Logs (Admin View)", key="admin_logs"):
+        try:
+            render_log_viewer(config.LOG_FILE_PATH, key="admin_log_viewer")
+        except Exception as e:
+            logger.error(f"Error reading logs: {str(e)}")
+            st.error("Could not load logs")
+
 # Sidebar with enhanced options
 # with st.sidebar:
 #     st.markdown('<div class="sidebar-header">👤 Account</div>', unsafe_allow_html=True)
@@ -432,13 +466,8 @@ with st.container():
 #             st.session_state.messages = []
 #             st.rerun()
 #
-#         if st.button("📋 View Application Logs", key="admin_logs"):
-#             try:
-#                 with open(LOG_FILE_PATH, 'r') as f:
-#                     logs = f.read()
-#                     st.text_area("Application Logs", logs, height=300)
-#             except Exception as e:
-#                 st.error("Could not load logs")
+#         if st.toggle("📋 View Application Logs", key="admin_logs"):
+#             render_log_viewer(config.LOG_FILE_PATH, key="admin_log_viewer")
 #
 #         # Show session history data for debugging
 #         if st.button("🔍 Debug Session Data", key="debug_session"):
@@ -469,6 +498,23 @@ if st.session_state.session_history['messages']:
 
 # Chat input with agentic processing
 if prompt := st.chat_input("Ask me about your loan offer..."):
+    started = time.perf_counter()
+    first_answer = not st.session_state.session_history['messages']
+
+    # Pick up the runner warmed up since login
+    if 'agent_runner' not in st.session_state:
+        warmup = st.session_state.agent_warmup
+        st.session_state.agent_warm = warmup.ready()
+        try:
+            st.session_state.agent_runner = warmup.result()
+            logger.info(f"Agentic agent runner initialized successfully for customer {st.session_state.customer_id}")
+        except Exception as e:
+            logger.error(f"Failed to initialize agentic agent runner: {str(e)}")
+            st.error("Failed to initialize the chat assistant. Please try again later.")
+            # Warm up again on the next run
+            st.session_state.agent_warmup = None
+            st.stop()
+
     try:
         # Display user message immediately
         with st.chat_message("user"):
@@ -494,6 +540,8 @@ if prompt := st.chat_input("Ask me about your loan offer..."):
 
                 # Display the response
                 st.write(response)
+                if first_answer:
+                    record_first_answer(time.perf_counter() - started, st.session_state.agent_warm)
 
                 # Show which tools were used (for admin users)
                 if hasattr(st.session_state, 'user_role') and st.session_state.user_role == 'admin':
@@ -523,3 +571,6 @@ if prompt := st.chat_input("Ask me about your loan offer..."):
                     'error': True
                 }
             ])
+
+# Keep the session restorable after a reconnect
+persist_session()
@@ -1,8 +1,14 @@
 import streamlit as st
 from aiAgents.loan_reengagement import LoanReengagementAgent
-from util.utils import logger
-from config.config import LOG_FILE_PATH
-from auth.auth import initialize_session, login_form, logout
+from util.utils import init, logger
+from util import metrics
+from util.storage import get_storage_backend
+from util.log_viewer import render_log_viewer
+from config import config, settings
+from auth.auth import initialize_session, login_form, logout, persist_session
+
+# Directories and logging (idempotent across Streamlit reruns)
+init()
 
 # Initialize session state
 initialize_session()
@@ -309,14 +315,28 @@ with st.sidebar:
             st.session_state.messages = []
             st.rerun()
 
-        if st.button("📋 View Logs", key="admin_logs"):
+        # A toggle rather than a button, so paging reruns keep the viewer open
+        if st.toggle("📋 View Logs", key="admin_logs"):
             try:
-                with open(LOG_FILE_PATH, 'r') as f:
-                    logs = f.read()
-                    st.text_area("Application Logs", logs, height=300)
+                render_log_viewer(config.LOG_FILE_PATH, key="admin_log_viewer")
             except Exception as e:
+                logger.error(f"Error reading logs: {str(e)}")
                 st.error("Could not load logs")
 
+        if st.toggle("📊 Metrics", key="admin_metrics"):
+            metrics.render_metrics(get_storage_backend().bloom_stats())
+
+        if st.button("⚙️ Performance Settings", key="admin_settings"):
+            st.dataframe(settings.describe_settings(), hide_index=True)
+            st.caption(f"Edit {settings.settings_file_path()} to change reloadable values without a restart")
+
+        if st.button("🔄 Reload Settings", key="admin_reload_settings"):
+            try:
+                settings.reload()
+                st.success("Settings reloaded")
+            except settings.SettingsError as e:
+                st.error(str(e))
+
 # Chat interface
 # st.markdown('<div class="main-container">', unsafe_allow_html=True)
 
@@ -365,4 +385,7 @@ st.markdown("""
 <div class="app-footer">
     🔒 Need help? Contact our support team for assistance with your loan application.
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Keep the session restorable after a reconnect
+persist_session()
@@ -1,23 +1,48 @@
+import copy
+import logging
+import math
+import time
 import streamlit as st
-import pandas as pd
-from typing import Dict, Optional
+from typing import TYPE_CHECKING, Dict, Optional
+from auth.sessions import get_session_cache, issue_token, new_session_id, verify_token
+from auth.throttle import check_login
+from config.settings import get_settings
+from util import metrics
+from util.log_events import EventLogger
 from util.utils import logger
-from config.config import CUSTOMER_DATA_PATH, USER_CREDENTIALS_PATH
+from util.storage import get_storage_backend
+from util.customer_record import CustomerRecord
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def load_user_credentials() -> pd.DataFrame:
-    """Load user credentials from CSV file."""
+# Sign-in, sign-out and restore events form the audit trail, so they are never sampled
+events = EventLogger(logging.getLogger(__name__), sample=False)
+
+# Query parameter holding the signed session token
+SESSION_TOKEN_PARAM = 'session'
+# Per-customer session state: restored on reconnect and cleared on logout (identity,
+# customer record, agent and conversation)
+SESSION_STATE_KEYS = ('authenticated', 'customer_id', 'username', 'customer_data', 'user_role', 'name',
+                      'agent', 'agent_runner', 'agent_warmup', 'agent_warm', 'session_history', 'messages',
+                      'session_client')
+# Restored as copies: a page run still open on the old connection keeps appending to its own
+SESSION_COPIED_KEYS = ('session_history', 'messages')
+
+
+def load_user_credentials() -> 'pd.DataFrame':
+    """Load user credentials from the configured storage backend."""
     try:
-        return pd.read_csv(USER_CREDENTIALS_PATH)
+        return get_storage_backend().credentials_frame()
     except Exception as e:
         logger.error(f"Error loading user credentials: {str(e)}")
         raise
 
 
-def load_customer_data() -> pd.DataFrame:
-    """Load customer data from CSV file."""
+def load_customer_data() -> 'pd.DataFrame':
+    """Load customer data from the configured storage backend."""
     try:
-        return pd.read_csv(CUSTOMER_DATA_PATH)
+        return get_storage_backend().customer_frame()
     except Exception as e:
         logger.error(f"Error loading customer data: {str(e)}")
         raise
@@ -35,11 +60,9 @@ def authenticate_user(username: str, password: str) -> Optional[Dict]:
         Dictionary with user data if authentication successful, None otherwise
     """
     try:
-        df = load_user_credentials()
-        user = df[(df['username'] == username) & (df['password'] == password)]
+        user_data = get_storage_backend().authenticate(username, password)
 
-        if not user.empty:
-            user_data = user.iloc[0].to_dict()
+        if user_data:
             # Add role if not present (default to customer)
             if 'role' not in user_data:
                 user_data['role'] = 'customer'
@@ -50,7 +73,7 @@ def authenticate_user(username: str, password: str) -> Optional[Dict]:
         return None
 
 
-def get_customer_details(customer_id: str) -> Optional[Dict]:
+def get_customer_details(customer_id: str) -> Optional[CustomerRecord]:
     """
     Get customer details by customer_id.
 
@@ -58,20 +81,36 @@ def get_customer_details(customer_id: str) -> Optional[Dict]:
         customer_id: Customer ID
 
     Returns:
-        Dictionary with customer details if found, None otherwise
+        CustomerRecord if found, None otherwise
     """
     try:
-        df = load_customer_data()
-        customer = df[df['customer_id'] == customer_id]
-
-        if not customer.empty:
-            return customer.iloc[0].to_dict()
-        return None
+        customer = get_storage_backend().get_customer(customer_id)
+        return None if customer is None else CustomerRecord.from_mapping(customer)
     except Exception as e:
         logger.error(f"Error getting customer details: {str(e)}")
         return None
 
 
+def client_address() -> Optional[str]:
+    """
+    Best-effort address of the browser behind the current session.
+
+    Returns:
+        The client IP (or first X-Forwarded-For hop), None if Streamlit does not expose it
+    """
+    try:
+        context = getattr(st, 'context', None)
+        if context is None:
+            return None
+        address = getattr(context, 'ip_address', None)
+        if not address:
+            address = (context.headers.get('X-Forwarded-For') or '').split(',')[0].strip()
+        return address or None
+    except Exception as e:
+        logger.debug(f"Client address unavailable: {str(e)}")
+        return None
+
+
 def initialize_session():
     """Initialize session state variables."""
     if 'authenticated' not in st.session_state:
@@ -84,6 +123,85 @@ def initialize_session():
         st.session_state.customer_data = None
     if 'user_role' not in st.session_state:
         st.session_state.user_role = 'customer'
+    if not st.session_state.authenticated:
+        restore_session()
+
+
+def start_session() -> None:
+    """Issue a signed session token after login and cache the session's state."""
+    ttl = get_settings().SESSION_TTL_SECONDS
+    if ttl <= 0:
+        return
+    session_id = new_session_id()
+    st.session_state.session_id = session_id
+    # The token is only honoured from the address it was issued to
+    st.session_state.session_client = client_address()
+    st.session_state.session_token_expires = time.time() + ttl
+    st.query_params[SESSION_TOKEN_PARAM] = issue_token(session_id, ttl)
+    persist_session()
+
+
+def persist_session() -> None:
+    """
+    Save the session's current state for reconnects.
+
+    Call at the end of each page run. The cached entry's time to live is
+    refreshed, and the token is renewed once past half its lifetime.
+    """
+    session_id = st.session_state.get('session_id')
+    ttl = get_settings().SESSION_TTL_SECONDS
+    if not session_id or not st.session_state.get('authenticated') or ttl <= 0:
+        return
+    if st.session_state.get('session_token_expires', 0) - time.time() < ttl / 2:
+        st.session_state.session_token_expires = time.time() + ttl
+        st.query_params[SESSION_TOKEN_PARAM] = issue_token(session_id, ttl)
+    state = {key: st.session_state[key] for key in SESSION_STATE_KEYS if key in st.session_state}
+    get_session_cache().put(session_id, state, ttl)
+
+
+def restore_session() -> bool:
+    """
+    Restore a signed-in session from the token in the URL after a reconnect.
+
+    The token must come from the client address it was issued to, so a
+    leaked URL cannot be replayed from elsewhere. The conversation is
+    restored as a copy.
+
+    Returns:
+        True if the session was restored from the cache
+    """
+    token = st.query_params.get(SESSION_TOKEN_PARAM)
+    if not token:
+        return False
+    verified = verify_token(token)
+    state = None if verified is None else get_session_cache().get(verified[0])
+    if state is None:
+        metrics.increment('auth.session_invalid_token' if verified is None else 'auth.session_cache_misses')
+        del st.query_params[SESSION_TOKEN_PARAM]
+        return False
+    if state.get('session_client') != client_address():
+        metrics.increment('auth.session_client_mismatch')
+        events.warning('session_client_mismatch', username=state.get('username'))
+        del st.query_params[SESSION_TOKEN_PARAM]
+        return False
+
+    for key, value in state.items():
+        st.session_state[key] = copy.deepcopy(value) if key in SESSION_COPIED_KEYS else value
+    st.session_state.session_id, st.session_state.session_token_expires = verified
+    metrics.increment('auth.sessions_restored')
+    events.info('session_restored', username=state.get('username'), customer_id=state.get('customer_id'))
+    return True
+
+
+def end_session() -> None:
+    """Drop the session from the cache and its token from the URL."""
+    session_id = st.session_state.pop('session_id', None)
+    st.session_state.pop('session_token_expires', None)
+    st.session_state.pop('session_client', None)
+    if session_id:
+        get_session_cache().pop(session_id)
+    if SESSION_TOKEN_PARAM in st.query_params:
+        del st.query_params[SESSION_TOKEN_PARAM]
 
 
 def login_form() -> bool:
@@ -324,10 +442,17 @@ def login_form() -> bool:
                 st.error("Please fill in all fields")
                 return False
 
+            # Shed bursts before any credential lookup
+            retry_after = check_login(username, client_address())
+            if retry_after:
+                st.error(f"Too many sign-in attempts. Please try again in {math.ceil(retry_after)} seconds.")
+                events.warning('login_throttled', username=username, retry_after=round(retry_after, 1))
+                return False
+
             user_data = authenticate_user(username, password)
             if not user_data:
                 st.error("Invalid credentials")
-                logger.warning(f"Failed login attempt for username: {username}")
+                events.warning('login_failed', username=username)
                 return False
             else:
                 # Extract customer_id from user_data
@@ -343,16 +468,15 @@ def login_form() -> bool:
                 st.session_state.customer_data = customer_data
                 st.session_state.user_role = user_data.get('role', 'customer')
                 st.session_state.name= name
+                start_session()
 
-                logger.info(f"User {name} (Customer: {customer_id}) logged in successfully")
+                events.info('login_succeeded', username=username, customer_id=customer_id)
 
-                # Show welcome message
+                # A toast outlives the rerun, so the welcome shows on the chat page without a delay
                 welcome_name = customer_data.get('name', username) if customer_data else username
-                st.success(f"Welcome back, {welcome_name}!")
+                st.toast(f"Welcome back, {welcome_name}!")
 
-                # Small delay to show success message
-                import time
-                time.sleep(1)
+                # Go straight to the chat page, which starts warming up the agent session
                 st.rerun()
                 return True
 
@@ -369,19 +493,14 @@ def login_form() -> bool:
 def logout():
     """Handle user logout."""
     username = st.session_state.get('username', 'Unknown')
+    end_session()
 
-    # Clear all session state
-    st.session_state.authenticated = False
-    st.session_state.customer_id = None
-    st.session_state.username = None
-    st.session_state.customer_data = None
-    st.session_state.user_role = 'customer'
-
-    # Clear messages if they exist
-    if 'messages' in st.session_state:
-        st.session_state.messages = []
+    # Clear all per-customer state, then restore the signed-out defaults
+    for key in SESSION_STATE_KEYS:
+        st.session_state.pop(key, None)
+    initialize_session()
 
-    logger.info(f"User {username} logged out")
+    events.info('logout', username=username)
     st.rerun()
 
 
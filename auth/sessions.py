@@ -0,0 +1,135 @@
+"""
+Signed session tokens and a bounded cache of hydrated sessions.
+
+At login the session gets a random id and a token carrying it, signed with
+HMAC-SHA256 and stamped with an expiry. The token is kept in the page URL
+(st.query_params), which survives a browser reconnect while
+st.session_state does not. The session's hydrated state (customer record,
+agent runner, conversation) is kept in a TTL cache keyed by the id, so a
+reconnect restores it with one cache hit instead of logging in again.
+
+A token is only honoured while its id is in the cache: logout, expiry and
+eviction all end the session. The signing key is generated per process,
+matching the in-process cache; a restarted or different worker asks the
+user to sign in again.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from util import metrics
+
+_secret = secrets.token_bytes(32)
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _encode(hmac.new(_secret, payload.encode('ascii'), hashlib.sha256).digest())
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def issue_token(session_id: str, ttl: float) -> str:
+    """
+    Create a signed token for a session.
+
+    Args:
+        session_id: Session the token stands for
+        ttl: Seconds until the token expires
+
+    Returns:
+        Token of the form payload.signature (URL-safe)
+    """
+    payload = _encode(json.dumps({'sid': session_id, 'exp': int(time.time() + ttl)}).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify_token(token: str) -> Optional[Tuple[str, float]]:
+    """
+    Check a token's signature and expiry.
+
+    Args:
+        token: Token from issue_token
+
+    Returns:
+        (session id, expiry timestamp), or None if the token is forged, malformed or expired
+    """
+    try:
+        payload, signature = token.split('.', 1)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_decode(payload))
+        if claims['exp'] < time.time():
+            return None
+        return claims['sid'], float(claims['exp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class SessionCache:
+    """LRU cache of session state with a per-entry time to live."""
+
+    def __init__(self, max_size: int = 1000, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max(1, max_size)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # session id -> (expires at, state)
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+
+    def put(self, session_id: str, state: Dict[str, Any], ttl: float) -> None:
+        """Store (or refresh) a session's state for ttl seconds."""
+        with self._lock:
+            self._entries[session_id] = (self._clock() + ttl, state)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                metrics.increment('auth.session_evictions')
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """A session's state, or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] < self._clock():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+    def pop(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_session_cache() -> SessionCache:
+    """Process-wide cache of hydrated sessions (SESSION_CACHE_SIZE entries)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SessionCache(settings.get_settings().SESSION_CACHE_SIZE)
+    return _cache
@@ -0,0 +1,125 @@
+"""
+Login throttling with in-memory token buckets.
+
+Each sign-in attempt takes a token from three buckets: one per (username,
+client) pair, one per username across all clients (so rotating addresses
+does not lift the cap on an account) and one per client across all
+usernames. When any bucket is empty the attempt is shed before any
+credential lookup, so a burst of bad logins costs a dict update instead of
+storage reads and password hashing; tokens already taken from the other
+buckets are given back.
+
+Buckets live in a bounded LRU; the least recently used bucket is evicted
+when the limit is reached. An evicted bucket has usually refilled anyway, so
+this only bounds memory. Rates come from the LOGIN_* settings and apply to
+the next attempt after a reload.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, List, Optional
+
+from config import settings
+from util import metrics
+
+
+class TokenBucketLimiter:
+    """Token buckets keyed by arbitrary hashable keys, with LRU eviction of idle buckets."""
+
+    def __init__(self, max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max(1, max_keys)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> [tokens, last refill time]
+        self._buckets: 'OrderedDict[Hashable, List[float]]' = OrderedDict()
+
+    def acquire(self, key: Hashable, rate: float, burst: float) -> float:
+        """
+        Take one token from a key's bucket.
+
+        Args:
+            key: Bucket key
+            rate: Tokens added per second
+            burst: Bucket capacity (a new bucket starts full)
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [burst, now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / rate if rate > 0 else float('inf')
+
+    def refund(self, key: Hashable, burst: float) -> None:
+        """Give back a token taken for an attempt that was shed by another bucket."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(burst, bucket[0] + 1)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def _get_limiter() -> TokenBucketLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = TokenBucketLimiter(settings.get_settings().LOGIN_THROTTLE_MAX_KEYS)
+    return _limiter
+
+
+def check_login(username: str, client: Optional[str]) -> float:
+    """
+    Admit or shed one sign-in attempt.
+
+    Args:
+        username: Submitted username (case and surrounding spaces are ignored)
+        client: Client address, or None if unknown (then only the username buckets apply)
+
+    Returns:
+        0 if the attempt may proceed, otherwise seconds the client should wait
+    """
+    current = settings.get_settings()
+    limiter = _get_limiter()
+    username = username.strip().lower()
+    # (key, attempts per minute, burst) of every bucket the attempt draws from
+    buckets = [
+        (('user', username, client), current.LOGIN_ATTEMPTS_PER_MINUTE, current.LOGIN_BURST),
+        (('account', username), current.LOGIN_ACCOUNT_ATTEMPTS_PER_MINUTE, current.LOGIN_ACCOUNT_BURST),
+    ]
+    if client is not None:
+        buckets.append((('client', client), current.LOGIN_CLIENT_ATTEMPTS_PER_MINUTE, current.LOGIN_CLIENT_BURST))
+
+    wait = 0.0
+    taken = []
+    for key, per_minute, burst in buckets:
+        if per_minute <= 0:
+            continue
+        wait = limiter.acquire(key, per_minute / 60, burst)
+        if wait:
+            # Shed: the buckets that did admit the attempt get their token back
+            for taken_key, taken_burst in taken:
+                limiter.refund(taken_key, taken_burst)
+            break
+        taken.append((key, burst))
+
+    metrics.increment('auth.login_shed' if wait else 'auth.login_accepted')
+    return wait
@@ -1,19 +1,80 @@
+"""
+Startup values of the settings as module constants.
+
+Settings are defined, validated and hot-reloaded in config.settings. These
+constants are the values the process started with; code that should follow
+reloads reads get_settings() at the point of use instead. They are resolved
+on first access, so read them as config.config.NAME at the point of use
+rather than binding them at import time.
+"""
 import os
-from dotenv import load_dotenv
+from typing import Any, Callable, Dict
+
+from config import settings
+
+# Constant name -> value derived from the startup settings. Resolved on first
+# access (module __getattr__), so importing this module loads no .env or
+# settings file; util.utils.init() or the first use does.
+_CONSTANTS: Dict[str, Callable[[settings.Settings], Any]] = {
+    # API Configuration
+    'OPENAI_API_KEY': lambda s: s.OPENAI_API_KEY or None,
+    'OPENAI_MODEL': lambda s: s.OPENAI_MODEL,
+    'OPENAI_TEMPERATURE': lambda s: s.OPENAI_TEMPERATURE,
+
+    # Build the agent session and open the model connection in the background at login
+    'AGENT_WARMUP': lambda s: s.AGENT_WARMUP,
+
+    # File Paths
+    'CUSTOMER_DATA_PATH': lambda s: s.CUSTOMER_DATA_PATH,
+    'USER_CREDENTIALS_PATH': lambda s: s.USER_CREDENTIALS_PATH,
+    'LOG_FILE_PATH': lambda s: s.LOG_FILE_PATH,
+
+    # Live reload of customer data from a background watcher
+    'CUSTOMER_DATA_WATCH': lambda s: s.CUSTOMER_DATA_WATCH,
+    'CUSTOMER_DATA_POLL_SECONDS': lambda s: s.CUSTOMER_DATA_POLL_SECONDS,
+
+    # Seconds between compactions of the customer delta log (0 disables)
+    'DELTA_COMPACT_SECONDS': lambda s: s.DELTA_COMPACT_SECONDS,
+
+    # Shards kept open when CUSTOMER_DATA_PATH is a shard directory (see util.customer_shards)
+    'CUSTOMER_SHARD_CACHE_SIZE': lambda s: s.CUSTOMER_SHARD_CACHE_SIZE,
+
+    # Storage backend for customers and credentials: 'csv', 'sqlite' or 'daemon'
+    'STORAGE_BACKEND': lambda s: s.STORAGE_BACKEND,
+    'SQLITE_DB_PATH': lambda s: s.SQLITE_DB_PATH,
+    'SQLITE_POOL_SIZE': lambda s: s.SQLITE_POOL_SIZE,
+
+    # Lookup daemon (python -m util.lookup_daemon) used by the 'daemon' backend
+    'LOOKUP_SOCKET_PATH': lambda s: s.LOOKUP_SOCKET_PATH,
+    'LOOKUP_POOL_SIZE': lambda s: s.LOOKUP_POOL_SIZE,
+    'LOOKUP_TIMEOUT_SECONDS': lambda s: s.LOOKUP_TIMEOUT_SECONDS,
+
+    # Threads for blocking data access awaited from the agent event loop
+    'DATA_EXECUTOR_WORKERS': lambda s: s.DATA_EXECUTOR_WORKERS,
+
+    # CSV validation: bytes per streamed block and worker processes (0 = CPU count)
+    'VALIDATION_BLOCK_BYTES': lambda s: s.VALIDATION_BLOCK_BYTES,
+    'VALIDATION_WORKERS': lambda s: s.VALIDATION_WORKERS or None,
+
+    # Cold-import budget for the Streamlit entry points, checked by util.importtime
+    'IMPORT_TIME_BUDGET_MS': lambda s: s.IMPORT_TIME_BUDGET_MS,
+}
+
 
-# Load environment variables
-load_dotenv()
+def __getattr__(name: str) -> Any:
+    if name not in _CONSTANTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = _CONSTANTS[name](settings.startup_settings())
+    # Cached as a real attribute, so later lookups skip this function
+    globals()[name] = value
+    return value
 
-# API Configuration
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
-OPENAI_TEMPERATURE = float(os.getenv('OPENAI_TEMPERATURE', '0.7'))
 
-# File Paths
-CUSTOMER_DATA_PATH = os.getenv('CUSTOMER_DATA_PATH', 'data/customer_data.csv')
-USER_CREDENTIALS_PATH = os.getenv('USER_CREDENTIALS_PATH', 'data/user_credentials.csv')
-LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', 'logs/app.log')
+def ensure_directories() -> None:
+    """Create the data and log directories (done by util.utils.init, not at import)."""
+    startup = settings.startup_settings()
+    for path in (startup.CUSTOMER_DATA_PATH, startup.LOG_FILE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
-# Create necessary directories
-os.makedirs(os.path.dirname(CUSTOMER_DATA_PATH), exist_ok=True)
-os.makedirs(os.path.dirname(LOG_FILE_PATH), exist_ok=True)
\ No newline at end of file
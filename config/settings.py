@@ -0,0 +1,357 @@
+"""
+Typed, hot-reloadable settings.
+
+Every tunable lives in the Settings named tuple with its type and default.
+Values are layered, later sources winning:
+
+    defaults  <  environment (and .env)  <  settings file (SETTINGS_FILE)
+
+The settings file is a JSON object of setting names to values, e.g.
+``{"AGENT_MAX_CONCURRENT_RUNS": 32, "LOG_LEVEL": "DEBUG"}``. It is watched
+once start_watching() has been called (util.utils.init does), and edits are
+applied without a restart. A file that fails validation is rejected as a
+whole and the previous settings stay in force. Settings marked as needing a
+restart (paths, pool and executor sizes, the storage backend) keep their
+startup value until the process restarts.
+
+Read settings with get_settings().NAME at the point of use so reloads are
+picked up; config.config exposes the startup values as module constants.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_FILE_ENV = 'SETTINGS_FILE'
+DEFAULT_SETTINGS_FILE = 'config/settings.json'
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+STORAGE_BACKENDS = ('csv', 'sqlite', 'daemon')
+
+
+class SettingsError(ValueError):
+    """Settings failed validation."""
+
+
+class Settings(NamedTuple):
+    """Effective values of all settings."""
+    # Model
+    OPENAI_API_KEY: str = ''
+    OPENAI_MODEL: str = 'gpt-4o-mini'
+    OPENAI_TEMPERATURE: float = 0.7
+    # Agent runs
+    AGENT_WARMUP: bool = True
+    AGENT_MAX_CONCURRENT_RUNS: int = 16
+    AGENT_RUN_TIMEOUT_SECONDS: float = 0.0
+    AGENT_HISTORY_MESSAGES: int = 0
+    # Files and logging
+    CUSTOMER_DATA_PATH: str = 'data/customer_data.csv'
+    USER_CREDENTIALS_PATH: str = 'data/user_credentials.csv'
+    LOG_FILE_PATH: str = 'logs/app.log'
+    LOG_LEVEL: str = 'INFO'
+    LOG_MAX_BYTES: int = 50 * 1024 * 1024
+    LOG_BACKUP_COUNT: int = 5
+    LOG_ROTATE_SECONDS: float = 86400.0
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATES: str = ''
+    LOG_REDACT_FIELDS: str = 'password,token,session,api_key,email,phone,mobile,pan,aadhaar,account_number'
+    # Customer data loading and caching
+    CUSTOMER_DATA_WATCH: bool = True
+    CUSTOMER_DATA_POLL_SECONDS: float = 5.0
+    DELTA_COMPACT_SECONDS: float = 0.0
+    CUSTOMER_SHARD_CACHE_SIZE: int = 8
+    CUSTOMER_BLOOM_FPR: float = 0.01
+    # Storage backends and pools
+    STORAGE_BACKEND: str = 'csv'
+    SQLITE_DB_PATH: str = 'data/anaya.db'
+    SQLITE_POOL_SIZE: int = 4
+    LOOKUP_SOCKET_PATH: str = 'data/lookup.sock'
+    LOOKUP_POOL_SIZE: int = 4
+    LOOKUP_TIMEOUT_SECONDS: float = 5.0
+    DATA_EXECUTOR_WORKERS: int = 8
+    # Login throttling
+    LOGIN_ATTEMPTS_PER_MINUTE: float = 5.0
+    LOGIN_BURST: int = 5
+    LOGIN_ACCOUNT_ATTEMPTS_PER_MINUTE: float = 20.0
+    LOGIN_ACCOUNT_BURST: int = 10
+    LOGIN_CLIENT_ATTEMPTS_PER_MINUTE: float = 30.0
+    LOGIN_CLIENT_BURST: int = 20
+    LOGIN_THROTTLE_MAX_KEYS: int = 10000
+    # Sessions
+    SESSION_TTL_SECONDS: float = 8 * 3600.0
+    SESSION_CACHE_SIZE: int = 1000
+    # CSV validation and tooling
+    VALIDATION_BLOCK_BYTES: int = 16 * 1024 * 1024
+    VALIDATION_WORKERS: int = 0
+    IMPORT_TIME_BUDGET_MS: float = 300.0
+
+
+class SettingInfo(NamedTuple):
+    """Description and validation rules of one setting."""
+    description: str
+    minimum: Optional[float] = None
+    choices: Optional[Tuple[str, ...]] = None
+    reloadable: bool = True
+    secret: bool = False
+
+
+SETTING_INFO: Dict[str, SettingInfo] = {
+    'OPENAI_API_KEY': SettingInfo("OpenAI API key", reloadable=False, secret=True),
+    'OPENAI_MODEL': SettingInfo("Model used by new agent sessions"),
+    'OPENAI_TEMPERATURE': SettingInfo("Sampling temperature of the legacy agent", minimum=0),
+    'AGENT_WARMUP': SettingInfo("Build the agent session in the background at login"),
+    'AGENT_MAX_CONCURRENT_RUNS': SettingInfo("Agent runs in flight at once per process", minimum=1),
+    'AGENT_RUN_TIMEOUT_SECONDS': SettingInfo("Timeout of one agent run in seconds (0 = none)", minimum=0),
+    'AGENT_HISTORY_MESSAGES': SettingInfo("Previous messages sent with each prompt (0 = all)", minimum=0),
+    'CUSTOMER_DATA_PATH': SettingInfo("Customer CSV file or shard directory", reloadable=False),
+    'USER_CREDENTIALS_PATH': SettingInfo("User credentials CSV file", reloadable=False),
+    'LOG_FILE_PATH': SettingInfo("Application log file", reloadable=False),
+    'LOG_LEVEL': SettingInfo("Root log level", choices=LOG_LEVELS),
+    'LOG_MAX_BYTES': SettingInfo("Log file size that triggers a rollover (0 = no limit)", minimum=0,
+                                 reloadable=False),
+    'LOG_BACKUP_COUNT': SettingInfo("Rotated log files kept", minimum=1, reloadable=False),
+    'LOG_ROTATE_SECONDS': SettingInfo("Log file age that triggers a rollover (0 = no limit)", minimum=0,
+                                      reloadable=False),
+    'LOG_QUEUE_SIZE': SettingInfo("Log records buffered before new ones are dropped", minimum=1,
+                                  reloadable=False),
+    'LOG_SAMPLE_RATES': SettingInfo("Share of debug/info events kept per logger, e.g. 'util.utils=0.1'"),
+    'LOG_REDACT_FIELDS': SettingInfo("Event fields masked in structured logs (comma-separated)"),
+    'CUSTOMER_DATA_WATCH': SettingInfo("Reload customer data when its files change", reloadable=False),
+    'CUSTOMER_DATA_POLL_SECONDS': SettingInfo("File watcher poll interval", minimum=0.1, reloadable=False),
+    'DELTA_COMPACT_SECONDS': SettingInfo("Seconds between delta log compactions (0 = off)", minimum=0,
+                                         reloadable=False),
+    'CUSTOMER_SHARD_CACHE_SIZE': SettingInfo("Customer shards kept open", minimum=1, reloadable=False),
+    'CUSTOMER_BLOOM_FPR': SettingInfo("Target false-positive rate of the customer ID Bloom filter (0 = off), "
+                                      "applied on the next data reload", minimum=0),
+    'STORAGE_BACKEND': SettingInfo("Storage backend", choices=STORAGE_BACKENDS, reloadable=False),
+    'SQLITE_DB_PATH': SettingInfo("SQLite database path", reloadable=False),
+    'SQLITE_POOL_SIZE': SettingInfo("SQLite connections per process", minimum=1, reloadable=False),
+    'LOOKUP_SOCKET_PATH': SettingInfo("Lookup daemon socket", reloadable=False),
+    'LOOKUP_POOL_SIZE': SettingInfo("Lookup daemon connections per process", minimum=1, reloadable=False),
+    'LOOKUP_TIMEOUT_SECONDS': SettingInfo("Lookup daemon request timeout", minimum=0.1, reloadable=False),
+    'DATA_EXECUTOR_WORKERS': SettingInfo("Threads for blocking data access", minimum=1, reloadable=False),
+    'LOGIN_ATTEMPTS_PER_MINUTE': SettingInfo("Sign-in attempts per username and client (0 = unlimited)", minimum=0),
+    'LOGIN_BURST': SettingInfo("Sign-in attempts per username and client allowed at once", minimum=1),
+    'LOGIN_ACCOUNT_ATTEMPTS_PER_MINUTE': SettingInfo("Sign-in attempts per username from all clients (0 = unlimited)",
+                                                      minimum=0),
+    'LOGIN_ACCOUNT_BURST': SettingInfo("Sign-in attempts per username from all clients allowed at once", minimum=1),
+    'LOGIN_CLIENT_ATTEMPTS_PER_MINUTE': SettingInfo("Sign-in attempts per client across usernames (0 = unlimited)",
+                                                    minimum=0),
+    'LOGIN_CLIENT_BURST': SettingInfo("Sign-in attempts per client allowed at once", minimum=1),
+    'LOGIN_THROTTLE_MAX_KEYS': SettingInfo("Login throttle buckets kept in memory", minimum=1, reloadable=False),
+    'SESSION_TTL_SECONDS': SettingInfo("Idle time after which a reconnect needs a new sign-in (0 = always)",
+                                       minimum=0),
+    'SESSION_CACHE_SIZE': SettingInfo("Signed-in sessions kept for reconnects", minimum=1, reloadable=False),
+    'VALIDATION_BLOCK_BYTES': SettingInfo("Bytes per CSV validation block", minimum=1024),
+    'VALIDATION_WORKERS': SettingInfo("CSV validation processes (0 = CPU count)", minimum=0),
+    'IMPORT_TIME_BUDGET_MS': SettingInfo("Cold-import budget of the entry points", minimum=0),
+}
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+_FALSE_VALUES = ('0', 'false', 'no', 'off')
+
+
+def _coerce(name: str, value: Any) -> Any:
+    """Convert a raw environment or file value to the setting's type."""
+    kind = Settings.__annotations__[name]
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in _TRUE_VALUES:
+            return True
+        if text in _FALSE_VALUES:
+            return False
+        raise ValueError(f"expected a boolean, got {value!r}")
+    if kind is int:
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError(f"expected an integer, got {value!r}")
+        return int(value)
+    if kind is float:
+        if isinstance(value, bool):
+            raise ValueError(f"expected a number, got {value!r}")
+        return float(value)
+    return str(value)
+
+
+def _validate(name: str, value: Any) -> Any:
+    info = SETTING_INFO[name]
+    value = _coerce(name, value)
+    if name == 'STORAGE_BACKEND':
+        value = value.lower()
+    elif name == 'LOG_LEVEL':
+        value = value.upper()
+    if info.minimum is not None and value < info.minimum:
+        raise ValueError(f"must be at least {info.minimum}, got {value}")
+    if info.choices is not None and value not in info.choices:
+        raise ValueError(f"must be one of {list(info.choices)}, got {value!r}")
+    return value
+
+
+def settings_file_path() -> str:
+    return os.getenv(SETTINGS_FILE_ENV, DEFAULT_SETTINGS_FILE)
+
+
+def _read_file(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise SettingsError(f"{path} is not valid JSON: {str(e)}")
+    if not isinstance(data, dict):
+        raise SettingsError(f"{path} must contain a JSON object")
+    return data
+
+
+def load_settings(path: Optional[str] = None) -> Tuple[Settings, Dict[str, str]]:
+    """
+    Build and validate settings from defaults, the environment and the settings file.
+
+    Returns:
+        (settings, source of each value: 'default', 'env' or 'file')
+
+    Raises:
+        SettingsError: listing every invalid or unknown setting
+    """
+    path = path or settings_file_path()
+    file_values = _read_file(path)
+    errors = [f"{name}: unknown setting (in {path})" for name in file_values if name not in SETTING_INFO]
+
+    values: Dict[str, Any] = {}
+    sources: Dict[str, str] = {}
+    for name, default in Settings._field_defaults.items():
+        raw, source = default, 'default'
+        if os.getenv(name) is not None:
+            raw, source = os.environ[name], 'env'
+        if name in file_values:
+            raw, source = file_values[name], 'file'
+        try:
+            values[name] = _validate(name, raw)
+            sources[name] = source
+        except (TypeError, ValueError) as e:
+            errors.append(f"{name}: {str(e)} (from {source})")
+
+    if errors:
+        raise SettingsError("Invalid settings: " + "; ".join(errors))
+    return Settings(**values), sources
+
+
+_lock = threading.Lock()
+_settings: Optional[Settings] = None
+_sources: Dict[str, str] = {}
+_startup: Optional[Settings] = None
+_listeners: List[Callable[[Settings, Settings], None]] = []
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_settings() -> Settings:
+    """Current settings, loaded and validated on first use."""
+    global _settings, _sources, _startup
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                load_dotenv()
+                settings, _sources = load_settings()
+                _startup = settings
+                _settings = settings
+    return _settings
+
+
+def startup_settings() -> Settings:
+    """Settings the process started with (reload() does not change them)."""
+    get_settings()
+    return _startup
+
+
+def on_change(listener: Callable[[Settings, Settings], None]) -> None:
+    """Call listener(old, new) after every reload that changed something."""
+    _listeners.append(listener)
+
+
+def reload() -> Settings:
+    """
+    Re-read the settings file and apply the reloadable values.
+
+    Raises:
+        SettingsError: if the file is invalid; the current settings are kept
+    """
+    global _settings, _sources
+    old = get_settings()
+    loaded, sources = load_settings()
+
+    values = loaded._asdict()
+    pending = []
+    for name, info in SETTING_INFO.items():
+        if not info.reloadable and values[name] != getattr(_startup, name):
+            pending.append(name)
+            values[name] = getattr(_startup, name)
+            sources[name] = _sources[name]
+    if pending:
+        logger.warning(f"Settings {pending} changed but need a restart to take effect")
+
+    new = Settings(**values)
+    with _lock:
+        _settings, _sources = new, sources
+
+    changed = {name: getattr(new, name) for name in Settings._fields if getattr(new, name) != getattr(old, name)}
+    if changed:
+        logger.info(f"Settings reloaded: {_redact(changed)}")
+        for listener in list(_listeners):
+            try:
+                listener(old, new)
+            except Exception as e:
+                logger.error(f"Error applying settings change: {str(e)}")
+    return new
+
+
+def _redact(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: '***' if SETTING_INFO[name].secret and value else value for name, value in values.items()}
+
+
+def _reload_quietly(path: str) -> None:
+    try:
+        reload()
+    except SettingsError as e:
+        logger.error(f"Rejected settings file {path}, keeping current settings: {str(e)}")
+
+
+def start_watching() -> None:
+    """Reload settings whenever the settings file changes (idempotent)."""
+    global _watcher
+    from util.file_watcher import FileWatcher
+
+    interval = get_settings().CUSTOMER_DATA_POLL_SECONDS
+    with _watcher_lock:
+        if _watcher is not None:
+            return
+        path = settings_file_path()
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            logger.warning(f"Not watching settings file {path}: directory does not exist")
+            return
+        _watcher = FileWatcher([path], _reload_quietly, interval=interval, name='settings-watcher').start()
+
+
+def describe_settings() -> List[Dict[str, Any]]:
+    """Effective settings for display: value, default, source and whether a change needs a restart."""
+    settings = get_settings()
+    rows = []
+    for name, info in SETTING_INFO.items():
+        value = getattr(settings, name)
+        rows.append({
+            'name': name,
+            'value': '***' if info.secret and value else value,
+            'default': Settings._field_defaults[name],
+            'source': _sources.get(name, 'default'),
+            'reloadable': info.reloadable,
+            'description': info.description,
+        })
+    return rows
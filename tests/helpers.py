@@ -0,0 +1,14 @@
+"""Helpers shared by the test modules."""
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
@@ -0,0 +1,95 @@
+"""Tests for auth.sessions: signed tokens and the session cache."""
+import time
+import unittest
+
+from auth import sessions
+from auth.sessions import SessionCache, issue_token, new_session_id, verify_token
+from tests.helpers import FakeClock
+
+
+class VerifyTokenTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        session_id = new_session_id()
+        verified = verify_token(issue_token(session_id, ttl=60))
+        self.assertIsNotNone(verified)
+        self.assertEqual(verified[0], session_id)
+        self.assertAlmostEqual(verified[1], time.time() + 60, delta=2)
+
+    def test_expired_token_is_rejected(self):
+        self.assertIsNone(verify_token(issue_token(new_session_id(), ttl=-1)))
+
+    def test_tampered_payload_is_rejected(self):
+        payload, signature = issue_token('a', ttl=60).split('.')
+        other_payload = issue_token('b', ttl=60).split('.')[0]
+        self.assertIsNone(verify_token(f"{other_payload}.{signature}"))
+
+    def test_tampered_signature_is_rejected(self):
+        payload, signature = issue_token('a', ttl=60).split('.')
+        forged = ('A' if signature[0] != 'A' else 'B') + signature[1:]
+        self.assertIsNone(verify_token(f"{payload}.{forged}"))
+
+    def test_token_from_another_key_is_rejected(self):
+        token = issue_token('a', ttl=60)
+        secret = sessions._secret
+        try:
+            sessions._secret = b'\0' * 32
+            self.assertIsNone(verify_token(token))
+        finally:
+            sessions._secret = secret
+
+    def test_malformed_tokens_are_rejected(self):
+        for token in ('', 'no-dot', '.', 'abc.def', 'not base64!.sig'):
+            self.assertIsNone(verify_token(token), token)
+
+    def test_signed_payload_without_claims_is_rejected(self):
+        payload = sessions._encode(b'{}')
+        self.assertIsNone(verify_token(f"{payload}.{sessions._sign(payload)}"))
+
+
+class SessionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SessionCache(max_size=2, clock=self.clock)
+
+    def test_get_returns_stored_state(self):
+        state = {'username': 'alice'}
+        self.cache.put('s1', state, ttl=60)
+        self.assertIs(self.cache.get('s1'), state)
+        self.assertIsNone(self.cache.get('unknown'))
+
+    def test_entry_expires_after_its_ttl(self):
+        self.cache.put('s1', {}, ttl=60)
+        self.clock.advance(59)
+        self.assertIsNotNone(self.cache.get('s1'))
+        self.clock.advance(2)
+        self.assertIsNone(self.cache.get('s1'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_put_refreshes_the_ttl(self):
+        self.cache.put('s1', {}, ttl=60)
+        self.clock.advance(50)
+        self.cache.put('s1', {}, ttl=60)
+        self.clock.advance(50)
+        self.assertIsNotNone(self.cache.get('s1'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put('s1', {}, ttl=60)
+        self.cache.put('s2', {}, ttl=60)
+        # Reading s1 makes s2 the least recently used
+        self.cache.get('s1')
+        self.cache.put('s3', {}, ttl=60)
+        self.assertIsNotNone(self.cache.get('s1'))
+        self.assertIsNone(self.cache.get('s2'))
+        self.assertIsNotNone(self.cache.get('s3'))
+
+    def test_pop_ends_the_session(self):
+        self.cache.put('s1', {}, ttl=60)
+        self.cache.pop('s1')
+        self.cache.pop('s1')
+        self.assertIsNone(self.cache.get('s1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
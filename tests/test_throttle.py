@@ -0,0 +1,96 @@
+"""Tests for auth.throttle."""
+import unittest
+
+from auth import throttle
+from auth.throttle import TokenBucketLimiter, check_login
+from config import settings
+from tests.helpers import FakeClock
+
+
+class TokenBucketLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = TokenBucketLimiter(max_keys=100, clock=self.clock)
+
+    def test_new_bucket_allows_a_full_burst(self):
+        for _ in range(3):
+            self.assertEqual(self.limiter.acquire('user', rate=1.0, burst=3), 0.0)
+        self.assertGreater(self.limiter.acquire('user', rate=1.0, burst=3), 0.0)
+
+    def test_wait_is_time_until_the_next_token(self):
+        self.limiter.acquire('user', rate=0.5, burst=1)
+        self.assertAlmostEqual(self.limiter.acquire('user', rate=0.5, burst=1), 2.0)
+        self.clock.advance(1.5)
+        self.assertAlmostEqual(self.limiter.acquire('user', rate=0.5, burst=1), 0.5)
+
+    def test_tokens_refill_over_time_up_to_the_burst(self):
+        for _ in range(2):
+            self.limiter.acquire('user', rate=1.0, burst=2)
+        self.clock.advance(60)
+        self.assertEqual(self.limiter.acquire('user', rate=1.0, burst=2), 0.0)
+        self.assertEqual(self.limiter.acquire('user', rate=1.0, burst=2), 0.0)
+        self.assertGreater(self.limiter.acquire('user', rate=1.0, burst=2), 0.0)
+
+    def test_keys_have_separate_buckets(self):
+        self.limiter.acquire('a', rate=1.0, burst=1)
+        self.assertGreater(self.limiter.acquire('a', rate=1.0, burst=1), 0.0)
+        self.assertEqual(self.limiter.acquire('b', rate=1.0, burst=1), 0.0)
+
+    def test_zero_rate_never_refills(self):
+        self.limiter.acquire('user', rate=0.0, burst=1)
+        self.clock.advance(3600)
+        self.assertEqual(self.limiter.acquire('user', rate=0.0, burst=1), float('inf'))
+
+    def test_refund_returns_a_token_without_exceeding_the_burst(self):
+        self.limiter.acquire('user', rate=1.0, burst=1)
+        self.limiter.refund('user', burst=1)
+        self.limiter.refund('user', burst=1)
+        self.assertEqual(self.limiter.acquire('user', rate=1.0, burst=1), 0.0)
+        self.assertGreater(self.limiter.acquire('user', rate=1.0, burst=1), 0.0)
+
+    def test_least_recently_used_bucket_is_evicted(self):
+        limiter = TokenBucketLimiter(max_keys=2, clock=self.clock)
+        limiter.acquire('a', rate=1.0, burst=1)
+        limiter.acquire('b', rate=1.0, burst=1)
+        # Touch 'a' so 'b' is the least recently used
+        limiter.acquire('a', rate=1.0, burst=1)
+        limiter.acquire('c', rate=1.0, burst=1)
+        self.assertEqual(len(limiter), 2)
+        # 'b' starts over with a full bucket, 'a' is still empty
+        self.assertEqual(limiter.acquire('b', rate=1.0, burst=1), 0.0)
+        self.assertGreater(limiter.acquire('c', rate=1.0, burst=1), 0.0)
+
+
+class CheckLoginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.saved = throttle._limiter
+        throttle._limiter = TokenBucketLimiter(clock=self.clock)
+        self.settings = settings.get_settings()
+
+    def tearDown(self):
+        throttle._limiter = self.saved
+
+    def test_rotating_clients_do_not_lift_the_account_limit(self):
+        burst = self.settings.LOGIN_ACCOUNT_BURST
+        waits = [check_login('Victim@example.com', f"10.0.0.{attempt}") for attempt in range(burst + 1)]
+        self.assertEqual(waits[:burst], [0.0] * burst)
+        self.assertGreater(waits[burst], 0.0)
+        # Other accounts from a fresh address are unaffected
+        self.assertEqual(check_login('other@example.com', '10.0.1.1'), 0.0)
+
+    def test_shed_attempt_refunds_the_buckets_that_admitted_it(self):
+        burst = self.settings.LOGIN_ACCOUNT_BURST
+        for attempt in range(burst):
+            check_login('victim', f"10.0.0.{attempt}")
+        self.assertGreater(check_login('victim', '10.0.0.200'), 0.0)
+        # The per-(user, client) token taken before the account bucket shed was given back
+        limiter = throttle._limiter
+        self.assertEqual(limiter._buckets[('user', 'victim', '10.0.0.200')][0], self.settings.LOGIN_BURST)
+        self.assertNotIn(('client', '10.0.0.200'), limiter._buckets)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,13 @@
+"""
+Customer context for agent runs.
+
+Kept apart from tools.loan_tools so the runner can set the current customer
+without importing the tool definitions (and the agents SDK) up front.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+from util.customer_record import CustomerRecord
+
+# Customer the current agent run is for; set by the runner before each run
+current_customer_data: ContextVar[Optional[CustomerRecord]] = ContextVar('current_customer_data', default=None)
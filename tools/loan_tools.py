@@ -5,11 +5,27 @@ This module contains all the function tools used by the loan re-engagement agent
 for customer interaction, loan calculations, and data retrieval.
 """
 
-from typing import Dict, Any, Optional
 import streamlit as st
 from agents import function_tool
+from tools.customer_context import current_customer_data
+from util.customer_record import CustomerRecord
 from util.utils import format_currency, format_percentage, logger
 
+_EMPTY_CUSTOMER = CustomerRecord()
+
+
+def _get_customer_data() -> CustomerRecord:
+    """Customer record for the running agent, falling back to the Streamlit session."""
+    customer_data = current_customer_data.get()
+    if customer_data is not None:
+        return customer_data
+    customer_data = st.session_state.get('customer_data')
+    if customer_data is None:
+        return _EMPTY_CUSTOMER
+    if not isinstance(customer_data, CustomerRecord):
+        customer_data = CustomerRecord.from_mapping(customer_data)
+    return customer_data
+
 
 @function_tool
 def get_customer_details(detail_type: str = "all") -> str:
@@ -23,31 +39,29 @@ def get_customer_details(detail_type: str = "all") -> str:
         Formatted customer details
     """
     try:
-        # Access customer data from the global context or pass it differently
-        # For now, we'll need to modify this to work with the SDK pattern
-        customer_data = st.session_state.get('customer_data', {})
+        customer_data = _get_customer_data()
 
         if detail_type == "all":
             return f"""
-Name: {customer_data.get('name', '')}
-Loan Offer: {format_currency(customer_data.get('loan_offer', 0))}
-Interest Rate: {format_percentage(customer_data.get('interest_rate', 0))}
-Tenure: {customer_data.get('tenure', '')} months
-Monthly EMI: {format_currency(customer_data.get('emi_amount', 0))}
-Processing Fee: {format_currency(customer_data.get('processing_fee', 0))}
-Foreclosure Charges: {format_currency(customer_data.get('foreclosure_charges', 0))}
-Offer Expiry: {customer_data.get('offer_expiry', '')}
-Purpose: {customer_data.get('purpose', '')}
-Application Link: {customer_data.get('application_link', '')}
+Name: {customer_data.name}
+Loan Offer: {format_currency(customer_data.loan_offer)}
+Interest Rate: {format_percentage(customer_data.interest_rate)}
+Tenure: {customer_data.tenure or ''} months
+Monthly EMI: {format_currency(customer_data.emi_amount)}
+Processing Fee: {format_currency(customer_data.processing_fee)}
+Foreclosure Charges: {format_currency(customer_data.foreclosure_charges)}
+Offer Expiry: {customer_data.offer_expiry}
+Purpose: {customer_data.purpose}
+Application Link: {customer_data.application_link}
 """
         elif detail_type == "loan_offer":
-            return f"Your pre-approved loan offer: {format_currency(customer_data.get('loan_offer', 0))}"
+            return f"Your pre-approved loan offer: {format_currency(customer_data.loan_offer)}"
         elif detail_type == "interest_rate":
-            return f"Interest rate: {format_percentage(customer_data.get('interest_rate', 0))}"
+            return f"Interest rate: {format_percentage(customer_data.interest_rate)}"
         elif detail_type == "emi":
-            return f"Monthly EMI: {format_currency(customer_data.get('emi_amount', 0))}"
+            return f"Monthly EMI: {format_currency(customer_data.emi_amount)}"
         elif detail_type == "expiry":
-            return f"Offer expires on: {customer_data.get('offer_expiry', 'Not specified')}"
+            return f"Offer expires on: {customer_data.offer_expiry or 'Not specified'}"
         else:
             return f"{detail_type}: {customer_data.get(detail_type, 'Information not available')}"
     except Exception as e:
@@ -218,10 +232,10 @@ def calculate_loan_savings(prepayment_amount: float = 0) -> str:
         Savings calculation details
     """
     try:
-        customer_data = st.session_state.get('customer_data', {})
-        loan_amount = customer_data.get('loan_offer', 0)
-        interest_rate = customer_data.get('interest_rate', 0)
-        tenure = customer_data.get('tenure', 12)
+        customer_data = _get_customer_data()
+        loan_amount = customer_data.loan_offer
+        interest_rate = customer_data.interest_rate
+        tenure = customer_data.tenure
 
         if not all([loan_amount, interest_rate, tenure]):
             return "Unable to calculate savings. Missing loan parameters."
@@ -292,12 +306,12 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
     """
     try:
         # Get customer data from session state
-        customer_data = st.session_state.get('customer_data', {})
+        customer_data = _get_customer_data()
 
         # Use provided parameters or fall back to customer data
-        base_loan_amount = loan_amount if loan_amount > 0 else customer_data.get('loan_offer', 0)
-        base_tenure = requested_tenure if requested_tenure > 0 else customer_data.get('tenure', 12)
-        base_interest_rate = customer_data.get('interest_rate', 12.0)
+        base_loan_amount = loan_amount if loan_amount > 0 else customer_data.loan_offer
+        base_tenure = requested_tenure if requested_tenure > 0 else customer_data.tenure
+        base_interest_rate = customer_data.interest_rate
 
         if not base_loan_amount or not base_interest_rate:
             return "Unable to calculate dynamic pricing. Missing essential customer data."
@@ -310,7 +324,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
         # --- CUSTOMER RELATIONSHIP FACTORS ---
 
         # Account age factor
-        account_age_years = customer_data.get('account_age_years', 0)
+        account_age_years = customer_data.account_age_years
         if account_age_years >= 5:
             rate_adjustment -= 0.5  # 0.5% discount for 5+ years
         elif account_age_years >= 2:
@@ -319,13 +333,13 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
             rate_adjustment += 0.25  # 0.25% premium for new customers
 
         # Salary account relationship
-        is_salary_account = customer_data.get('is_salary_account', False)
+        is_salary_account = customer_data.is_salary_account
         if is_salary_account:
             rate_adjustment -= 0.3
             processing_fee_multiplier *= 0.8  # 20% processing fee discount
 
         # Banking relationship value
-        avg_monthly_balance = customer_data.get('avg_monthly_balance', 0)
+        avg_monthly_balance = customer_data.avg_monthly_balance
         if avg_monthly_balance >= 100000:  # 1 lakh+
             rate_adjustment -= 0.4
             max_loan_multiplier *= 1.2
@@ -338,7 +352,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
         # --- CREDIT PROFILE FACTORS ---
 
         # Credit score impact
-        credit_score = customer_data.get('credit_score', 750)
+        credit_score = customer_data.credit_score
         if credit_score >= 800:
             rate_adjustment -= 0.5
             max_loan_multiplier *= 1.3
@@ -353,7 +367,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
             max_loan_multiplier *= 0.8
 
         # Existing loan performance
-        loan_history_score = customer_data.get('loan_history_score', 'good')  # excellent, good, average, poor
+        loan_history_score = customer_data.loan_history_score  # excellent, good, average, poor
         if loan_history_score == 'excellent':
             rate_adjustment -= 0.3
             processing_fee_multiplier *= 0.7
@@ -365,7 +379,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
         # --- INCOME AND EMPLOYMENT FACTORS ---
 
         # Monthly income
-        monthly_income = customer_data.get('monthly_income', 0)
+        monthly_income = customer_data.monthly_income
         if monthly_income >= 100000:  # 1 lakh+
             rate_adjustment -= 0.2
             max_loan_multiplier *= 1.4
@@ -377,7 +391,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
             max_loan_multiplier *= 0.9
 
         # Employment type
-        employment_type = customer_data.get('employment_type', 'salaried')
+        employment_type = customer_data.employment_type
         if employment_type == 'government':
             rate_adjustment -= 0.4
         elif employment_type == 'mnc':
@@ -388,7 +402,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
             rate_adjustment += 0.2
 
         # Job stability (years in current job)
-        job_stability_years = customer_data.get('job_stability_years', 2)
+        job_stability_years = customer_data.job_stability_years
         if job_stability_years >= 3:
             rate_adjustment -= 0.1
         elif job_stability_years < 1:
@@ -413,13 +427,13 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
         # --- MARKET AND SEASONAL FACTORS ---
 
         # Festive season discount (if applicable)
-        is_festive_season = customer_data.get('is_festive_season', False)
+        is_festive_season = customer_data.is_festive_season
         if is_festive_season:
             rate_adjustment -= 0.15
             processing_fee_multiplier *= 0.9
 
         # Customer acquisition vs retention
-        has_existing_loans = customer_data.get('has_existing_loans', False)
+        has_existing_loans = customer_data.has_existing_loans
         if not has_existing_loans:
             rate_adjustment -= 0.1  # New loan customer incentive
 
@@ -432,7 +446,7 @@ def calculate_dynamic_pricing(loan_amount: float = 0, requested_tenure: int = 0)
         max_eligible_amount = base_loan_amount * max_loan_multiplier
 
         # Calculate processing fee
-        base_processing_fee = customer_data.get('processing_fee', base_loan_amount * 0.02)
+        base_processing_fee = customer_data.processing_fee or base_loan_amount * 0.02
         final_processing_fee = base_processing_fee * processing_fee_multiplier
 
         # Calculate EMI with new rate
@@ -519,14 +533,14 @@ def get_rate_improvement_suggestions() -> str:
         Actionable suggestions for better rates
     """
     try:
-        customer_data = st.session_state.get('customer_data', {})
-        current_rate = customer_data.get('interest_rate', 12.0)
+        customer_data = _get_customer_data()
+        current_rate = customer_data.interest_rate
 
         suggestions = []
         potential_savings = 0
 
         # Credit score improvement
-        credit_score = customer_data.get('credit_score', 750)
+        credit_score = customer_data.credit_score
         if credit_score < 800:
             target_score = min(850, credit_score + 50)
             potential_reduction = 0.5 if target_score >= 800 else 0.25
@@ -536,7 +550,7 @@ def get_rate_improvement_suggestions() -> str:
             suggestions.append(f"   • Pay all bills on time, reduce credit utilization")
 
         # Salary account conversion
-        is_salary_account = customer_data.get('is_salary_account', False)
+        is_salary_account = customer_data.is_salary_account
         if not is_salary_account:
             potential_savings += 0.3
             suggestions.append(f"💰 **Convert to Salary Account**")
@@ -544,7 +558,7 @@ def get_rate_improvement_suggestions() -> str:
             suggestions.append(f"   • Additional processing fee discount: 20%")
 
         # Increase monthly balance
-        avg_balance = customer_data.get('avg_monthly_balance', 0)
+        avg_balance = customer_data.avg_monthly_balance
         if avg_balance < 50000:
             potential_savings += 0.2
             suggestions.append(f"💳 **Maintain Higher Account Balance**")
@@ -552,14 +566,14 @@ def get_rate_improvement_suggestions() -> str:
             suggestions.append(f"   • Potential rate reduction: 0.2-0.4%")
 
         # Loan amount optimization
-        loan_amount = customer_data.get('loan_offer', 0)
+        loan_amount = customer_data.loan_offer
         if loan_amount < 1000000:
             suggestions.append(f"📈 **Consider Higher Loan Amount**")
             suggestions.append(f"   • ₹10+ lakh loans get volume discounts")
             suggestions.append(f"   • Rate reduction: 0.15-0.25%")
 
         # Tenure optimization
-        tenure = customer_data.get('tenure', 12)
+        tenure = customer_data.tenure
         if tenure > 36:
             suggestions.append(f"⏰ **Opt for Shorter Tenure**")
             suggestions.append(f"   • Current: {tenure} months")
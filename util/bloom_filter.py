@@ -0,0 +1,133 @@
+"""
+Bloom filter over customer IDs.
+
+Existence checks for unknown IDs (e.g. bots trying random IDs) are answered
+from a compact bit array before any real index is consulted. A negative
+answer is always right; a positive one is confirmed against the index, and
+the share of absent IDs that got through is the false-positive rate.
+
+The filter is sized for a target false-positive rate (CUSTOMER_BLOOM_FPR)
+and rebuilt whenever the data it covers is reloaded. Positions come from
+Python's str hash with double hashing, so a filter is only valid inside the
+process that built it.
+"""
+import logging
+import math
+from typing import Any, Callable, Dict, Iterable, Sequence
+
+import numpy as np
+
+from util import metrics
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASHES = 16
+_LOW_32 = 0xFFFFFFFF
+_LOW_64 = 0xFFFFFFFFFFFFFFFF
+
+
+class BloomFilter:
+    """Immutable Bloom filter over a set of strings."""
+
+    __slots__ = ('bits', 'size', 'hashes', 'count')
+
+    def __init__(self, bits: bytes, size: int, hashes: int, count: int):
+        self.bits = bits
+        self.size = size
+        self.hashes = hashes
+        self.count = count
+
+    @classmethod
+    def build(cls, items: Sequence[str], false_positive_rate: float = 0.01) -> 'BloomFilter':
+        """
+        Build a filter sized for len(items) at the target false-positive rate.
+
+        Args:
+            items: Strings to add (duplicates are harmless)
+            false_positive_rate: Target rate, between 0 and 1
+
+        Returns:
+            BloomFilter
+        """
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+        count = len(items)
+        size = max(64, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+        hashes = min(_MAX_HASHES, max(1, round(size / max(count, 1) * math.log(2))))
+
+        marked = np.zeros(size, dtype=bool)
+        if count:
+            values = np.fromiter(map(hash, items), dtype=np.int64, count=count).view(np.uint64)
+            first = values & np.uint64(_LOW_32)
+            step = (values >> np.uint64(32)) | np.uint64(1)
+            for i in range(hashes):
+                marked[(first + np.uint64(i) * step) % np.uint64(size)] = True
+        bits = np.packbits(marked, bitorder='little').tobytes()
+        return cls(bits, size, hashes, count)
+
+    def __contains__(self, item: str) -> bool:
+        value = hash(item) & _LOW_64
+        first = value & _LOW_32
+        step = (value >> 32) | 1
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            position = (first + i * step) % size
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.bits)
+
+    def expected_false_positive_rate(self) -> float:
+        """False-positive rate predicted from the filter's size, hash count and item count."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'items': self.count,
+            'bits': self.size,
+            'bytes': self.nbytes,
+            'hashes': self.hashes,
+            'expected_false_positive_rate': round(self.expected_false_positive_rate(), 6),
+        }
+
+
+def build_filter(items: Iterable[str], false_positive_rate: float, label: str) -> BloomFilter:
+    """Build a filter, logging and timing it under customer_bloom.build_seconds."""
+    items = items if isinstance(items, Sequence) else list(items)
+    with metrics.timed('customer_bloom.build_seconds'):
+        bloom = BloomFilter.build(items, false_positive_rate)
+    logger.info(f"Built Bloom filter over {bloom.count} customer ids of {label}: {bloom.nbytes / 1024:.0f} KiB, "
+                f"{bloom.hashes} hashes, expected false-positive rate {bloom.expected_false_positive_rate():.4%}")
+    return bloom
+
+
+def filtered_contains(bloom: BloomFilter, item: str, contains: Callable[[str], bool]) -> bool:
+    """
+    Existence check answered by the filter when it can.
+
+    Negatives the filter rejects never reach contains(); positives are
+    confirmed with it. Outcomes are counted in util.metrics as
+    customer_bloom.rejected / .confirmed / .false_positives.
+    """
+    if item not in bloom:
+        metrics.increment('customer_bloom.rejected')
+        return False
+    found = contains(item)
+    metrics.increment('customer_bloom.confirmed' if found else 'customer_bloom.false_positives')
+    return found
+
+
+def observed_stats() -> Dict[str, Any]:
+    """Counts of filter outcomes and the observed false-positive rate among absent IDs."""
+    rejected = metrics.get_counter('customer_bloom.rejected')
+    false_positives = metrics.get_counter('customer_bloom.false_positives')
+    absent = rejected + false_positives
+    return {
+        'rejected': rejected,
+        'confirmed': metrics.get_counter('customer_bloom.confirmed'),
+        'false_positives': false_positives,
+        'observed_false_positive_rate': round(false_positives / absent, 6) if absent else None,
+    }
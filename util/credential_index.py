@@ -0,0 +1,137 @@
+"""
+In-process credential index.
+
+user_credentials.csv is read once per process (and again only when the file
+changes) into a dict keyed by username. Passwords are kept only as salted
+BLAKE2b digests, so a login costs one dict lookup, one hash and one
+constant-time compare.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import pandas as pd
+
+from util import encoding
+
+logger = logging.getLogger(__name__)
+
+SALT_BYTES = 16
+# scrypt cost for stored digests: 16 MiB and roughly 50 ms per hash
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+
+
+def hash_password(password: str, salt: bytes) -> bytes:
+    """Salted digest of a password."""
+    return hashlib.blake2b(str(password).encode('utf-8'), salt=salt, digest_size=32).digest()
+
+
+def new_salt() -> bytes:
+    return secrets.token_bytes(SALT_BYTES)
+
+
+def verify_password(password: str, salt: bytes, digest: bytes) -> bool:
+    """Check a password against a stored salt and digest in constant time."""
+    return hmac.compare_digest(hash_password(password, salt), digest)
+
+
+def hash_stored_password(password: str, salt: bytes) -> bytes:
+    """
+    Salted, deliberately slow (scrypt) digest for passwords written to disk.
+
+    The cheap hash_password digest only ever lives in process memory; a
+    database file can be copied, so its digests must resist offline guessing.
+    """
+    return hashlib.scrypt(str(password).encode('utf-8'), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                          dklen=32)
+
+
+def verify_stored_password(password: str, salt: bytes, digest: bytes) -> bool:
+    """Check a password against a salt and digest from hash_stored_password in constant time."""
+    return hmac.compare_digest(hash_stored_password(password, salt), digest)
+
+
+class _CredentialEntry:
+    __slots__ = ('salt', 'digest', 'user_data')
+
+    def __init__(self, salt: bytes, digest: bytes, user_data: Dict[str, Any]):
+        self.salt = salt
+        self.digest = digest
+        self.user_data = user_data
+
+
+class CredentialIndex:
+    """Username -> salted password hash index over the credentials CSV."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._entries: Dict[str, _CredentialEntry] = {}
+
+    def _file_signature(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build(self) -> Dict[str, _CredentialEntry]:
+        df = encoding.read_csv(self.path, dtype=str)
+        df['username'] = df['username'].astype(str).str.strip()
+        df = df.drop_duplicates('username', keep='first')
+
+        entries = {}
+        for user in df.to_dict('records'):
+            password = user.pop('password', None)
+            if password is None or pd.isna(password):
+                continue
+            user_data = {key: (None if pd.isna(value) else value) for key, value in user.items()}
+            salt = new_salt()
+            entries[user_data['username']] = _CredentialEntry(salt, hash_password(password, salt), user_data)
+        return entries
+
+    def _current(self) -> Dict[str, _CredentialEntry]:
+        """Return the entries for the file on disk, rebuilding them if it changed."""
+        signature = self._file_signature()
+        if self._signature == signature:
+            return self._entries
+
+        with self._lock:
+            if self._signature != signature:
+                # Swap both together; readers holding the old dict keep using it
+                self._entries = self._build()
+                self._signature = signature
+                logger.info(f"Built credential index with {len(self._entries)} users from {self.path}")
+        return self._entries
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        """
+        Verify a username and password.
+
+        Returns:
+            Copy of the user's data (without the password) if valid, None otherwise
+        """
+        entry = self._current().get(username)
+        if entry is None or not verify_password(password, entry.salt, entry.digest):
+            return None
+        return dict(entry.user_data)
+
+    def get(self, username: str) -> Optional[Dict[str, Any]]:
+        """Get a user's data (without the password)."""
+        entry = self._current().get(username)
+        return None if entry is None else dict(entry.user_data)
+
+
+_indexes: Dict[str, CredentialIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_credential_index(path: str) -> CredentialIndex:
+    """Get the process-wide credential index for a credentials file."""
+    index = _indexes.get(path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(path, CredentialIndex(path))
+    return index
@@ -0,0 +1,416 @@
+"""
+Streaming, constant-memory validation of customer CSV files.
+
+The file is read in fixed-size byte blocks cut at line boundaries. Each block
+is parsed and checked in a worker process, and the per-block results are
+merged in file order. At most a few blocks are in flight at once, so memory
+stays flat whatever the file size. Duplicate customer ids are tracked as a
+sorted array of 64-bit hashes (8 bytes per id) rather than as strings.
+
+Blocks are cut at newlines, so quoted fields containing line breaks are not
+supported; customer exports do not use them.
+
+Results are cached per block, keyed by a hash of the block's bytes, in a
+sidecar file next to the CSV (``data/x.csv`` -> ``data/x.validation.npz``).
+Block boundaries are content-defined (a block ends before a line whose first
+bytes hash to a marker), so after an edit only the blocks around it change
+and everything else is merged from the cache. An unchanged file (same mtime
+and size) returns the previous result without being read at all.
+"""
+import copy
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from util import metrics
+from util.customer_schema import NUMERIC_COLUMNS
+from util.encoding import FALLBACK_ENCODING, detect_encoding
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['customer_id', 'name', 'loan_offer', 'interest_rate']
+CRITICAL_COLUMNS = ['customer_id', 'name']
+
+# Merge pending id hashes into the sorted set once this many are buffered
+_HASH_MERGE_THRESHOLD = 1_000_000
+
+CACHE_VERSION = 1
+# Leading bytes of a line hashed to decide whether a block may end before it
+_MARKER_BYTES = 16
+# Nominal line length used to size the marker probability so blocks average block_size
+_NOMINAL_LINE_BYTES = 256
+
+
+def _validate_block(data: bytes, raw_columns: List[str], file_encoding: str) -> Dict[str, Any]:
+    """
+    Parse one block of CSV lines and compute its partial statistics.
+
+    Runs in a worker process, so it only takes and returns picklable values.
+    """
+    latin1 = file_encoding == FALLBACK_ENCODING
+    try:
+        text = data.decode(file_encoding)
+    except UnicodeDecodeError:
+        text = data.decode(FALLBACK_ENCODING)
+        latin1 = True
+
+    if not text.strip():
+        return {'rows': 0, 'latin1': latin1, 'columns': {}, 'id_hashes': None}
+
+    df = pd.read_csv(io.StringIO(text), header=None, names=raw_columns, dtype=str)
+    df.columns = [column.strip().lower() for column in raw_columns]
+
+    stats: Dict[str, Any] = {'rows': len(df), 'latin1': latin1, 'columns': {}, 'id_hashes': None}
+
+    for column in df.columns:
+        values = df[column]
+        missing = values.isna()
+        column_stats = {'missing': int(missing.sum())}
+        if column in NUMERIC_COLUMNS:
+            numbers = pd.to_numeric(values, errors='coerce')
+            column_stats['non_numeric'] = int((numbers.isna() & ~missing).sum())
+            valid = numbers.dropna()
+            column_stats['count'] = int(len(valid))
+            column_stats['sum'] = float(valid.sum())
+            column_stats['min'] = float(valid.min()) if len(valid) else None
+            column_stats['max'] = float(valid.max()) if len(valid) else None
+        stats['columns'][column] = column_stats
+
+    if 'customer_id' in df.columns:
+        stats['id_hashes'] = pd.util.hash_array(df['customer_id'].to_numpy(dtype=object))
+
+    return stats
+
+
+def default_cache_path(csv_path: str) -> str:
+    """Validation cache used for a CSV file (``data/x.csv`` -> ``data/x.validation.npz``)."""
+    return os.path.splitext(csv_path)[0] + '.validation.npz'
+
+
+def _find_cut(buffer: bytes, minimum: int, modulus: int) -> Optional[int]:
+    """Offset just after the newline ending the block, before the first marker line past minimum."""
+    window = np.frombuffer(buffer, dtype=np.uint8)
+    # Only lines whose marker bytes lie wholly in the buffer, so cuts do not depend on read sizes
+    starts = np.flatnonzero(window[minimum - 1:len(buffer) - _MARKER_BYTES] == 10) + minimum
+    if len(starts) == 0:
+        return None
+    lead = window[starts[:, None] + np.arange(_MARKER_BYTES)].view(np.uint64)
+    mixed = lead[:, 0] * np.uint64(0x9E3779B97F4A7C15) ^ lead[:, 1] * np.uint64(0xC2B2AE3D27D4EB4F)
+    markers = np.flatnonzero((mixed >> np.uint64(17)) % np.uint64(modulus) == 0)
+    return int(starts[markers[0]]) if len(markers) else None
+
+
+def _iter_blocks(f, block_size: int) -> Iterator[bytes]:
+    """
+    Yield byte blocks of whole lines, mostly between block_size / 2 and 2 * block_size long.
+
+    A block ends before the first line past the minimum size whose leading
+    bytes hash to a marker, so boundaries depend on content rather than
+    offsets and resynchronise right after an inserted or deleted line.
+    """
+    minimum, maximum = max(1, block_size // 2), max(2, block_size * 2)
+    modulus = max(1, block_size // (2 * _NOMINAL_LINE_BYTES))
+    buffer = b''
+    while True:
+        if len(buffer) < maximum:
+            buffer += f.read(maximum - len(buffer))
+        if not buffer:
+            return
+        cut = _find_cut(buffer, minimum, modulus)
+        if cut is None:
+            if len(buffer) < maximum:
+                # Rest of the file
+                yield buffer
+                return
+            # No marker under the cap: cut after the last whole line
+            cut = buffer.rfind(b'\n') + 1
+            if cut == 0:
+                buffer += f.readline()
+                cut = len(buffer)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+
+
+class _IdHashSet:
+    """Sorted array of 64-bit id hashes with amortised merging."""
+
+    def __init__(self):
+        self.unique = np.empty(0, dtype=np.uint64)
+        self.pending: List[np.ndarray] = []
+        self.pending_size = 0
+        self.total = 0
+
+    def add(self, hashes: np.ndarray) -> None:
+        self.pending.append(hashes)
+        self.pending_size += len(hashes)
+        self.total += len(hashes)
+        if self.pending_size >= _HASH_MERGE_THRESHOLD:
+            self._merge()
+
+    def _merge(self) -> None:
+        if self.pending:
+            self.unique = np.unique(np.concatenate([self.unique] + self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def duplicates(self) -> int:
+        self._merge()
+        return self.total - len(self.unique)
+
+
+def _merge_column_stats(total: Dict[str, Dict[str, Any]], block: Dict[str, Dict[str, Any]]) -> None:
+    for column, stats in block.items():
+        merged = total.get(column)
+        if merged is None:
+            total[column] = dict(stats)
+            continue
+        for key, value in stats.items():
+            if key == 'min':
+                if value is not None and (merged[key] is None or value < merged[key]):
+                    merged[key] = value
+            elif key == 'max':
+                if value is not None and (merged[key] is None or value > merged[key]):
+                    merged[key] = value
+            else:
+                merged[key] += value
+
+
+# Last result per file, returned while the file's (mtime_ns, size) is unchanged
+_results: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+
+
+def _block_digest(block: bytes) -> str:
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+
+def _mp_context():
+    """Start method for worker processes: forkserver where available (POSIX), otherwise spawn."""
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def _load_cache(cache_path: str, cache_key: str) -> Dict[str, Dict[str, Any]]:
+    """Block stats by digest from a cache file, empty if missing or built for another header or encoding."""
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            manifest = json.loads(data['manifest'].tobytes().decode('utf-8'))
+            id_hashes = data['id_hashes']
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable validation cache {cache_path}: {str(e)}")
+        return {}
+    if manifest.get('version') != CACHE_VERSION or manifest.get('key') != cache_key:
+        return {}
+
+    blocks: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for entry in manifest['blocks']:
+        id_count = entry.pop('id_count')
+        digest = entry.pop('digest')
+        if id_count is None:
+            entry['id_hashes'] = None
+        else:
+            entry['id_hashes'] = id_hashes[offset:offset + id_count]
+            offset += id_count
+        blocks[digest] = entry
+    return blocks
+
+
+def _save_cache(cache_path: str, cache_key: str, blocks: Dict[str, Dict[str, Any]]) -> None:
+    """Write block stats to the cache file atomically; failures only cost the next run a full check."""
+    entries = []
+    id_hashes = []
+    for digest, stats in blocks.items():
+        entry = {key: value for key, value in stats.items() if key != 'id_hashes'}
+        hashes = stats['id_hashes']
+        entry['digest'] = digest
+        entry['id_count'] = None if hashes is None else len(hashes)
+        if hashes is not None:
+            id_hashes.append(hashes)
+        entries.append(entry)
+    manifest = json.dumps({'version': CACHE_VERSION, 'key': cache_key, 'blocks': entries}).encode('utf-8')
+
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, manifest=np.frombuffer(manifest, dtype=np.uint8),
+                     id_hashes=np.concatenate(id_hashes) if id_hashes else np.empty(0, dtype=np.uint64))
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not write validation cache {cache_path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _throughput(info: Dict[str, Any], rows: int, size: int, elapsed: float) -> None:
+    info['elapsed_seconds'] = round(elapsed, 4)
+    info['rows_per_second'] = round(rows / elapsed, 1) if elapsed > 0 else None
+    info['bytes_per_second'] = round(size / elapsed, 1) if elapsed > 0 else None
+
+
+def stream_validate(file_path: str, block_size: int, workers: Optional[int] = None,
+                    use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Validate a CSV file block by block on a process pool.
+
+    Args:
+        file_path: Path to CSV file
+        block_size: Approximate bytes per block
+        workers: Number of worker processes (defaults to CPU count)
+        use_cache: Reuse cached results of unchanged blocks and update the cache
+
+    Returns:
+        Dictionary with validation results, per-column stats and throughput
+    """
+    validation_result = {
+        'valid': False,
+        'errors': [],
+        'warnings': [],
+        'info': {}
+    }
+
+    if not os.path.exists(file_path):
+        validation_result['errors'].append(f"File not found: {file_path}")
+        return validation_result
+
+    started = time.perf_counter()
+    stat = os.stat(file_path)
+    file_size = stat.st_size
+    signature = (stat.st_mtime_ns, stat.st_size)
+    memo_key = os.path.abspath(file_path)
+    previous = _results.get(memo_key) if use_cache else None
+    if previous is not None and previous[0] == signature:
+        metrics.increment('csv_validation.unchanged_files')
+        result = copy.deepcopy(previous[1])
+        result['info']['blocks_validated'] = 0
+        result['info']['blocks_reused'] = result['info']['blocks']
+        _throughput(result['info'], result['info']['total_rows'], file_size, time.perf_counter() - started)
+        return result
+
+    workers = workers or os.cpu_count() or 1
+    file_encoding = detect_encoding(file_path)
+    cache_path = default_cache_path(file_path)
+
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        if not header.strip():
+            validation_result['errors'].append("CSV file is empty")
+            return validation_result
+
+        header_text = header.decode(file_encoding)
+        raw_columns = pd.read_csv(io.StringIO(header_text), nrows=0).columns.tolist()
+        columns = [column.strip().lower() for column in raw_columns]
+        cache_key = _block_digest(header + file_encoding.encode('utf-8'))
+        cached = _load_cache(cache_path, cache_key) if use_cache else {}
+
+        total_rows = 0
+        latin1 = False
+        column_stats: Dict[str, Dict[str, Any]] = {}
+        id_hashes = _IdHashSet()
+        blocks: Dict[str, Dict[str, Any]] = {}
+        validated = reused = 0
+
+        def consume(digest: str, block_stats: Dict[str, Any]) -> None:
+            nonlocal total_rows, latin1
+            blocks[digest] = block_stats
+            total_rows += block_stats['rows']
+            latin1 = latin1 or block_stats['latin1']
+            _merge_column_stats(column_stats, block_stats['columns'])
+            if block_stats['id_hashes'] is not None:
+                id_hashes.add(block_stats['id_hashes'])
+
+        # Not worth starting a pool for a single block; otherwise started on the first changed block
+        inline = file_size <= block_size or workers == 1
+        executor: Optional[ProcessPoolExecutor] = None
+        # Merged in file order (cached blocks included) so sums match an uncached run exactly
+        in_flight = []
+
+        def consume_next() -> None:
+            pending_digest, pending = in_flight.pop(0)
+            consume(pending_digest, pending if isinstance(pending, dict) else pending.result())
+
+        try:
+            for block in _iter_blocks(f, block_size):
+                digest = _block_digest(block)
+                if digest in cached:
+                    reused += 1
+                    in_flight.append((digest, cached[digest]))
+                elif inline:
+                    validated += 1
+                    in_flight.append((digest, _validate_block(block, raw_columns, file_encoding)))
+                else:
+                    validated += 1
+                    if executor is None:
+                        # Forking a threaded server can copy a held lock into the child
+                        executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+                    in_flight.append((digest, executor.submit(_validate_block, block, raw_columns, file_encoding)))
+                # Bound the number of blocks held in memory
+                while len(in_flight) >= workers * 2 or (in_flight and isinstance(in_flight[0][1], dict)):
+                    consume_next()
+            while in_flight:
+                consume_next()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    metrics.increment('csv_validation.blocks_validated', validated)
+    metrics.increment('csv_validation.blocks_reused', reused)
+    if use_cache and (validated or len(blocks) != len(cached)):
+        _save_cache(cache_path, cache_key, blocks)
+
+    elapsed = time.perf_counter() - started
+
+    if latin1:
+        validation_result['warnings'].append("File read with latin-1 encoding instead of UTF-8")
+
+    # Basic info
+    validation_result['info']['total_rows'] = total_rows
+    validation_result['info']['total_columns'] = len(columns)
+    validation_result['info']['columns'] = columns
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        validation_result['errors'].append(f"Missing required columns: {missing_columns}")
+
+    if total_rows == 0:
+        validation_result['errors'].append("CSV file is empty")
+
+    if 'customer_id' in columns:
+        duplicates = id_hashes.duplicates()
+        if duplicates > 0:
+            validation_result['warnings'].append(f"Found {duplicates} duplicate customer IDs")
+
+    for col in CRITICAL_COLUMNS:
+        if col in column_stats and column_stats[col]['missing'] > 0:
+            validation_result['warnings'].append(
+                f"Column '{col}' has {column_stats[col]['missing']} missing values")
+
+    for col in NUMERIC_COLUMNS:
+        if col in column_stats and column_stats[col]['non_numeric'] > 0:
+            validation_result['warnings'].append(f"Column '{col}' contains non-numeric values")
+
+    for stats in column_stats.values():
+        if 'sum' in stats:
+            stats['mean'] = stats['sum'] / stats['count'] if stats['count'] else None
+
+    validation_result['info']['column_stats'] = column_stats
+    validation_result['info']['blocks'] = validated + reused
+    validation_result['info']['blocks_validated'] = validated
+    validation_result['info']['blocks_reused'] = reused
+    _throughput(validation_result['info'], total_rows, file_size, elapsed)
+
+    validation_result['valid'] = len(validation_result['errors']) == 0
+    if use_cache:
+        _results[memo_key] = (signature, copy.deepcopy(validation_result))
+    return validation_result
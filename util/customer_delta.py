@@ -0,0 +1,429 @@
+"""
+Append-only delta log for customer offer updates.
+
+Small changes are appended to ``<customer csv>.delta.jsonl`` instead of
+rewriting the whole CSV. Each line is one operation keyed by customer_id:
+
+    {"op": "upsert", "customer_id": "CUST001", "fields": {"loan_offer": 550000}}
+    {"op": "delete", "customer_id": "CUST002"}
+
+Upserts may be partial; only the given fields change. The customer store
+applies new lines incrementally on top of the base data, so making an update
+visible costs time proportional to the delta, not the portfolio. Compaction
+folds the log back into the base CSV and truncates it. Operations are
+idempotent, so a reader that briefly sees the compacted base together with
+the old log still ends up with the same data.
+
+Writers must go through append_updates (or this module's CLI), which holds
+an exclusive lock shared with compaction:
+
+    python -m util.customer_delta upsert CUST001 loan_offer=550000 interest_rate=10.25
+    python -m util.customer_delta delete CUST002
+    python -m util.customer_delta compact
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple, Iterator, Set
+
+import pandas as pd
+
+from util import encoding
+from util.customer_schema import clean_customer_frame, normalize_column
+
+logger = logging.getLogger(__name__)
+
+
+def default_delta_path(csv_path: str) -> str:
+    """Delta log used for a CSV file (``data/x.csv`` -> ``data/x.delta.jsonl``)."""
+    return os.path.splitext(csv_path)[0] + '.delta.jsonl'
+
+
+@contextmanager
+def _locked(delta_path: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Exclusive lock shared by writers and compaction; yields False if not acquired.
+
+    Uses flock on POSIX and msvcrt.locking on Windows; elsewhere writers are
+    not serialized and a warning is logged.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    if fcntl is None:
+        try:
+            import msvcrt
+        except ImportError:
+            msvcrt = None
+
+    with open(f"{delta_path}.lock", 'a+') as lock_file:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        elif msvcrt is not None:
+            # Locks the first byte; LK_LOCK gives up after about 10 seconds, so keep retrying
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        yield False
+                        return
+            try:
+                yield True
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            logger.warning(f"No file locking available; updates to {delta_path} are not serialized")
+            yield True
+
+
+def append_updates(delta_path: str, operations: List[Dict[str, Any]]) -> None:
+    """
+    Append operations to the delta log.
+
+    Args:
+        delta_path: Delta log file
+        operations: Dicts with 'op' ('upsert' or 'delete'), 'customer_id' and, for upserts, 'fields'
+    """
+    lines = []
+    for operation in operations:
+        if operation.get('op') not in ('upsert', 'delete') or not operation.get('customer_id'):
+            raise ValueError(f"Invalid delta operation: {operation}")
+        lines.append(json.dumps(operation, default=str) + '\n')
+
+    with _locked(delta_path):
+        with open(delta_path, 'a', encoding='utf-8') as f:
+            f.write(''.join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def delta_identity(delta_path: str) -> Optional[Tuple[int, int]]:
+    """(inode, size) of the delta log, or None if there is none."""
+    try:
+        stat = os.stat(delta_path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size
+
+
+def read_operations(delta_path: str, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Read complete operations appended since offset.
+
+    Returns:
+        (operations, new offset); a trailing partial line is left for the next read
+    """
+    try:
+        with open(delta_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+
+    end = data.rfind(b'\n') + 1
+    operations = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            operations.append(json.loads(line))
+        except ValueError:
+            logger.warning(f"Skipping malformed delta line in {delta_path}: {line[:200]!r}")
+    return operations, offset + end
+
+
+def _clean_fields(upserts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Clean upsert fields in one vectorized pass, keeping only the fields each upsert set."""
+    if not upserts:
+        return []
+    raw = [{normalize_column(key): value for key, value in fields.items()} for fields in upserts]
+    cleaned = clean_customer_frame(pd.DataFrame(raw)).to_dict('records')
+    return [
+        {key: (value.item() if hasattr(value, 'item') else value) for key, value in row.items() if key in given}
+        for row, given in zip(cleaned, raw)
+    ]
+
+
+class CustomerView:
+    """Base customer snapshot with delta-log updates applied on top (immutable)."""
+
+    def __init__(self, base, upserts: Dict[str, Dict[str, Any]], deleted: Set[str],
+                 delta_offset: int, delta_ino: Optional[int]):
+        self.base = base
+        self.signature = base.signature
+        self.upserts = upserts
+        self.deleted = deleted
+        self.delta_offset = delta_offset
+        self.delta_ino = delta_ino
+        self._customer_ids: Optional[List[str]] = None
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def empty(cls, base) -> 'CustomerView':
+        return cls(base, {}, set(), 0, None)
+
+    def _defaults(self) -> Dict[str, Any]:
+        """Schema defaults for every base column, used for customers first seen in the log."""
+        blank = pd.DataFrame([{column: None for column in self.base.first()}])
+        row = clean_customer_frame(blank).to_dict('records')[0]
+        return {key: (value.item() if hasattr(value, 'item') else value) for key, value in row.items()}
+
+    def apply(self, operations: List[Dict[str, Any]], delta_offset: int, delta_ino: Optional[int]) -> 'CustomerView':
+        """Return a new view with operations applied; cost is proportional to the delta."""
+        upserts = dict(self.upserts)
+        deleted = set(self.deleted)
+        defaults = None
+        cleaned = iter(_clean_fields([op.get('fields') or {} for op in operations if op.get('op') == 'upsert']))
+
+        for operation in operations:
+            customer_id = str(operation.get('customer_id', '')).strip()
+            if not customer_id:
+                continue
+            if operation.get('op') == 'delete':
+                upserts.pop(customer_id, None)
+                deleted.add(customer_id)
+            elif operation.get('op') == 'upsert':
+                fields = next(cleaned)
+                current = upserts.get(customer_id)
+                if current is None and customer_id not in deleted:
+                    current = self.base.get(customer_id)
+                if current is None:
+                    if defaults is None:
+                        defaults = self._defaults()
+                    current = defaults
+                upserts[customer_id] = {**current, **fields, 'customer_id': customer_id}
+                deleted.discard(customer_id)
+
+        return CustomerView(self.base, upserts, deleted, delta_offset, delta_ino)
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        row = self.upserts.get(customer_id)
+        if row is not None:
+            return dict(row)
+        if customer_id in self.deleted:
+            return None
+        return self.base.get(customer_id)
+
+    def get_many(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if not self.upserts and not self.deleted:
+            return self.base.get_many(customer_ids)
+        base_rows = iter(self.base.get_many(
+            [cid for cid in customer_ids if cid not in self.upserts and cid not in self.deleted]
+        ))
+        rows = []
+        for customer_id in customer_ids:
+            if customer_id in self.upserts:
+                rows.append(dict(self.upserts[customer_id]))
+            elif customer_id in self.deleted:
+                rows.append(None)
+            else:
+                rows.append(next(base_rows))
+        return rows
+
+    def contains(self, customer_id: str) -> bool:
+        if customer_id in self.upserts:
+            return True
+        return customer_id not in self.deleted and self.base.contains(customer_id)
+
+    @property
+    def customer_ids(self) -> List[str]:
+        if self._customer_ids is None:
+            if not self.upserts and not self.deleted:
+                self._customer_ids = self.base.customer_ids
+            else:
+                base_ids = self.base.customer_ids
+                base_set = set(base_ids)
+                ids = [cid for cid in base_ids if cid not in self.deleted or cid in self.upserts]
+                ids.extend(cid for cid in self.upserts if cid not in base_set)
+                self._customer_ids = ids
+        return self._customer_ids
+
+    def first(self) -> Dict[str, Any]:
+        if not self.upserts and not self.deleted:
+            return self.base.first()
+        if not self.customer_ids:
+            raise ValueError("Customer data file contains no data")
+        return self.get(self.customer_ids[0])
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            if not self.upserts and not self.deleted:
+                self._frame = self.base.frame
+            else:
+                base = self.base.frame
+                changed = set(self.upserts) | self.deleted
+                kept = base[~base['customer_id'].isin(changed)]
+                updates = pd.DataFrame(list(self.upserts.values()), columns=base.columns)
+                frame = pd.concat([kept, updates], ignore_index=True)
+                self._frame = clean_customer_frame(frame)
+        return self._frame
+
+
+def load_view(base, delta_path: str) -> CustomerView:
+    """Build a view of base plus the whole delta log."""
+    identity = delta_identity(delta_path)
+    view = CustomerView.empty(base)
+    if identity is None:
+        return view
+    operations, offset = read_operations(delta_path, 0)
+    return view.apply(operations, offset, identity[0])
+
+
+def refresh_view(view: CustomerView, delta_path: str) -> CustomerView:
+    """Apply only the delta lines appended since the view was built."""
+    identity = delta_identity(delta_path)
+    if identity is None:
+        return view if not view.upserts and not view.deleted else CustomerView.empty(view.base)
+    ino, size = identity
+    if ino != view.delta_ino or size < view.delta_offset:
+        # Log was compacted or replaced; rebuild from the start
+        return load_view(view.base, delta_path)
+    if size == view.delta_offset:
+        return view
+    operations, offset = read_operations(delta_path, view.delta_offset)
+    if not operations and offset == view.delta_offset:
+        return view
+    return view.apply(operations, offset, ino)
+
+
+def _raw_value(value: Any) -> str:
+    if value is None:
+        return ''
+    return json.dumps(value) if isinstance(value, (dict, list)) else str(value)
+
+
+def _apply_to_raw(frame: pd.DataFrame, operations: List[Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Apply operations to the CSV's rows as text, keeping its columns and row order.
+
+    Updated rows stay where they are, new customers are appended, and fields
+    without a column get a new column at the end.
+    """
+    columns = {normalize_column(column): column for column in frame.columns}
+    id_column = columns.get('customer_id')
+    if id_column is None:
+        raise ValueError("'customer_id' column not found in the data file")
+    positions = {customer_id.strip(): position for position, customer_id in enumerate(frame[id_column])}
+    added: Dict[str, Dict[str, str]] = {}
+    deleted: Set[str] = set()
+
+    for operation in operations:
+        customer_id = str(operation.get('customer_id', '')).strip()
+        if not customer_id:
+            continue
+        if operation.get('op') == 'delete':
+            added.pop(customer_id, None)
+            deleted.add(customer_id)
+        elif operation.get('op') == 'upsert':
+            row = {}
+            for key, value in (operation.get('fields') or {}).items():
+                column = columns.get(normalize_column(key))
+                if column is None:
+                    column = columns[normalize_column(key)] = key
+                    frame[column] = ''
+                row[column] = _raw_value(value)
+            position = positions.get(customer_id)
+            if position is None:
+                added[customer_id] = {**added.get(customer_id, {}), **row, id_column: customer_id}
+                continue
+            if customer_id in deleted:
+                # Deleted, then upserted again: starts from blank cells, as in CustomerView
+                deleted.discard(customer_id)
+                for column in frame.columns:
+                    if column != id_column:
+                        frame.iat[position, frame.columns.get_loc(column)] = ''
+            for column, value in row.items():
+                frame.iat[position, frame.columns.get_loc(column)] = value
+
+    if deleted:
+        frame = frame[~frame[id_column].str.strip().isin(deleted)]
+    if added:
+        frame = pd.concat([frame, pd.DataFrame(list(added.values()), columns=frame.columns)], ignore_index=True)
+    return frame.fillna('')
+
+
+def compact(csv_path: str, delta_path: str, blocking: bool = True) -> bool:
+    """
+    Fold the delta log into the base CSV and truncate the log.
+
+    The CSV is rewritten as text: headers, extra columns, blank cells,
+    value formatting and row order are kept, and only the cells named in
+    the log change.
+
+    Args:
+        csv_path: Base customer CSV
+        delta_path: Delta log
+        blocking: Wait for the lock; if False, skip when another process holds it
+
+    Returns:
+        True if compaction ran
+    """
+    with _locked(delta_path, blocking=blocking) as acquired:
+        if not acquired:
+            return False
+        identity = delta_identity(delta_path)
+        if identity is None or identity[1] == 0:
+            return False
+
+        # Writers are locked out, so these are all the operations there are
+        operations, _ = read_operations(delta_path, 0)
+        file_encoding = encoding.detect_encoding(csv_path)
+        frame = encoding.read_csv(csv_path, dtype=str, keep_default_na=False)
+        tmp_path = f"{csv_path}.tmp-{os.getpid()}"
+        _apply_to_raw(frame, operations).to_csv(tmp_path, index=False, encoding=file_encoding)
+        os.replace(tmp_path, csv_path)
+
+        # Truncate by replacing, so readers notice the new inode
+        tmp_delta = f"{delta_path}.tmp-{os.getpid()}"
+        open(tmp_delta, 'w').close()
+        os.replace(tmp_delta, delta_path)
+
+    logger.info(f"Compacted {identity[1]} bytes of delta log into {csv_path}")
+    return True
+
+
+def main() -> None:
+    import argparse
+    from config.config import CUSTOMER_DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Append customer updates or compact the delta log")
+    parser.add_argument('--source', default=CUSTOMER_DATA_PATH, help="Base customer CSV file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    upsert = subparsers.add_parser('upsert', help="Insert or update a customer")
+    upsert.add_argument('customer_id')
+    upsert.add_argument('fields', nargs='+', help="field=value pairs")
+    delete = subparsers.add_parser('delete', help="Delete a customer")
+    delete.add_argument('customer_id')
+    subparsers.add_parser('compact', help="Fold the delta log into the base CSV")
+    args = parser.parse_args()
+
+    delta_path = default_delta_path(args.source)
+    if args.command == 'upsert':
+        fields = dict(pair.split('=', 1) for pair in args.fields)
+        append_updates(delta_path, [{'op': 'upsert', 'customer_id': args.customer_id, 'fields': fields}])
+    elif args.command == 'delete':
+        append_updates(delta_path, [{'op': 'delete', 'customer_id': args.customer_id}])
+    else:
+        from util.customer_store import CustomerStore
+        store = CustomerStore(args.source)
+        compacted = store.compact()
+        print("Delta log compacted" if compacted else "Nothing to compact")
+
+
+if __name__ == "__main__":
+    main()
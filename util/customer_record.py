@@ -0,0 +1,101 @@
+"""
+Compact customer record.
+
+One CustomerRecord per session replaces the loose ~22-key dict that used to
+be copied between the session, the agent runner and the tools. Fields are
+the columns of util.customer_schema, stored in __slots__ as native Python
+values (no per-instance dict); categorical values are interned so every
+record points at the same string objects. Columns missing from the source
+data hold their schema default.
+
+Read fields as attributes (record.loan_offer). get(), [] and 'in' are kept
+for code that still treats the record as a dict.
+"""
+import sys
+from typing import Any, Dict, Iterator, List, Mapping, Tuple
+
+from util.customer_schema import CUSTOMER_SCHEMA
+
+_FIELDS: Tuple[str, ...] = tuple(CUSTOMER_SCHEMA)
+_CONVERTERS = {'string': str, 'float': float, 'int': int, 'bool': bool, 'category': str}
+_SPECS = tuple(
+    (name, _CONVERTERS[spec.dtype], spec.default, spec.dtype == 'category')
+    for name, spec in CUSTOMER_SCHEMA.items()
+)
+
+# Categories are interned up front so records share the schema's string objects
+for _spec in CUSTOMER_SCHEMA.values():
+    for _category in _spec.categories or ():
+        sys.intern(_category)
+
+
+class CustomerRecord:
+    """Typed, slot-based customer row shared by reference across a session."""
+
+    __slots__ = _FIELDS
+
+    def __init__(self, **fields: Any):
+        for name, convert, default, is_category in _SPECS:
+            value = fields.get(name, default)
+            if value is None:
+                value = default
+            elif hasattr(value, 'item'):
+                # numpy scalar -> native type
+                value = value.item()
+            value = convert(value)
+            object.__setattr__(self, name, sys.intern(value) if is_category else value)
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> 'CustomerRecord':
+        """Build a record from a cleaned customer row; keys outside the schema are dropped."""
+        return cls(**{key: value for key, value in data.items() if key in CUSTOMER_SCHEMA})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("CustomerRecord is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in CUSTOMER_SCHEMA:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in CUSTOMER_SCHEMA
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_FIELDS)
+
+    def __len__(self) -> int:
+        return len(_FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CustomerRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in _FIELDS)
+
+    def __hash__(self) -> int:
+        return hash(self.customer_id)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in _FIELDS)
+        return f"CustomerRecord({fields})"
+
+    def __reduce__(self):
+        return _restore, (self.to_dict(),)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style access, for callers that still treat the record as a dict."""
+        return getattr(self, key, default) if key in CUSTOMER_SCHEMA else default
+
+    def keys(self) -> List[str]:
+        return list(_FIELDS)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(name, getattr(self, name)) for name in _FIELDS]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy of the record."""
+        return {name: getattr(self, name) for name in _FIELDS}
+
+
+def _restore(fields: Dict[str, Any]) -> CustomerRecord:
+    return CustomerRecord(**fields)
@@ -0,0 +1,135 @@
+"""
+Customer data schema.
+
+Single source of truth for the customer columns: their dtype, the default used
+for missing values and, for low-cardinality columns, the known categories.
+It drives read_csv (usecols/dtype) and the one vectorized cleaning pass done
+when the data is loaded, so individual lookups need no per-field cleaning.
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ColumnSpec(NamedTuple):
+    """Type, default and category encoding of one customer column."""
+    dtype: str  # 'string', 'float', 'int', 'bool' or 'category'
+    default: Any
+    categories: Optional[Tuple[str, ...]] = None
+
+
+# Optional columns the pricing tools depend on default to a neutral profile
+# (12-month tenure, 750 credit score, 2 years in job) rather than to zero
+CUSTOMER_SCHEMA: Dict[str, ColumnSpec] = {
+    'customer_id': ColumnSpec('string', ''),
+    'name': ColumnSpec('string', ''),
+    'loan_offer': ColumnSpec('float', 0.0),
+    'interest_rate': ColumnSpec('float', 0.0),
+    'tenure': ColumnSpec('int', 12),
+    'minimumtenure': ColumnSpec('int', 0),
+    'maximumtenure': ColumnSpec('int', 0),
+    'emi_amount': ColumnSpec('float', 0.0),
+    'processing_fee': ColumnSpec('float', 0.0),
+    'foreclosure_charges': ColumnSpec('float', 0.0),
+    'offer_expiry': ColumnSpec('string', ''),
+    'purpose': ColumnSpec('string', ''),
+    'application_link': ColumnSpec('string', ''),
+    'account_age_years': ColumnSpec('float', 0.0),
+    'is_salary_account': ColumnSpec('bool', False),
+    'avg_monthly_balance': ColumnSpec('float', 0.0),
+    'credit_score': ColumnSpec('int', 750),
+    'loan_history_score': ColumnSpec('category', 'good', ('excellent', 'good', 'average', 'poor')),
+    'monthly_income': ColumnSpec('float', 0.0),
+    'employment_type': ColumnSpec(
+        'category', 'salaried', ('salaried', 'mnc', 'government', 'self_employed', 'business_owner')),
+    'job_stability_years': ColumnSpec('float', 2.0),
+    'is_festive_season': ColumnSpec('bool', False),
+    'has_existing_loans': ColumnSpec('bool', False),
+    'apr': ColumnSpec('float', 0.0),
+}
+
+NUMERIC_COLUMNS: List[str] = [name for name, spec in CUSTOMER_SCHEMA.items() if spec.dtype in ('float', 'int')]
+
+_TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+_FALSE_VALUES = {'false', '0', 'no', 'n', 'f'}
+
+
+def normalize_column(column: str) -> str:
+    """Column name as used in the schema (stripped, lower-cased)."""
+    return column.strip().lower()
+
+
+def read_csv_options(header: List[str]) -> Dict[str, Any]:
+    """
+    Build read_csv keyword arguments for a file with the given raw header.
+
+    Only schema columns are parsed. Text columns are read as strings and
+    low-cardinality columns straight into categoricals; numeric and bool
+    columns are left to pandas inference and coerced in clean_customer_frame,
+    so a single bad value does not fail the whole load.
+    """
+    usecols = [column for column in header if normalize_column(column) in CUSTOMER_SCHEMA]
+    dtype = {}
+    for column in usecols:
+        spec = CUSTOMER_SCHEMA[normalize_column(column)]
+        if spec.dtype == 'string':
+            dtype[column] = str
+        elif spec.dtype == 'category':
+            dtype[column] = 'category'
+    return {'usecols': usecols, 'dtype': dtype}
+
+
+def _clean_bool(values: 'pd.Series', default: bool) -> 'pd.Series':
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(values):
+        return values
+    text = values.astype(str).str.strip().str.lower()
+    result = pd.Series(default, index=values.index, dtype=bool)
+    result[text.isin(_TRUE_VALUES)] = True
+    result[text.isin(_FALSE_VALUES)] = False
+    return result
+
+
+def clean_customer_frame(df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """
+    Clean a customer DataFrame in one vectorized pass.
+
+    Column names are normalised, missing values replaced with schema
+    defaults, numeric columns coerced, and low-cardinality columns encoded
+    as categoricals. Columns not in the schema are left untouched.
+
+    Args:
+        df: Raw customer DataFrame
+
+    Returns:
+        Cleaned DataFrame (modified in place and returned)
+    """
+    import pandas as pd
+
+    df.columns = [normalize_column(column) for column in df.columns]
+
+    for column in df.columns:
+        spec = CUSTOMER_SCHEMA.get(column)
+        if spec is None:
+            continue
+        values = df[column]
+
+        if spec.dtype == 'float':
+            df[column] = pd.to_numeric(values, errors='coerce').fillna(spec.default).astype('float64')
+        elif spec.dtype == 'int':
+            numbers = pd.to_numeric(values, errors='coerce').fillna(spec.default)
+            df[column] = numbers.round().astype('int64')
+        elif spec.dtype == 'bool':
+            df[column] = _clean_bool(values, spec.default)
+        elif spec.dtype == 'category':
+            text = values.astype(object).where(values.notna(), spec.default)
+            text = pd.Series(text, index=values.index).astype(str).str.strip().str.lower()
+            # Keep unexpected values rather than silently turning them into NaN
+            categories = list(spec.categories) + sorted(set(text.unique()) - set(spec.categories))
+            df[column] = pd.Categorical(text, categories=categories)
+        else:
+            df[column] = values.fillna(spec.default).astype(str).str.strip()
+
+    return df
@@ -0,0 +1,297 @@
+"""
+Hash-sharded customer data.
+
+A shard directory holds the portfolio split into CSV files by a stable hash
+of customer_id (CRC32 of the UTF-8 id, modulo the shard count):
+
+    data/customer_data.shards/
+        manifest.json
+        shard-00000.csv
+        shard-00001.csv
+        ...
+
+Point CUSTOMER_DATA_PATH at the directory and a lookup opens only the shard
+holding the requested id. Recently used shards are kept in an LRU of
+CUSTOMER_SHARD_CACHE_SIZE stores; each shard is an ordinary CustomerStore,
+so a compiled snapshot next to a shard file is used too.
+
+contains() first asks one Bloom filter over the IDs of every shard (see
+util.bloom_filter), so an unknown ID is usually rejected without opening
+its shard. The filter is built from the shards' ID columns on first use;
+a shard whose file changed since, or that has a delta log, is checked
+directly instead.
+
+Split today's CSV with:
+    python -m util.customer_shards [--source data/customer_data.csv]
+                                   [--output data/customer_data.shards] [--shards 64]
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+import pandas as pd
+
+from config import settings
+from util import encoding
+from util.bloom_filter import BloomFilter, build_filter, filtered_contains, observed_stats
+from util.customer_delta import default_delta_path, delta_identity
+from util.customer_schema import normalize_column
+from util.customer_store import CustomerStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+SHARDS_VERSION = 1
+SPLIT_CHUNK_ROWS = 100000
+
+
+def shard_for(customer_id: str, shard_count: int) -> int:
+    """Shard number for a customer ID; stable across processes and Python versions."""
+    return zlib.crc32(str(customer_id).strip().encode('utf-8')) % shard_count
+
+
+def shard_file(directory: str, shard: int) -> str:
+    return os.path.join(directory, f"shard-{shard:05d}.csv")
+
+
+def default_shards_path(csv_path: str) -> str:
+    """Shard directory used for a CSV file (``data/x.csv`` -> ``data/x.shards``)."""
+    return os.path.splitext(csv_path)[0] + '.shards'
+
+
+def split_csv(source: str, output_dir: str, shard_count: int) -> str:
+    """
+    Split a customer CSV into hash shards.
+
+    Rows are copied as text (cleaning happens when a shard is loaded), and
+    the directory is built next to the target and renamed into place.
+
+    Args:
+        source: Customer CSV file
+        output_dir: Shard directory to create or replace
+        shard_count: Number of shards
+
+    Returns:
+        The shard directory
+    """
+    if shard_count < 1:
+        raise ValueError("shard_count must be at least 1")
+
+    header = encoding.read_csv(source, nrows=0).columns.tolist()
+    id_column = next((column for column in header if normalize_column(column) == 'customer_id'), None)
+    if id_column is None:
+        raise ValueError("'customer_id' column not found in the data file")
+
+    tmp_dir = f"{output_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    rows = 0
+    written = set()
+    for chunk in encoding.read_csv(source, dtype=str, keep_default_na=False, chunksize=SPLIT_CHUNK_ROWS):
+        shards = chunk[id_column].map(lambda customer_id: shard_for(customer_id, shard_count))
+        for shard, part in chunk.groupby(shards, sort=False):
+            path = shard_file(tmp_dir, shard)
+            part.to_csv(path, mode='a', header=shard not in written, index=False, encoding='utf-8')
+            written.add(shard)
+        rows += len(chunk)
+
+    # Every shard gets a file, so an empty shard is a header-only CSV rather than a missing one
+    for shard in range(shard_count):
+        if shard not in written:
+            pd.DataFrame(columns=header).to_csv(shard_file(tmp_dir, shard), index=False, encoding='utf-8')
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump({'version': SHARDS_VERSION, 'shard_count': shard_count, 'hash': 'crc32', 'rows': rows}, f, indent=2)
+
+    old_dir = f"{output_dir}.old-{os.getpid()}"
+    if os.path.exists(output_dir):
+        os.replace(output_dir, old_dir)
+    os.replace(tmp_dir, output_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    logger.info(f"Split {rows} customer rows from {source} into {shard_count} shards at {output_dir}")
+    return output_dir
+
+
+class _ShardStore(CustomerStore):
+    """CustomerStore for one shard; a shard with no rows is valid."""
+
+    allow_empty = True
+
+    def _build_bloom(self, base) -> Optional[BloomFilter]:
+        # The directory-wide filter in ShardedCustomerStore already screened the ID
+        return None
+
+
+class ShardedCustomerStore:
+    """Customer store over a shard directory, opening shards on demand."""
+
+    def __init__(self, directory: str, cache_size: int = 8):
+        self.directory = directory
+        self.cache_size = max(1, cache_size)
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Customer shard manifest not found in {directory}")
+        if manifest.get('version') != SHARDS_VERSION:
+            raise ValueError(f"Unsupported customer shard version in {directory}")
+        self.shard_count: int = manifest['shard_count']
+        self._lock = threading.Lock()
+        self._shards: 'OrderedDict[int, CustomerStore]' = OrderedDict()
+        # (shard signatures the filter was built at, filter); built on first contains()
+        self._bloom: Optional[Tuple[List[Any], Optional[BloomFilter]]] = None
+        self._bloom_lock = threading.Lock()
+
+    def _shard(self, shard: int) -> CustomerStore:
+        """Store for one shard, from the LRU or newly opened."""
+        with self._lock:
+            store = self._shards.get(shard)
+            if store is not None:
+                self._shards.move_to_end(shard)
+                return store
+            store = _ShardStore(shard_file(self.directory, shard))
+            self._shards[shard] = store
+            if len(self._shards) > self.cache_size:
+                # The evicted store's data is freed once no reader still holds it
+                self._shards.popitem(last=False)
+            return store
+
+    def _store_for(self, customer_id: str) -> CustomerStore:
+        return self._shard(shard_for(customer_id, self.shard_count))
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """Get the raw row for a customer, opening only its shard."""
+        customer_id = str(customer_id).strip()
+        return self._store_for(customer_id).get(customer_id)
+
+    def get_many(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Get rows for many customers, visiting each shard once."""
+        ids = [str(customer_id).strip() for customer_id in customer_ids]
+        by_shard: Dict[int, List[int]] = {}
+        for position, customer_id in enumerate(ids):
+            by_shard.setdefault(shard_for(customer_id, self.shard_count), []).append(position)
+
+        rows: List[Optional[Dict[str, Any]]] = [None] * len(ids)
+        for shard, positions in by_shard.items():
+            found = self._shard(shard).get_many([ids[position] for position in positions])
+            for position, row in zip(positions, found):
+                rows[position] = row
+        return rows
+
+    def _shard_signature(self, shard: int) -> Tuple[int, int, Optional[Tuple[int, int]]]:
+        """(mtime_ns, size) of a shard file and the identity of its delta log."""
+        path = shard_file(self.directory, shard)
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size, delta_identity(default_delta_path(path))
+
+    def _current_bloom(self) -> Tuple[List[Any], Optional[BloomFilter]]:
+        """Build the Bloom filter over every shard's IDs once, or None if it is disabled."""
+        if self._bloom is not None:
+            return self._bloom
+        with self._bloom_lock:
+            if self._bloom is None:
+                signatures: List[Any] = []
+                bloom = None
+                false_positive_rate = settings.get_settings().CUSTOMER_BLOOM_FPR
+                if false_positive_rate > 0:
+                    try:
+                        ids: List[str] = []
+                        for shard in range(self.shard_count):
+                            # Signature first: a shard rewritten while reading is then checked directly
+                            signatures.append(self._shard_signature(shard))
+                            ids.extend(self._read_ids(shard_file(self.directory, shard)))
+                        bloom = build_filter(ids, false_positive_rate, self.directory)
+                    except Exception as e:
+                        logger.warning(f"Could not build customer Bloom filter, opening shards directly: {str(e)}")
+                        signatures, bloom = [], None
+                self._bloom = (signatures, bloom)
+        return self._bloom
+
+    @staticmethod
+    def _read_ids(path: str) -> List[str]:
+        header = encoding.read_csv(path, nrows=0).columns.tolist()
+        id_column = next(column for column in header if normalize_column(column) == 'customer_id')
+        ids = encoding.read_csv(path, usecols=[id_column], dtype=str, keep_default_na=False)[id_column]
+        return ids.str.strip().tolist()
+
+    def contains(self, customer_id: str) -> bool:
+        """Check whether a customer ID exists, rejecting most unknown IDs before opening a shard."""
+        customer_id = str(customer_id).strip()
+        shard = shard_for(customer_id, self.shard_count)
+        signatures, bloom = self._current_bloom()
+        if bloom is not None:
+            signature = self._shard_signature(shard)
+            # Only trusted for shards unchanged since the build and without delta updates
+            if signature[2] is None and signature == signatures[shard]:
+                return filtered_contains(bloom, customer_id, self._shard(shard).contains)
+        return self._shard(shard).contains(customer_id)
+
+    def bloom_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Size and false-positive rates of the directory-wide Bloom filter.
+
+        Returns:
+            Dictionary of statistics, or None if no filter is built
+        """
+        bloom = self._current_bloom()[1]
+        if bloom is None:
+            return None
+        return {**bloom.stats(), **observed_stats()}
+
+    def _non_empty_shards(self):
+        for shard in range(self.shard_count):
+            # Skip header-only shards without parsing them
+            path = shard_file(self.directory, shard)
+            with open(path, 'rb') as f:
+                f.readline()
+                if not f.readline().strip():
+                    continue
+            yield self._shard(shard)
+
+    def first(self) -> Dict[str, Any]:
+        """First row of the lowest-numbered non-empty shard."""
+        for store in self._non_empty_shards():
+            return store.first()
+        raise ValueError("Customer data file contains no data")
+
+    def customer_ids(self) -> List[str]:
+        """All customer IDs, shard by shard (opens every shard)."""
+        ids: List[str] = []
+        for store in self._non_empty_shards():
+            ids.extend(store.customer_ids())
+        return ids
+
+    def frame(self) -> pd.DataFrame:
+        """The whole portfolio as one DataFrame (opens every shard)."""
+        frames = [store.frame() for store in self._non_empty_shards()]
+        if not frames:
+            raise ValueError("Customer data file contains no data")
+        return pd.concat(frames, ignore_index=True)
+
+    def __len__(self) -> int:
+        return len(self.customer_ids())
+
+
+def main() -> None:
+    import argparse
+    from config.config import CUSTOMER_DATA_PATH
+
+    parser = argparse.ArgumentParser(description="Split customer CSV data into hash shards")
+    parser.add_argument('--source', default=CUSTOMER_DATA_PATH, help="Customer CSV file")
+    parser.add_argument('--output', default=None, help="Shard directory (defaults next to the CSV)")
+    parser.add_argument('--shards', type=int, default=64, help="Number of shards")
+    args = parser.parse_args()
+
+    output = split_csv(args.source, args.output or default_shards_path(args.source), args.shards)
+    print(f"Shards written to {output}; set CUSTOMER_DATA_PATH={output} to use them")
+
+
+if __name__ == "__main__":
+    main()
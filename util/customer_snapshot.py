@@ -0,0 +1,301 @@
+"""
+Memory-mapped columnar snapshot of the customer data file.
+
+A snapshot is a directory holding one binary file per column plus a sorted
+customer_id -> row index. Readers memory-map the files, so opening a snapshot
+costs a few syscalls and only the pages of the requested row are touched.
+Every worker on a host shares the same page cache.
+
+Layout:
+    manifest.json          source signature, row count and column kinds
+    <column>.npy           numeric / bool columns
+    <column>.codes.npy     category codes (categories are listed in the manifest)
+    <column>.data          utf-8 bytes of a string column, concatenated
+    <column>.offsets.npy   int64 offsets into <column>.data (n + 1 entries)
+    <column>.null.npy      null mask for a string column
+    _index_ids.data / _index_ids.offsets.npy / _index_rows.npy
+                           customer ids sorted for binary search, with row numbers
+
+Compile with:
+    python -m util.customer_snapshot [--source data/customer_data.csv] [--output DIR]
+"""
+import json
+import logging
+import os
+import shutil
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 3
+MANIFEST_FILE = 'manifest.json'
+
+
+def default_snapshot_path(csv_path: str) -> str:
+    """Snapshot directory used for a CSV file (``data/x.csv`` -> ``data/x.snapshot``)."""
+    return os.path.splitext(csv_path)[0] + '.snapshot'
+
+
+def _write_strings(directory: str, name: str, values: List[Optional[str]]) -> None:
+    """Write a string column as a byte blob plus offsets and a null mask."""
+    null_mask = np.array([value is None for value in values], dtype=bool)
+    encoded = [b'' if value is None else value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+
+    with open(os.path.join(directory, f'{name}.data'), 'wb') as f:
+        f.write(b''.join(encoded))
+    np.save(os.path.join(directory, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(directory, f'{name}.null.npy'), null_mask)
+
+
+def compile_snapshot(frame: pd.DataFrame, signature: Tuple[int, int], output_path: str) -> str:
+    """
+    Write a cleaned customer DataFrame as a columnar snapshot.
+
+    The snapshot is built in a temporary directory and renamed into place, so
+    readers never observe a half-written snapshot.
+
+    Args:
+        frame: Customer DataFrame with lower-cased columns and string customer ids
+        signature: (mtime_ns, size) of the source CSV the frame was parsed from
+        output_path: Snapshot directory to create or replace
+
+    Returns:
+        Path of the written snapshot directory
+    """
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp_path, f'{name}.codes.npy'), series.cat.codes.to_numpy())
+            columns.append({'name': name, 'kind': 'category',
+                            'categories': [str(category) for category in series.cat.categories]})
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            np.save(os.path.join(tmp_path, f'{name}.npy'), series.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric', 'dtype': str(series.dtype)})
+        else:
+            values = [None if pd.isna(value) else str(value) for value in series.tolist()]
+            _write_strings(tmp_path, name, values)
+            columns.append({'name': name, 'kind': 'string'})
+
+    # Sorted id index; first occurrence wins for duplicated ids
+    ids = frame['customer_id']
+    first_occurrence = ~ids.duplicated()
+    unique_ids = ids[first_occurrence].to_numpy(dtype=object)
+    rows = np.flatnonzero(first_occurrence.to_numpy())
+    order = np.argsort(unique_ids, kind='stable')
+    _write_strings(tmp_path, '_index_ids', unique_ids[order].tolist())
+    np.save(os.path.join(tmp_path, '_index_rows.npy'), rows[order].astype(np.int64))
+
+    manifest = {
+        'version': SNAPSHOT_VERSION,
+        'source_mtime_ns': signature[0],
+        'source_size': signature[1],
+        'rows': len(frame),
+        'unique_ids': int(len(rows)),
+        'columns': columns,
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Swap the new snapshot in; the old one is removed afterwards
+    old_path = f"{output_path}.old-{os.getpid()}"
+    if os.path.exists(output_path):
+        os.replace(output_path, old_path)
+    os.replace(tmp_path, output_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    logger.info(f"Compiled customer snapshot with {len(frame)} rows at {output_path}")
+    return output_path
+
+
+class _MappedStrings:
+    """Read-only view over a memory-mapped string column."""
+
+    def __init__(self, directory: str, name: str):
+        self.offsets = np.load(os.path.join(directory, f'{name}.offsets.npy'), mmap_mode='r')
+        self.null_mask = np.load(os.path.join(directory, f'{name}.null.npy'), mmap_mode='r')
+        data_path = os.path.join(directory, f'{name}.data')
+        # np.memmap cannot map an empty file
+        if os.path.getsize(data_path) > 0:
+            self.data = np.memmap(data_path, dtype=np.uint8, mode='r')
+        else:
+            self.data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self.null_mask)
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        if self.null_mask[position]:
+            return None
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.data[start:end].tobytes().decode('utf-8')
+
+    def to_list(self) -> List[Optional[str]]:
+        return [self[position] for position in range(len(self))]
+
+
+class _MappedCategories:
+    """Read-only view over a memory-mapped categorical column."""
+
+    def __init__(self, directory: str, name: str, categories: List[str]):
+        self.codes = np.load(os.path.join(directory, f'{name}.codes.npy'), mmap_mode='r')
+        self.categories = categories
+
+    def __getitem__(self, position: int) -> Optional[str]:
+        code = self.codes[position]
+        return None if code < 0 else self.categories[code]
+
+    def to_categorical(self) -> pd.Categorical:
+        return pd.Categorical.from_codes(np.asarray(self.codes), categories=self.categories)
+
+
+class MappedCustomerSnapshot:
+    """Customer snapshot served from memory-mapped column files."""
+
+    def __init__(self, directory: str, manifest: Dict[str, Any], signature: Tuple[int, int]):
+        self.directory = directory
+        self.signature = signature
+        self.row_count = manifest['rows']
+        self.columns: List[Tuple[str, Any]] = []
+        for column in manifest['columns']:
+            if column['kind'] == 'numeric':
+                values = np.load(os.path.join(directory, f"{column['name']}.npy"), mmap_mode='r')
+            elif column['kind'] == 'category':
+                values = _MappedCategories(directory, column['name'], column['categories'])
+            else:
+                values = _MappedStrings(directory, column['name'])
+            self.columns.append((column['name'], values))
+        self._index_ids = _MappedStrings(directory, '_index_ids')
+        self._index_rows = np.load(os.path.join(directory, '_index_rows.npy'), mmap_mode='r')
+        self._frame: Optional[pd.DataFrame] = None
+        self._customer_ids: Optional[List[str]] = None
+
+    def _row_for(self, customer_id: str) -> Optional[int]:
+        """Binary search the sorted id index."""
+        low, high = 0, len(self._index_ids)
+        while low < high:
+            middle = (low + high) // 2
+            if self._index_ids[middle] < customer_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._index_ids) and self._index_ids[low] == customer_id:
+            return int(self._index_rows[low])
+        return None
+
+    def _decode_row(self, position: int) -> Dict[str, Any]:
+        row = {}
+        for name, values in self.columns:
+            value = values[position]
+            row[name] = value.item() if hasattr(value, 'item') else value
+        return row
+
+    def _decode_rows(self, positions: List[int]) -> List[Dict[str, Any]]:
+        """Decode several rows, gathering each column once."""
+        gathered = []
+        for name, values in self.columns:
+            if isinstance(values, _MappedStrings):
+                gathered.append([values[position] for position in positions])
+            elif isinstance(values, _MappedCategories):
+                codes = np.asarray(values.codes)[positions].tolist()
+                gathered.append([None if code < 0 else values.categories[code] for code in codes])
+            else:
+                gathered.append(np.asarray(values)[positions].tolist())
+        names = [name for name, _ in self.columns]
+        return [dict(zip(names, row)) for row in zip(*gathered)]
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        position = self._row_for(customer_id)
+        return None if position is None else self._decode_row(position)
+
+    def get_many(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        positions = [self._row_for(customer_id) for customer_id in customer_ids]
+        rows = iter(self._decode_rows([position for position in positions if position is not None]))
+        return [None if position is None else next(rows) for position in positions]
+
+    def first(self) -> Dict[str, Any]:
+        return self._decode_row(0)
+
+    def contains(self, customer_id: str) -> bool:
+        return self._row_for(customer_id) is not None
+
+    @property
+    def customer_ids(self) -> List[str]:
+        if self._customer_ids is None:
+            order = np.argsort(self._index_rows, kind='stable')
+            self._customer_ids = [self._index_ids[int(position)] for position in order]
+        return self._customer_ids
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        # Materialised only for callers that really need the whole table
+        if self._frame is None:
+            data = {}
+            for name, values in self.columns:
+                if isinstance(values, _MappedStrings):
+                    data[name] = values.to_list()
+                elif isinstance(values, _MappedCategories):
+                    data[name] = values.to_categorical()
+                else:
+                    data[name] = np.asarray(values)
+            self._frame = pd.DataFrame(data)
+        return self._frame
+
+
+def open_snapshot(directory: str, signature: Tuple[int, int]) -> Optional[MappedCustomerSnapshot]:
+    """
+    Open a snapshot if it exists and was compiled from the given source file version.
+
+    Args:
+        directory: Snapshot directory
+        signature: (mtime_ns, size) of the current source CSV
+
+    Returns:
+        MappedCustomerSnapshot, or None if the snapshot is missing, stale or unreadable
+    """
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != SNAPSHOT_VERSION:
+            logger.warning(f"Ignoring customer snapshot with unsupported version at {directory}")
+            return None
+        if (manifest['source_mtime_ns'], manifest['source_size']) != tuple(signature):
+            logger.warning(f"Customer snapshot at {directory} is stale, falling back to CSV")
+            return None
+        return MappedCustomerSnapshot(directory, manifest, signature)
+    except Exception as e:
+        logger.warning(f"Could not open customer snapshot at {directory}: {str(e)}")
+        return None
+
+
+def main() -> None:
+    import argparse
+    from config.config import CUSTOMER_DATA_PATH
+    from util.customer_store import CustomerStore
+
+    parser = argparse.ArgumentParser(description="Compile customer CSV data into a memory-mapped snapshot")
+    parser.add_argument('--source', default=CUSTOMER_DATA_PATH, help="Customer CSV file")
+    parser.add_argument('--output', default=None, help="Snapshot directory (defaults next to the CSV)")
+    args = parser.parse_args()
+
+    store = CustomerStore(args.source, use_snapshot=False)
+    frame, signature = store.load_frame()
+    output = compile_snapshot(frame, signature, args.output or default_snapshot_path(args.source))
+    print(f"Snapshot written to {output} ({len(frame)} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Process-wide customer repository.
+
+The customer CSV is parsed once per process and indexed by customer_id, so
+every lookup is a dict hit instead of a full parse and scan. The file is
+re-read only when its mtime or size changes. Rows are cleaned against
+util.customer_schema once at load time.
+
+If a compiled snapshot (see util.customer_snapshot) matches the CSV on disk,
+it is memory-mapped instead of parsing the CSV at all.
+
+With a watcher running (see start_watcher), reloads happen on a background
+thread: the new index is built off the request path and swapped in with a
+single reference assignment, so requests never stat the file or wait on a
+rebuild, and a caller holding a snapshot keeps a consistent view.
+
+Updates appended to the delta log (see util.customer_delta) are applied on
+top of the base data incrementally; only new log lines are read on each
+refresh. With DELTA_COMPACT_SECONDS set, the log is periodically folded
+back into the CSV.
+
+Opening a compiled snapshot also builds a Bloom filter over its customer IDs
+(see util.bloom_filter), so contains() rejects most unknown IDs without a
+search of the mapped index. CUSTOMER_BLOOM_FPR sets its target
+false-positive rate.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+
+import pandas as pd
+
+from config import settings
+from config.config import (
+    CUSTOMER_DATA_PATH, CUSTOMER_DATA_WATCH, CUSTOMER_DATA_POLL_SECONDS, DELTA_COMPACT_SECONDS,
+    CUSTOMER_SHARD_CACHE_SIZE
+)
+from util import encoding, metrics
+from util.bloom_filter import BloomFilter, build_filter, filtered_contains, observed_stats
+from util.customer_schema import clean_customer_frame, read_csv_options
+from util.customer_delta import (
+    CustomerView, compact, default_delta_path, delta_identity, load_view, refresh_view
+)
+from util.customer_snapshot import compile_snapshot, default_snapshot_path, open_snapshot
+from util.file_watcher import FileWatcher
+
+logger = logging.getLogger(__name__)
+
+
+class _CustomerSnapshot:
+    """Immutable view of one parsed version of the customer file."""
+
+    def __init__(self, frame: pd.DataFrame, signature: Tuple[int, int]):
+        self.frame = frame
+        self.signature = signature
+
+        ids = frame['customer_id']
+        first_occurrence = ~ids.duplicated()
+        # Keep the first row for duplicated ids, matching the old iloc[0] behaviour
+        self.index: Dict[str, int] = dict(zip(ids[first_occurrence], frame.index[first_occurrence]))
+        self.customer_ids: List[str] = ids[first_occurrence].tolist()
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        position = self.index.get(customer_id)
+        return None if position is None else self.frame.iloc[position].to_dict()
+
+    def get_many(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        positions = [self.index.get(customer_id) for customer_id in customer_ids]
+        found = [position for position in positions if position is not None]
+        rows = iter(self.frame.iloc[found].to_dict('records'))
+        return [None if position is None else next(rows) for position in positions]
+
+    def first(self) -> Dict[str, Any]:
+        return self.frame.iloc[0].to_dict()
+
+    def contains(self, customer_id: str) -> bool:
+        return customer_id in self.index
+
+
+class CustomerStore:
+    """Customer data loaded once and keyed by customer_id for O(1) lookups."""
+
+    # A file with a header but no rows is an error unless a subclass allows it
+    allow_empty = False
+
+    def __init__(self, path: str = CUSTOMER_DATA_PATH, use_snapshot: bool = True):
+        self.path = path
+        self.snapshot_path = default_snapshot_path(path) if use_snapshot else None
+        self.delta_path = default_delta_path(path)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CustomerView] = None
+        self._bloom: Tuple[Any, Optional[BloomFilter]] = (None, None)
+        self._watcher: Optional[FileWatcher] = None
+        self._compactor: Optional[threading.Thread] = None
+
+    def _file_signature(self) -> Tuple[int, int]:
+        """Return (mtime_ns, size) of the data file; raises FileNotFoundError if missing."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Customer data file not found at {self.path}")
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_frame(self) -> pd.DataFrame:
+        """Parse the CSV file and clean it in one vectorized pass."""
+        try:
+            # Read only the schema columns, with schema dtypes
+            header = encoding.read_csv(self.path, nrows=0).columns.tolist()
+            df = encoding.read_csv(self.path, **read_csv_options(header))
+        except pd.errors.EmptyDataError:
+            raise ValueError("Customer data file is empty")
+        except Exception as e:
+            raise ValueError(f"Error reading CSV file: {str(e)}")
+
+        if df.empty and not self.allow_empty:
+            raise ValueError("Customer data file contains no data")
+
+        df = clean_customer_frame(df)
+
+        if 'customer_id' not in df.columns:
+            raise ValueError("'customer_id' column not found in the data file")
+
+        return df.reset_index(drop=True)
+
+    def load_frame(self) -> Tuple[pd.DataFrame, Tuple[int, int]]:
+        """Parse the CSV file, returning the frame and the file signature it was read at."""
+        signature = self._file_signature()
+        return self._read_frame(), signature
+
+    def _load_base(self, signature: Tuple[int, int]):
+        """Open the compiled snapshot if it is current, otherwise parse the CSV."""
+        if self.snapshot_path:
+            snapshot = open_snapshot(self.snapshot_path, signature)
+            if snapshot is not None:
+                logger.info(f"Opened customer snapshot at {self.snapshot_path}")
+                return snapshot
+        snapshot = _CustomerSnapshot(self._read_frame(), signature)
+        logger.info(f"Loaded {len(snapshot.frame)} customer rows from {self.path}")
+        return snapshot
+
+    def _build_bloom(self, base) -> Optional[BloomFilter]:
+        """Build the Bloom filter over a base snapshot's IDs, or None if it is disabled."""
+        false_positive_rate = settings.get_settings().CUSTOMER_BLOOM_FPR
+        if false_positive_rate <= 0 or isinstance(base, _CustomerSnapshot):
+            # A parsed CSV is indexed by a dict, which already beats the filter
+            return None
+        try:
+            return build_filter(base.customer_ids, false_positive_rate, self.path)
+        except Exception as e:
+            logger.warning(f"Could not build customer Bloom filter, checking the index directly: {str(e)}")
+            return None
+
+    def _load(self, signature: Tuple[int, int]) -> CustomerView:
+        """Load the base data, rebuild its Bloom filter and apply the whole delta log on top."""
+        base = self._load_base(signature)
+        # Paired with its base: a reader still on the previous view skips the filter
+        self._bloom = (base, self._build_bloom(base))
+        return load_view(base, self.delta_path)
+
+    def _delta_changed(self, view: CustomerView) -> bool:
+        identity = delta_identity(self.delta_path)
+        if identity is None:
+            return view.delta_ino is not None
+        return identity != (view.delta_ino, view.delta_offset)
+
+    def _refresh_delta(self, view: CustomerView) -> CustomerView:
+        """Apply new delta lines to a view, recording how long it took."""
+        started = time.perf_counter()
+        refreshed = refresh_view(view, self.delta_path)
+        if refreshed is not view:
+            metrics.increment('customer_store.delta_applies')
+            metrics.observe('customer_store.delta_apply_seconds', time.perf_counter() - started)
+        return refreshed
+
+    def _current(self) -> CustomerView:
+        """Return the view for the files on disk, reloading or applying the delta if they changed."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._watcher is not None:
+            # The watcher keeps the snapshot fresh; never touch the disk here
+            return snapshot
+
+        signature = self._file_signature()
+        if snapshot is not None and snapshot.signature == signature and not self._delta_changed(snapshot):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.signature != signature:
+                snapshot = self._load(signature)
+                self._snapshot = snapshot
+            elif self._delta_changed(snapshot):
+                snapshot = self._refresh_delta(snapshot)
+                self._snapshot = snapshot
+        return snapshot
+
+    def reload(self) -> bool:
+        """
+        Rebuild the index if the file changed and swap it in atomically.
+
+        If only the delta log changed, just the new log lines are applied.
+        Readers are not blocked while the new index is built; they keep
+        using the previous snapshot until the swap.
+
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        with self._lock:
+            started = time.perf_counter()
+            try:
+                signature = self._file_signature()
+                current = self._snapshot
+                if current is not None and current.signature == signature:
+                    snapshot = self._refresh_delta(current)
+                    self._snapshot = snapshot
+                    return snapshot is not current
+                snapshot = self._load(signature)
+            except Exception as e:
+                metrics.increment('customer_store.reload_errors')
+                logger.error(f"Customer data reload failed, keeping previous data: {str(e)}")
+                return False
+
+            self._snapshot = snapshot
+            metrics.increment('customer_store.reloads')
+            metrics.observe('customer_store.reload_seconds', time.perf_counter() - started)
+            # Time from the file being written to the new data being served
+            metrics.observe('customer_store.reload_lag_seconds', max(0.0, time.time() - signature[0] / 1e9))
+            return True
+
+    def start_watcher(self, interval: float) -> None:
+        """Load the data now and keep it fresh from a background watcher thread."""
+        if self._watcher is not None:
+            return
+        self._current()
+        self._watcher = FileWatcher(
+            [self.path, self.delta_path], lambda _path: self.reload(), interval=interval,
+            name='customer-data-watcher'
+        ).start()
+
+    def compact(self, blocking: bool = True) -> bool:
+        """
+        Fold the delta log into the base CSV (and snapshot, if one is compiled).
+
+        Args:
+            blocking: Wait for concurrent writers; if False, skip when the log is locked
+
+        Returns:
+            True if compaction ran
+        """
+        try:
+            with metrics.timed('customer_store.compact_seconds'):
+                compacted = compact(self.path, self.delta_path, blocking=blocking)
+                if compacted and self.snapshot_path and os.path.isdir(self.snapshot_path):
+                    compile_snapshot(self._read_frame(), self._file_signature(), self.snapshot_path)
+        except Exception as e:
+            metrics.increment('customer_store.compact_errors')
+            logger.error(f"Customer delta compaction failed: {str(e)}")
+            return False
+
+        if compacted:
+            metrics.increment('customer_store.compactions')
+            self.reload()
+        return compacted
+
+    def start_compactor(self, interval: float) -> None:
+        """Compact the delta log every interval seconds from a background thread."""
+        if self._compactor is not None:
+            return
+
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                # Several processes may share the log; only one compacts at a time
+                self.compact(blocking=False)
+
+        self._compactor = threading.Thread(target=run, name='customer-delta-compactor', daemon=True)
+        self._compactor.start()
+
+    def snapshot(self):
+        """Current snapshot; hold on to it for a consistent view across several reads."""
+        return self._current()
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the raw row for a customer.
+
+        Args:
+            customer_id: Customer ID to look up
+
+        Returns:
+            Row as a dictionary, or None if the customer does not exist
+        """
+        return self._current().get(str(customer_id).strip())
+
+    def get_many(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Get the raw rows for many customers in one pass.
+
+        Args:
+            customer_ids: Customer IDs to look up
+
+        Returns:
+            Rows in the same order as customer_ids, None where a customer does not exist
+        """
+        return self._current().get_many([str(customer_id).strip() for customer_id in customer_ids])
+
+    def first(self) -> Dict[str, Any]:
+        """Get the first row in the file."""
+        return self._current().first()
+
+    def contains(self, customer_id: str) -> bool:
+        """Check whether a customer ID exists, rejecting most unknown IDs with the Bloom filter."""
+        customer_id = str(customer_id).strip()
+        view = self._current()
+        base, bloom = self._bloom
+        if bloom is not None and base is view.base and customer_id not in view.upserts:
+            return filtered_contains(bloom, customer_id, view.contains)
+        return view.contains(customer_id)
+
+    def bloom_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Size and false-positive rates of the Bloom filter.
+
+        The expected rate is the filter's own estimate; the observed rate is
+        measured across every customer store in the process.
+
+        Returns:
+            Dictionary of statistics, or None if no filter is built
+        """
+        self._current()
+        bloom = self._bloom[1]
+        if bloom is None:
+            return None
+        return {**bloom.stats(), **observed_stats()}
+
+    def customer_ids(self) -> List[str]:
+        """Get unique customer IDs in file order."""
+        return list(self._current().customer_ids)
+
+    def frame(self) -> pd.DataFrame:
+        """Get the full customer DataFrame (shared, do not mutate)."""
+        return self._current().frame
+
+    def __len__(self) -> int:
+        return len(self._current().customer_ids)
+
+
+_stores: Dict[str, CustomerStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_customer_store(path: str = CUSTOMER_DATA_PATH):
+    """Get the process-wide customer store for a data file or shard directory."""
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None and os.path.isdir(path):
+                from util.customer_shards import ShardedCustomerStore
+                store = ShardedCustomerStore(path, cache_size=CUSTOMER_SHARD_CACHE_SIZE)
+                _stores[path] = store
+            elif store is None:
+                store = CustomerStore(path)
+                if CUSTOMER_DATA_WATCH:
+                    try:
+                        store.start_watcher(CUSTOMER_DATA_POLL_SECONDS)
+                    except Exception as e:
+                        # Fall back to checking the file on each access
+                        logger.warning(f"Could not start customer data watcher: {str(e)}")
+                if DELTA_COMPACT_SECONDS > 0:
+                    store.start_compactor(DELTA_COMPACT_SECONDS)
+                _stores[path] = store
+    return store
@@ -0,0 +1,94 @@
+"""
+File encoding detection shared by the CSV loaders.
+
+The encoding is sniffed once from a bounded prefix of the file and cached
+against the file's identity (inode, mtime, size), so a non-UTF-8 file is
+parsed once with the right encoding instead of failing a full UTF-8 parse
+on every load. Files (versions) detected as latin-1 are counted in
+util.metrics under 'encoding.latin1_files'; a read that failed as UTF-8
+past the sniffed prefix and had to be redone as latin-1 is counted under
+'encoding.latin1_fallback'.
+"""
+import codecs
+import logging
+import os
+import threading
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from util import metrics
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 64 * 1024
+FALLBACK_ENCODING = 'latin-1'
+
+_cache: Dict[str, Tuple[Tuple[int, int, int], str]] = {}
+_cache_lock = threading.Lock()
+
+
+def _file_identity(path: str) -> Tuple[int, int, int]:
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _sniff(path: str) -> str:
+    with open(path, 'rb') as f:
+        prefix = f.read(SNIFF_BYTES)
+    if prefix.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # final=False tolerates a multi-byte character cut at the prefix boundary
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+def _remember(path: str, identity: Tuple[int, int, int], encoding: str) -> None:
+    with _cache_lock:
+        _cache[os.path.abspath(path)] = (identity, encoding)
+    if encoding == FALLBACK_ENCODING:
+        metrics.increment('encoding.latin1_files')
+        logger.info(f"Using {FALLBACK_ENCODING} encoding for {path}")
+
+
+def detect_encoding(path: str) -> str:
+    """
+    Get the encoding to read a file with.
+
+    Args:
+        path: File path
+
+    Returns:
+        'utf-8', 'utf-8-sig' or 'latin-1'
+    """
+    identity = _file_identity(path)
+    cached = _cache.get(os.path.abspath(path))
+    if cached is not None and cached[0] == identity:
+        metrics.increment('encoding.cache_hit')
+        return cached[1]
+
+    encoding = _sniff(path)
+    metrics.increment('encoding.sniffed')
+    _remember(path, identity, encoding)
+    return encoding
+
+
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
+    """
+    pd.read_csv with the detected encoding.
+
+    If invalid UTF-8 turns up past the sniffed prefix, the file is re-read
+    as latin-1 once and that decision is cached for the file.
+    """
+    encoding = detect_encoding(path)
+    try:
+        return pd.read_csv(path, encoding=encoding, **kwargs)
+    except UnicodeDecodeError:
+        if encoding == FALLBACK_ENCODING:
+            raise
+        metrics.increment('encoding.latin1_fallback')
+        _remember(path, _file_identity(path), FALLBACK_ENCODING)
+        return pd.read_csv(path, encoding=FALLBACK_ENCODING, **kwargs)
@@ -0,0 +1,59 @@
+"""
+Persistent background event loop.
+
+Agent runs used to spin up (and tear down) a fresh event loop per message,
+which also threw away the model client's open connections. Coroutines
+submitted here all run on one long-lived loop in a daemon thread, so
+connection pools and other loop-bound resources survive between calls.
+
+Blocking work called from a coroutine (file reads, parsing) should go
+through run_blocking, which runs it on a bounded thread pool of
+DATA_EXECUTOR_WORKERS threads instead of stalling every coroutine on the loop.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional
+
+from config import config
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+_blocking_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Get the process-wide background loop, starting it on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='agent-event-loop', daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro: Awaitable[Any]) -> Future:
+    """Schedule a coroutine on the background loop and return a concurrent Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and wait for its result."""
+    return submit(coro).result(timeout)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Await a blocking call run on the bounded data executor."""
+    global _blocking_executor
+    if _blocking_executor is None:
+        with _loop_lock:
+            if _blocking_executor is None:
+                _blocking_executor = ThreadPoolExecutor(max_workers=config.DATA_EXECUTOR_WORKERS,
+                                                        thread_name_prefix='data-io')
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor, functools.partial(func, *args, **kwargs))
@@ -0,0 +1,120 @@
+"""
+Background file watcher.
+
+Calls a callback whenever one of a set of files changes (mtime, size or
+inode). On Linux the watched directories are registered with inotify so
+changes are picked up immediately; elsewhere, or if inotify is unavailable,
+the files are polled. Polling also runs as a safety net at every timeout.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+
+# Let a burst of writes settle before re-reading the file
+_SETTLE_SECONDS = 0.2
+
+
+def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _open_inotify(directories: List[str]) -> Optional[int]:
+    """Return an inotify fd watching the directories, or None if unsupported."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            return None
+        for directory in directories:
+            if libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK) < 0:
+                os.close(fd)
+                return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class FileWatcher:
+    """Daemon thread calling on_change(path) when a watched file changes."""
+
+    def __init__(self, paths: List[str], on_change: Callable[[str], None], interval: float = 5.0,
+                 name: str = 'file-watcher'):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.interval = interval
+        self._signatures: Dict[str, Optional[Tuple[int, int, int]]] = {
+            path: _signature(path) for path in self.paths
+        }
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._inotify_fd: Optional[int] = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify_fd is not None
+
+    def start(self) -> 'FileWatcher':
+        directories = sorted({os.path.dirname(path) for path in self.paths})
+        self._inotify_fd = _open_inotify(directories)
+        self._thread.start()
+        logger.info(f"Watching {self.paths} ({'inotify' if self.uses_inotify else 'polling'})")
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _wait_for_event(self) -> None:
+        if self._inotify_fd is None:
+            self._stop.wait(self.interval)
+            return
+        readable, _, _ = select.select([self._inotify_fd], [], [], self.interval)
+        if readable:
+            self._stop.wait(_SETTLE_SECONDS)
+            try:
+                # Drain the queue; we re-check signatures rather than parse events
+                while os.read(self._inotify_fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def _check(self) -> None:
+        for path in self.paths:
+            signature = _signature(path)
+            if signature != self._signatures[path]:
+                self._signatures[path] = signature
+                try:
+                    self.on_change(path)
+                except Exception as e:
+                    logger.error(f"Error handling change of {path}: {str(e)}")
+
+    def _run(self) -> None:
+        try:
+            while not self._stop.is_set():
+                self._wait_for_event()
+                if not self._stop.is_set():
+                    self._check()
+        finally:
+            if self._inotify_fd is not None:
+                os.close(self._inotify_fd)
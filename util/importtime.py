@@ -0,0 +1,156 @@
+"""
+Cold-import time check for the Streamlit entry points.
+
+Each target is imported in a fresh interpreter started with
+``python -X importtime`` and the reported cumulative times are summed:
+
+    anaya.py, app.py   the script's top-level imports (the script itself
+                       renders UI, so only its imports are run)
+    aiAgents           every module in the package
+
+Modules named with --preload (streamlit by default, which the Streamlit
+server has already loaded before it runs a script) are imported first and
+left out of the total. The check fails when a target exceeds the budget:
+
+    python -m util.importtime [--budget-ms 300] [--repeat 3] [targets ...]
+"""
+import ast
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TARGETS = ['anaya.py', 'app.py', 'aiAgents']
+DEFAULT_PRELOAD = ['streamlit']
+
+_MARKER = '-- importtime: measured imports start --'
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+
+
+def script_imports(path: str) -> List[str]:
+    """Source of the top-level import statements of a script."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    tree = ast.parse(source, filename=path)
+    return [
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def package_imports(directory: str) -> List[str]:
+    """Import statements for every module of a package directory."""
+    package = os.path.relpath(directory, ROOT).replace(os.sep, '.')
+    statements = [f"import {package}"]
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py') and name != '__init__.py':
+            statements.append(f"import {package}.{name[:-3]}")
+    return statements
+
+
+def target_imports(target: str) -> List[str]:
+    """Import statements to time for a script, package directory or dotted module name."""
+    path = os.path.join(ROOT, target)
+    if os.path.isdir(path):
+        return package_imports(path)
+    if target.endswith('.py'):
+        return script_imports(path)
+    return [f"import {target}"]
+
+
+def _program(statements: List[str], preload: List[str]) -> str:
+    lines = ['import sys']
+    for name in preload:
+        lines.append(f"try:\n    import {name}\nexcept ImportError:\n    pass")
+    lines.append(f"sys.stderr.write({_MARKER!r} + '\\n')")
+    lines.append('sys.stderr.flush()')
+    lines.extend(statements)
+    return '\n'.join(lines)
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Parse ``-X importtime`` output after the marker line.
+
+    Returns:
+        Total cumulative milliseconds of the top-level imports, and self
+        milliseconds summed per top-level package
+    """
+    total_us = 0
+    packages: Dict[str, float] = {}
+    lines = stderr.splitlines()
+    if _MARKER in lines:
+        lines = lines[lines.index(_MARKER) + 1:]
+    for line in lines:
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # One space after the separator, then two per nesting level
+        if len(indent) == 1:
+            total_us += int(cumulative_us)
+        root = name.split('.')[0]
+        packages[root] = packages.get(root, 0.0) + int(self_us) / 1000
+    return total_us / 1000, packages
+
+
+def measure(target: str, preload: Optional[List[str]] = None, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Cold-import a target in fresh interpreters and keep the fastest run.
+
+    Returns:
+        Dictionary with target, total_ms, packages (self ms per top-level
+        package) and error (None unless an import failed)
+    """
+    program = _program(target_imports(target), DEFAULT_PRELOAD if preload is None else preload)
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(max(1, repeat)):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', program],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else 'import failed'
+            return {'target': target, 'total_ms': None, 'packages': {}, 'error': error}
+        total_ms, packages = parse_importtime(completed.stderr)
+        if best is None or total_ms < best['total_ms']:
+            best = {'target': target, 'total_ms': total_ms, 'packages': packages, 'error': None}
+    return best
+
+
+def main() -> None:
+    import argparse
+    from config.config import IMPORT_TIME_BUDGET_MS
+
+    parser = argparse.ArgumentParser(description="Check cold-import time of the Streamlit entry points")
+    parser.add_argument('targets', nargs='*', default=DEFAULT_TARGETS,
+                        help="Scripts, package directories or module names (relative to the project root)")
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_TIME_BUDGET_MS, help="Budget per target")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per target; the fastest is kept")
+    parser.add_argument('--preload', nargs='*', default=DEFAULT_PRELOAD,
+                        help="Modules imported before timing starts")
+    parser.add_argument('--top', type=int, default=5, help="Heaviest packages to list per target")
+    args = parser.parse_args()
+
+    failed = False
+    for target in args.targets:
+        result = measure(target, args.preload, args.repeat)
+        if result['error']:
+            failed = True
+            print(f"FAIL  {target}: {result['error']}")
+            continue
+        over = result['total_ms'] > args.budget_ms
+        failed = failed or over
+        print(f"{'FAIL' if over else 'ok  '}  {target}: {result['total_ms']:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        heaviest = sorted(result['packages'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for package, self_ms in heaviest:
+            print(f"        {package:<28} {self_ms:8.1f} ms")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
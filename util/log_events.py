@@ -0,0 +1,135 @@
+"""
+Structured, lazily formatted log events for hot paths.
+
+    events = EventLogger(logger)
+    events.info('customer_loaded', customer_id=customer_id)
+
+writes a JSON message such as {"event": "customer_loaded", "customer_id": "CUST001"}.
+Nothing is built when the level is disabled: the call returns after one
+isEnabledFor check. Events below WARNING can be sampled per logger with
+LOG_SAMPLE_RATES ("util.utils=0.1,aiAgents=0.5"; the longest matching
+logger-name prefix wins), and kept events record the rate they were
+sampled at. Audit events (sign-ins, sign-outs) use EventLogger(...,
+sample=False) and are never sampled. The JSON is built by the log writer thread (see
+util.log_handlers), not by the caller, so pass values that will not be
+mutated afterwards.
+
+Fields named in LOG_REDACT_FIELDS are replaced with "***" at any nesting
+depth, so whole records can be passed without leaking secrets or contact
+details.
+"""
+import json
+import logging
+import random
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+
+REDACTED = '***'
+
+# (LOG_SAMPLE_RATES, rates by logger name) and (LOG_REDACT_FIELDS, field set), rebuilt when a setting changes
+_sample_rates: Tuple[Optional[str], Dict[str, float]] = (None, {})
+_redact_fields: Tuple[Optional[str], frozenset] = (None, frozenset())
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, rate = item.split('=', 1)
+            try:
+                rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+            except ValueError:
+                continue
+    return rates
+
+
+def sample_rate(logger_name: str) -> float:
+    """Fraction of sub-WARNING events kept for a logger."""
+    global _sample_rates
+    spec = settings.get_settings().LOG_SAMPLE_RATES
+    if spec != _sample_rates[0]:
+        _sample_rates = (spec, {'': 1.0, **_parse_sample_rates(spec)})
+    rates = _sample_rates[1]
+    rate = rates.get(logger_name)
+    if rate is None:
+        name = logger_name
+        while name not in rates:
+            name = name.rpartition('.')[0]
+        rate = rates[name]
+        # Resolved once per logger name
+        rates[logger_name] = rate
+    return rate
+
+
+def redact_fields() -> frozenset:
+    global _redact_fields
+    spec = settings.get_settings().LOG_REDACT_FIELDS
+    if spec != _redact_fields[0]:
+        _redact_fields = (spec, frozenset(name.strip().lower() for name in spec.split(',') if name.strip()))
+    return _redact_fields[1]
+
+
+def redact(value: Any, fields: frozenset) -> Any:
+    """Copy of value with the named fields masked in every nested mapping."""
+    if hasattr(value, 'to_dict'):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return {key: REDACTED if str(key).lower() in fields else redact(item, fields) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+class StructuredMessage:
+    """Log message rendered to JSON only when a handler formats it."""
+
+    __slots__ = ('event', 'fields', 'rate')
+
+    def __init__(self, event: str, fields: Dict[str, Any], rate: float = 1.0):
+        self.event = event
+        self.fields = fields
+        self.rate = rate
+
+    def __str__(self) -> str:
+        payload = {'event': self.event, **redact(self.fields, redact_fields())}
+        if self.rate < 1.0:
+            payload['sample_rate'] = self.rate
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class EventLogger:
+    """Emits structured events through a standard logger with level gating and sampling."""
+
+    __slots__ = ('logger', 'sample')
+
+    def __init__(self, logger: logging.Logger, sample: bool = True):
+        """
+        Args:
+            logger: Logger the events are written to; its name selects the LOG_SAMPLE_RATES entry
+            sample: False to keep every event regardless of LOG_SAMPLE_RATES (audit trails)
+        """
+        self.logger = logger
+        self.sample = sample
+
+    def log(self, level: int, event: str, **fields: Any) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = 1.0
+        if self.sample and level < logging.WARNING:
+            rate = sample_rate(self.logger.name)
+            if rate < 1.0 and random.random() >= rate:
+                return
+        self.logger.log(level, StructuredMessage(event, fields, rate), stacklevel=3)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log(logging.DEBUG, event, **fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log(logging.WARNING, event, **fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log(logging.ERROR, event, **fields)
@@ -0,0 +1,102 @@
+"""
+Non-blocking, bounded application logging.
+
+Loggers only put records on an in-memory queue; a background
+QueueListener thread writes them to the console and to LOG_FILE_PATH, so
+request threads never wait on disk. If the queue is full (the disk cannot
+keep up), new records are dropped and counted in util.metrics as
+'logging.dropped_records' rather than blocking the caller.
+
+The log file rolls over when it reaches LOG_MAX_BYTES or is LOG_ROTATE_SECONDS
+old, whichever comes first, keeping LOG_BACKUP_COUNT numbered backups
+(app.log.1 is the newest), so log volume is bounded.
+
+Structured events (util.log_events) are passed to the writer unformatted, so
+their JSON is built off the calling thread.
+"""
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List
+
+from util import metrics
+from util.log_events import StructuredMessage
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that also rolls over after a fixed interval."""
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, interval: float, encoding: str = 'utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.interval = interval
+        self.rollover_at = self._next_rollover()
+
+    def _next_rollover(self) -> float:
+        # Counted from process start or the last rollover
+        return time.time() + self.interval if self.interval > 0 else float('inf')
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if time.time() >= self.rollover_at:
+            if self.stream is None or self.stream.tell():
+                return True
+            # Nothing written this interval; keep the empty file
+            self.rollover_at = self._next_rollover()
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = self._next_rollover()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking or erroring when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.msg, StructuredMessage) and not record.exc_info:
+            # Not modified here, so queued as is and rendered by the writer thread's formatter
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment('logging.dropped_records')
+
+
+def start_queue_logging(level: str, log_file: str, max_bytes: int, backup_count: int, rotate_seconds: float,
+                        queue_size: int) -> QueueListener:
+    """
+    Route the root logger through a bounded queue to a background writer thread.
+
+    Args:
+        level: Root log level
+        log_file: Log file path
+        max_bytes: Size at which the log file rolls over (0 = no size limit)
+        backup_count: Rotated files kept
+        rotate_seconds: Age at which the log file rolls over (0 = no time limit)
+        queue_size: Records buffered before new ones are dropped
+
+    Returns:
+        The started QueueListener; stop() it to flush on shutdown
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers: List[logging.Handler] = [
+        SizeAndTimeRotatingFileHandler(log_file, max_bytes, backup_count, rotate_seconds),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    # No formatter on the queue side: the listener's handlers format each record once
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DroppingQueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
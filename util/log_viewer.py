@@ -0,0 +1,194 @@
+"""
+Paginated, newest-first reading of the application log and its rotated files.
+
+Pages are read backwards from the end of LOG_FILE_PATH in fixed-size blocks
+and continue into app.log.1, app.log.2, ... (see util.log_handlers), so
+memory use depends on the page size, not on the size of the logs. Level and
+substring filters are applied while reading. A multi-line record (e.g. a
+traceback) is kept together with its header line as one entry.
+
+A page's cursor names the file by inode, so paging keeps working after the
+log rolls over in between.
+"""
+import logging
+import os
+import re
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from config import config
+
+BLOCK_SIZE = 64 * 1024
+# A filtered page stops after scanning this much, so a rare match cannot pin a worker
+SCAN_LIMIT_BYTES = 32 * 1024 * 1024
+# Continuation lines kept per entry
+_MAX_ENTRY_LINES = 500
+# Longer lines are read back in pieces of this size, so one huge line cannot grow the buffer unbounded
+_MAX_LINE_BYTES = 64 * 1024
+
+_HEADER = re.compile(rb' - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - ')
+
+# (inode, offset): older entries end at offset in the file with that inode
+Cursor = Tuple[int, int]
+
+
+class LogPage(NamedTuple):
+    """One page of log entries, newest first."""
+    entries: List[str]
+    # Cursor of the next (older) page, None when the oldest file is exhausted
+    next_cursor: Optional[Cursor]
+    bytes_scanned: int
+
+
+def log_files(path: Optional[str] = None) -> List[str]:
+    """The log file (LOG_FILE_PATH by default) and its rotated backups, newest first."""
+    path = path or config.LOG_FILE_PATH
+    files = [path] if os.path.exists(path) else []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    return files
+
+
+def _reverse_lines(f, end: int, block_size: int) -> Iterator[Tuple[int, bytes]]:
+    """
+    (start offset, line) pairs of the file up to end, last line first.
+
+    A line longer than _MAX_LINE_BYTES is yielded as pieces of that size,
+    last piece first, each counted like a line by the caller's scan budget.
+    """
+    position = end
+    carry = b''
+    while position > 0:
+        size = min(block_size, position)
+        position -= size
+        f.seek(position)
+        block = f.read(size) + carry
+        lines = block.split(b'\n')
+        # The first piece may continue before this block; keep it for the next read
+        carry = lines[0]
+        start = position + len(block)
+        for line in reversed(lines[1:]):
+            start -= len(line) + 1
+            yield start + 1, line
+        while len(carry) > _MAX_LINE_BYTES:
+            piece = carry[-_MAX_LINE_BYTES:]
+            carry = carry[:-_MAX_LINE_BYTES]
+            yield position + len(carry), piece
+    if carry:
+        yield 0, carry
+
+
+def _locate(files: List[str], cursor: Optional[Cursor]) -> Tuple[int, Optional[int]]:
+    """Index of the file a cursor points into and the offset to read back from."""
+    if cursor is None:
+        return 0, None
+    inode, offset = cursor
+    for index, path in enumerate(files):
+        try:
+            if os.stat(path).st_ino == inode:
+                return index, offset
+        except OSError:
+            continue
+    # The file was rotated out of the backups; start over from the newest
+    return 0, None
+
+
+def read_page(path: Optional[str] = None, page_size: int = 200, cursor: Optional[Cursor] = None,
+              min_level: Optional[str] = None, contains: Optional[str] = None,
+              block_size: int = BLOCK_SIZE, scan_limit: int = SCAN_LIMIT_BYTES) -> LogPage:
+    """
+    Read one page of log entries, newest first.
+
+    Args:
+        path: Log file path, LOG_FILE_PATH by default (rotated backups are path.1, path.2, ...)
+        page_size: Maximum entries on the page
+        cursor: next_cursor of the previous page, None for the newest page
+        min_level: Only entries at this level or above (e.g. 'WARNING')
+        contains: Only entries containing this text (case-insensitive)
+        block_size: Bytes read per backwards seek
+        scan_limit: Bytes scanned before returning a partial page
+
+    Returns:
+        LogPage with the entries and the cursor of the next older page
+    """
+    threshold = logging.getLevelName(min_level.upper()) if min_level else None
+    needle = contains.lower().encode('utf-8') if contains else None
+    files = log_files(path)
+    index, offset = _locate(files, cursor)
+
+    entries: List[str] = []
+    scanned = 0
+    first_index = index
+    while index < len(files):
+        try:
+            f = open(files[index], 'rb')
+        except FileNotFoundError:
+            index, offset = index + 1, None
+            continue
+        with f:
+            stat = os.fstat(f.fileno())
+            end = stat.st_size if offset is None else min(offset, stat.st_size)
+            pending: List[bytes] = []
+            # Everything from here to end has been read into entries or filtered out
+            entry_end = end
+            for start, line in _reverse_lines(f, end, block_size):
+                if scanned >= scan_limit and (entries or entry_end < end or index > first_index):
+                    # Out of budget; an entry still being collected is read again on the next page
+                    return LogPage(entries, (stat.st_ino, entry_end), scanned)
+                scanned += len(line) + 1
+                header = _HEADER.search(line)
+                if header is None:
+                    # Continuation of an older header line; collected until it is reached
+                    if line and len(pending) < _MAX_ENTRY_LINES:
+                        pending.append(line)
+                    continue
+                entry_lines = [line] + pending[::-1]
+                pending = []
+                entry_end = start
+                if threshold is not None and logging.getLevelName(header.group(1).decode()) < threshold:
+                    pass
+                elif needle is not None and not any(needle in part.lower() for part in entry_lines):
+                    pass
+                else:
+                    entries.append(b'\n'.join(entry_lines).decode('utf-8', errors='replace'))
+                if len(entries) >= page_size:
+                    return LogPage(entries, (stat.st_ino, start), scanned)
+            if pending:
+                # Lines before the first header in this file
+                entries.append(b'\n'.join(pending[::-1]).decode('utf-8', errors='replace'))
+        index, offset = index + 1, None
+    return LogPage(entries, None, scanned)
+
+
+def render_log_viewer(path: Optional[str] = None, page_size: int = 200, key: str = 'log_viewer') -> None:
+    """Streamlit log viewer with level/substring filters and newer/older paging."""
+    import streamlit as st
+
+    level_column, text_column = st.columns([1, 2])
+    with level_column:
+        level = st.selectbox("Minimum level", ['ALL', 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                             key=f"{key}_level")
+    with text_column:
+        contains = st.text_input("Contains", key=f"{key}_contains")
+
+    # Stack of page cursors; reset whenever the filters change
+    filters = (level, contains)
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        st.session_state[f"{key}_cursors"] = [None]
+    cursors = st.session_state[f"{key}_cursors"]
+
+    page = read_page(path, page_size, cursors[-1], None if level == 'ALL' else level, contains or None)
+    st.text_area("Application Logs", "\n".join(page.entries) or "No matching log entries", height=300)
+    st.caption(f"Page {len(cursors)}, newest first · scanned {page.bytes_scanned / 1024:.0f} KiB")
+
+    newer_column, older_column = st.columns(2)
+    with newer_column:
+        if st.button("⬅ Newer", key=f"{key}_newer", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with older_column:
+        if st.button("Older ➡", key=f"{key}_older", disabled=page.next_cursor is None):
+            cursors.append(page.next_cursor)
+            st.rerun()
@@ -0,0 +1,480 @@
+"""
+Customer and credential lookup daemon.
+
+One daemon per host loads the customer and credential data once and serves
+lookups over a Unix domain socket; web workers running with
+STORAGE_BACKEND=daemon hold no data, only a small pool of connections.
+
+Protocol (all integers big-endian). Every request and response is a frame:
+
+    header   B opcode (request) or status (response), I payload length
+    string   H byte length + UTF-8 bytes (0xFFFF for None)
+    list     I count + items
+    customer B found flag, then the schema's numeric/bool columns packed in
+             one struct followed by its text columns as strings
+    mapping  H count + (key string, value string) pairs
+
+Opcodes take and return:
+
+    GET_CUSTOMERS     list of ids            -> list of customers
+    HAS_CUSTOMERS     list of ids            -> one B flag per id
+    FIRST_CUSTOMER    -                      -> customer
+    CUSTOMER_IDS      -                      -> list of strings
+    GET_CREDENTIALS   username               -> B found flag + mapping
+    AUTHENTICATE      username, password     -> B found flag + mapping
+    CREDENTIALS       -                      -> list of mappings
+    PING              -                      -> -
+
+A non-zero status carries the error message as a string.
+
+Start the daemon with:
+    python -m util.lookup_daemon [--socket data/lookup.sock] [--backend csv]
+"""
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from util.customer_schema import CUSTOMER_SCHEMA
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OP_GET_CUSTOMERS = 1
+OP_HAS_CUSTOMERS = 2
+OP_FIRST_CUSTOMER = 3
+OP_CUSTOMER_IDS = 4
+OP_GET_CREDENTIALS = 5
+OP_AUTHENTICATE = 6
+OP_CREDENTIALS = 7
+OP_PING = 8
+
+STATUS_OK = 0
+# Error statuses map back to the exception type raised by the client
+_ERROR_TYPES = {1: ValueError, 2: FileNotFoundError, 3: RuntimeError}
+_ERROR_STATUS = {error_type: status for status, error_type in _ERROR_TYPES.items()}
+
+# Refuse frames bigger than this rather than trying to allocate them
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+_HEADER = struct.Struct('!BI')
+_COUNT = struct.Struct('!I')
+_STRING_LENGTH = struct.Struct('!H')
+_MAPPING_COUNT = _STRING_LENGTH
+_FLAG = struct.Struct('!B')
+_NONE_LENGTH = 0xFFFF
+
+_NUMERIC_CODES = {'float': 'd', 'int': 'q', 'bool': '?'}
+_NUMERIC_FIELDS = [(name, spec) for name, spec in CUSTOMER_SCHEMA.items() if spec.dtype in _NUMERIC_CODES]
+_TEXT_FIELDS = [(name, spec) for name, spec in CUSTOMER_SCHEMA.items() if spec.dtype not in _NUMERIC_CODES]
+_NUMERIC = struct.Struct('!' + ''.join(_NUMERIC_CODES[spec.dtype] for _, spec in _NUMERIC_FIELDS))
+_NUMERIC_CONVERTERS = {'float': float, 'int': int, 'bool': bool}
+
+
+class _Writer:
+    """Builds a frame payload."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def count(self, value: int) -> None:
+        self.parts.append(_COUNT.pack(value))
+
+    def flag(self, value: bool) -> None:
+        self.parts.append(_FLAG.pack(1 if value else 0))
+
+    def string(self, value: Optional[str]) -> None:
+        if value is None:
+            self.parts.append(_STRING_LENGTH.pack(_NONE_LENGTH))
+            return
+        data = str(value).encode('utf-8')
+        if len(data) >= _NONE_LENGTH:
+            raise ValueError(f"String of {len(data)} bytes is too long for the lookup protocol")
+        self.parts.append(_STRING_LENGTH.pack(len(data)))
+        self.parts.append(data)
+
+    def strings(self, values: List[str]) -> None:
+        self.count(len(values))
+        for value in values:
+            self.string(value)
+
+    def customer(self, row: Optional[Dict[str, Any]]) -> None:
+        self.flag(row is not None)
+        if row is None:
+            return
+        numbers = []
+        for name, spec in _NUMERIC_FIELDS:
+            value = row.get(name)
+            numbers.append(_NUMERIC_CONVERTERS[spec.dtype](spec.default if value is None else value))
+        self.parts.append(_NUMERIC.pack(*numbers))
+        for name, spec in _TEXT_FIELDS:
+            value = row.get(name)
+            self.string(spec.default if value is None else value)
+
+    def mapping(self, data: Optional[Dict[str, Any]]) -> None:
+        self.flag(data is not None)
+        if data is None:
+            return
+        self.parts.append(_MAPPING_COUNT.pack(len(data)))
+        for key, value in data.items():
+            self.string(key)
+            self.string(None if value is None else str(value))
+
+    def payload(self) -> bytes:
+        return b''.join(self.parts)
+
+
+class _Reader:
+    """Reads values from a frame payload."""
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.offset = 0
+
+    def _unpack(self, layout: struct.Struct) -> Tuple:
+        values = layout.unpack_from(self.payload, self.offset)
+        self.offset += layout.size
+        return values
+
+    def count(self) -> int:
+        return self._unpack(_COUNT)[0]
+
+    def flag(self) -> bool:
+        return bool(self._unpack(_FLAG)[0])
+
+    def string(self) -> Optional[str]:
+        length = self._unpack(_STRING_LENGTH)[0]
+        if length == _NONE_LENGTH:
+            return None
+        value = self.payload[self.offset:self.offset + length].decode('utf-8')
+        self.offset += length
+        return value
+
+    def strings(self) -> List[str]:
+        return [self.string() for _ in range(self.count())]
+
+    def customer(self) -> Optional[Dict[str, Any]]:
+        if not self.flag():
+            return None
+        row = dict(zip((name for name, _ in _NUMERIC_FIELDS), self._unpack(_NUMERIC)))
+        for name, _ in _TEXT_FIELDS:
+            row[name] = self.string()
+        return row
+
+    def mapping(self) -> Optional[Dict[str, Any]]:
+        if not self.flag():
+            return None
+        data = {}
+        for _ in range(self._unpack(_MAPPING_COUNT)[0]):
+            key = self.string()
+            data[key] = self.string()
+        return data
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    """Read exactly size bytes; None if the peer closed before the first byte."""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        chunk = sock.recv_into(view[received:], size - received)
+        if chunk == 0:
+            if received == 0:
+                return None
+            raise ConnectionError("Lookup connection closed mid-frame")
+        received += chunk
+    return bytes(buffer)
+
+
+def _send_frame(sock: socket.socket, code: int, payload: bytes) -> None:
+    sock.sendall(_HEADER.pack(code, len(payload)) + payload)
+
+
+def _recv_frame(sock: socket.socket) -> Optional[Tuple[int, bytes]]:
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    code, length = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ConnectionError(f"Lookup frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = _recv_exact(sock, length) if length else b''
+    if payload is None:
+        raise ConnectionError("Lookup connection closed mid-frame")
+    return code, payload
+
+
+class _LookupHandler(socketserver.BaseRequestHandler):
+    """Serves frames on one client connection until it closes."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                frame = _recv_frame(self.request)
+            except (ConnectionError, OSError) as e:
+                logger.warning(f"Dropping lookup connection: {str(e)}")
+                return
+            if frame is None:
+                return
+            opcode, payload = frame
+            try:
+                status, response = STATUS_OK, self.server.dispatch(opcode, _Reader(payload))
+            except Exception as e:
+                status = _ERROR_STATUS.get(type(e), _ERROR_STATUS[RuntimeError])
+                writer = _Writer()
+                writer.string(str(e))
+                response = writer.payload()
+                if status == _ERROR_STATUS[RuntimeError]:
+                    logger.error(f"Lookup request {opcode} failed: {str(e)}")
+            try:
+                _send_frame(self.request, status, response)
+            except OSError as e:
+                logger.warning(f"Could not answer lookup request: {str(e)}")
+                return
+
+
+class LookupServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server answering lookups from an in-process storage backend."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend):
+        self.socket_path = socket_path
+        self.backend = backend
+        self._handlers: Dict[int, Callable[[_Reader], bytes]] = {
+            OP_GET_CUSTOMERS: self._get_customers,
+            OP_HAS_CUSTOMERS: self._has_customers,
+            OP_FIRST_CUSTOMER: self._first_customer,
+            OP_CUSTOMER_IDS: self._customer_ids,
+            OP_GET_CREDENTIALS: self._get_credentials,
+            OP_AUTHENTICATE: self._authenticate,
+            OP_CREDENTIALS: self._credentials,
+            OP_PING: lambda reader: b'',
+        }
+        _remove_stale_socket(socket_path)
+        super().__init__(socket_path, _LookupHandler)
+        # Only this user may connect (credentials pass through the socket)
+        os.chmod(socket_path, 0o600)
+
+    def dispatch(self, opcode: int, reader: _Reader) -> bytes:
+        handler = self._handlers.get(opcode)
+        if handler is None:
+            raise ValueError(f"Unknown lookup opcode {opcode}")
+        return handler(reader)
+
+    def _get_customers(self, reader: _Reader) -> bytes:
+        writer = _Writer()
+        rows = self.backend.get_customers(reader.strings())
+        writer.count(len(rows))
+        for row in rows:
+            writer.customer(row)
+        return writer.payload()
+
+    def _has_customers(self, reader: _Reader) -> bytes:
+        ids = reader.strings()
+        return bytes(1 if self.backend.has_customer(customer_id) else 0 for customer_id in ids)
+
+    def _first_customer(self, reader: _Reader) -> bytes:
+        writer = _Writer()
+        writer.customer(self.backend.first_customer())
+        return writer.payload()
+
+    def _customer_ids(self, reader: _Reader) -> bytes:
+        writer = _Writer()
+        writer.strings(self.backend.customer_ids())
+        return writer.payload()
+
+    def _get_credentials(self, reader: _Reader) -> bytes:
+        writer = _Writer()
+        writer.mapping(self.backend.get_credentials(reader.string()))
+        return writer.payload()
+
+    def _authenticate(self, reader: _Reader) -> bytes:
+        username = reader.string()
+        password = reader.string()
+        writer = _Writer()
+        writer.mapping(self.backend.authenticate(username, password))
+        return writer.payload()
+
+    def _credentials(self, reader: _Reader) -> bytes:
+        df = self.backend.credentials_frame()
+        df = df.drop(columns=[column for column in ('password',) if column in df.columns])
+        df = df.astype(object).where(df.notna(), None)
+        writer = _Writer()
+        records = df.to_dict('records')
+        writer.count(len(records))
+        for record in records:
+            writer.mapping(record)
+        return writer.payload()
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Remove a socket file left by a daemon that exited; refuse if one is still running."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"A lookup daemon is already listening on {socket_path}")
+
+
+class DaemonBackend:
+    """Storage backend forwarding every lookup to the lookup daemon through pooled connections."""
+
+    name = 'daemon'
+
+    def __init__(self, socket_path: str, pool_size: int = 4, timeout: float = 5.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=max(1, pool_size))
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise ConnectionError(
+                f"Lookup daemon not reachable at {self.socket_path} ({str(e)}). "
+                f"Start it with 'python -m util.lookup_daemon'."
+            )
+        return sock
+
+    def _acquire(self) -> socket.socket:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, sock: socket.socket) -> None:
+        try:
+            self._pool.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+    def _call(self, opcode: int, writer: Optional[_Writer] = None) -> _Reader:
+        payload = b'' if writer is None else writer.payload()
+        for attempt in range(2):
+            sock = self._acquire() if attempt == 0 else self._connect()
+            try:
+                _send_frame(sock, opcode, payload)
+                frame = _recv_frame(sock)
+                if frame is None:
+                    raise ConnectionError("Lookup daemon closed the connection")
+            except OSError as e:
+                sock.close()
+                # A pooled connection may predate a daemon restart; retry once on a new one
+                if attempt:
+                    raise ConnectionError(f"Lookup request to {self.socket_path} failed: {str(e)}")
+                continue
+            self._release(sock)
+            status, response = frame
+            reader = _Reader(response)
+            if status != STATUS_OK:
+                raise _ERROR_TYPES.get(status, RuntimeError)(reader.string())
+            return reader
+
+    def get_customer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_customers([customer_id])[0]
+
+    def get_customers(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        writer = _Writer()
+        writer.strings([str(customer_id).strip() for customer_id in customer_ids])
+        reader = self._call(OP_GET_CUSTOMERS, writer)
+        return [reader.customer() for _ in range(reader.count())]
+
+    def first_customer(self) -> Dict[str, Any]:
+        return self._call(OP_FIRST_CUSTOMER).customer()
+
+    def has_customer(self, customer_id: str) -> bool:
+        writer = _Writer()
+        writer.strings([str(customer_id).strip()])
+        return self._call(OP_HAS_CUSTOMERS, writer).payload == b'\x01'
+
+    def customer_ids(self) -> List[str]:
+        return self._call(OP_CUSTOMER_IDS).strings()
+
+    def customer_frame(self) -> 'pd.DataFrame':
+        import pandas as pd
+        ids = self.customer_ids()
+        rows = []
+        for start in range(0, len(ids), 10000):
+            rows.extend(self.get_customers(ids[start:start + 10000]))
+        return pd.DataFrame(rows, columns=list(CUSTOMER_SCHEMA))
+
+    def credentials_frame(self) -> 'pd.DataFrame':
+        import pandas as pd
+        reader = self._call(OP_CREDENTIALS)
+        return pd.DataFrame([reader.mapping() for _ in range(reader.count())])
+
+    def get_credentials(self, username: str) -> Optional[Dict[str, Any]]:
+        writer = _Writer()
+        writer.string(username)
+        return self._call(OP_GET_CREDENTIALS, writer).mapping()
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        writer = _Writer()
+        writer.string(username)
+        writer.string(password)
+        return self._call(OP_AUTHENTICATE, writer).mapping()
+
+    def bloom_stats(self) -> Optional[Dict[str, Any]]:
+        # The filter lives in the daemon process, which logs its stats at start-up and shutdown
+        return None
+
+    def ping(self) -> None:
+        """Round-trip an empty request; raises ConnectionError if the daemon is down."""
+        self._call(OP_PING)
+
+
+def main() -> None:
+    import argparse
+    import signal
+    import sys
+    from config.config import LOOKUP_SOCKET_PATH
+    from util.storage import create_backend
+    from util.utils import init
+
+    parser = argparse.ArgumentParser(description="Serve customer and credential lookups over a Unix socket")
+    parser.add_argument('--socket', default=LOOKUP_SOCKET_PATH, help="Unix socket path")
+    parser.add_argument('--backend', default='csv', choices=['csv', 'sqlite'], help="Where the data is read from")
+    args = parser.parse_args()
+
+    init()
+    backend = create_backend(args.backend)
+    # Parse the data now rather than on the first request
+    backend.customer_ids()
+    backend.get_credentials('')
+
+    server = LookupServer(args.socket, backend)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    logger.info(f"Lookup daemon serving '{backend.name}' data on {args.socket}; "
+                f"customer Bloom filter: {backend.bloom_stats()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Lookup daemon stopped; customer Bloom filter: {backend.bloom_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Lightweight in-process metrics.
+
+Counters and timing summaries kept in memory per process. Thread-safe and
+dependency-free; admins see them under "Metrics" in app.py and anaya.py
+(render_metrics).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_timings: Dict[str, Dict[str, float]] = {}
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Add to a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name: str, seconds: float) -> None:
+    """Record one duration for a timing metric."""
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            _timings[name] = {'count': 1, 'total': seconds, 'max': seconds, 'last': seconds}
+        else:
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['last'] = seconds
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Context manager recording the duration of its block."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+def get_counter(name: str) -> int:
+    return _counters.get(name, 0)
+
+
+def get_metrics() -> Dict[str, Any]:
+    """Snapshot of all counters and timings (timings include the mean)."""
+    with _lock:
+        timings = {
+            name: dict(timing, mean=timing['total'] / timing['count'])
+            for name, timing in _timings.items()
+        }
+        return {'counters': dict(_counters), 'timings': timings}
+
+
+def render_metrics(bloom_stats: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Streamlit tables of the process's counters and timings (admin views).
+
+    Args:
+        bloom_stats: bloom_stats() of the storage backend, shown first if given
+    """
+    import pandas as pd
+    import streamlit as st
+
+    snapshot = get_metrics()
+    st.caption("This worker process since it started")
+    if bloom_stats:
+        st.markdown("**Customer ID Bloom filter**")
+        st.dataframe(pd.DataFrame([bloom_stats]), hide_index=True)
+    counters = pd.DataFrame(sorted(snapshot['counters'].items()), columns=['counter', 'value'])
+    st.dataframe(counters, hide_index=True)
+    timings = pd.DataFrame([
+        {'timing': name, 'count': timing['count'], 'mean_s': round(timing['mean'], 4),
+         'max_s': round(timing['max'], 4), 'last_s': round(timing['last'], 4)}
+        for name, timing in sorted(snapshot['timings'].items())
+    ], columns=['timing', 'count', 'mean_s', 'max_s', 'last_s'])
+    st.dataframe(timings, hide_index=True)
@@ -0,0 +1,327 @@
+"""
+SQLite storage backend for customers and credentials.
+
+Point lookups use indexes on customers.customer_id and credentials.username,
+so they stay fast and memory stays flat however large the portfolio gets.
+Passwords are stored as salted scrypt digests. Each process keeps a small pool of
+read-only connections, and a Bloom filter over the customer IDs (see
+util.bloom_filter) answers most unknown-ID checks without a query.
+
+Build or rebuild the database from the CSV files with:
+    python -m util.sqlite_store [--customers data/customer_data.csv]
+                                [--credentials data/user_credentials.csv]
+                                [--output data/anaya.db]
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator, Tuple
+
+import pandas as pd
+
+from config import settings
+from util import encoding
+from util.bloom_filter import BloomFilter, build_filter, filtered_contains, observed_stats
+from util.credential_index import hash_stored_password, new_salt, verify_stored_password
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 50000
+# Stay under SQLITE_MAX_VARIABLE_NUMBER of older SQLite builds (999)
+_MAX_QUERY_PARAMS = 900
+# How long a reader waits on a pool before checking whether it was replaced
+_POOL_WAIT_SECONDS = 0.5
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series):
+        return 'int'
+    if pd.api.types.is_float_dtype(series):
+        return 'float'
+    return 'text'
+
+
+def import_csvs(customer_path: str, credentials_path: str, db_path: str) -> str:
+    """
+    Bulk import the customer and credential CSVs into a SQLite database.
+
+    The database is built next to the target and renamed into place, so
+    running readers keep a consistent view until they reopen.
+
+    Args:
+        customer_path: Customer CSV file
+        credentials_path: User credentials CSV file
+        db_path: SQLite database to create or replace
+
+    Returns:
+        Path of the written database
+    """
+    from util.customer_store import CustomerStore
+
+    customers, _ = CustomerStore(customer_path, use_snapshot=False).load_frame()
+    credentials = encoding.read_csv(credentials_path, dtype=str)
+    credentials['username'] = credentials['username'].astype(str).str.strip()
+    # A user without a password cannot sign in (as with the in-memory index)
+    credentials = credentials.dropna(subset=['password']).reset_index(drop=True)
+
+    # Store salted scrypt digests only, never the plaintext password; scrypt
+    # releases the GIL, so the digests are computed on all cores
+    salts = [new_salt() for _ in range(len(credentials))]
+    credentials['password_salt'] = salts
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        credentials['password_hash'] = list(executor.map(hash_stored_password, credentials['password'], salts))
+    credentials = credentials.drop(columns=['password'])
+
+    tmp_path = f"{db_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+
+        customers.to_sql('customers', conn, index=False, chunksize=IMPORT_CHUNK_SIZE)
+        credentials.to_sql('credentials', conn, index=False, chunksize=IMPORT_CHUNK_SIZE)
+
+        # Column kinds let readers restore bools that SQLite stores as integers
+        conn.execute("CREATE TABLE column_kinds (table_name TEXT, column_name TEXT, kind TEXT)")
+        conn.executemany(
+            "INSERT INTO column_kinds VALUES (?, ?, ?)",
+            [('customers', name, _column_kind(customers[name])) for name in customers.columns] +
+            [('credentials', name, _column_kind(credentials[name])) for name in credentials.columns]
+        )
+
+        conn.execute("CREATE INDEX idx_customers_customer_id ON customers (customer_id)")
+        conn.execute("CREATE INDEX idx_credentials_username ON credentials (username)")
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    logger.info(f"Imported {len(customers)} customers and {len(credentials)} credentials into {db_path}")
+    return db_path
+
+
+class SqliteBackend:
+    """Storage backend over an indexed SQLite database with a read-only connection pool."""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path: str, pool_size: int = 4):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pool: Optional[queue.LifoQueue] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._bool_columns: Dict[str, List[str]] = {}
+        self._bloom: Optional[BloomFilter] = None
+
+    def _file_signature(self) -> Tuple[int, int, int]:
+        try:
+            stat = os.stat(self.db_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"SQLite database not found at {self.db_path}. Run 'python -m util.sqlite_store' to build it."
+            )
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _current_pool(self) -> queue.LifoQueue:
+        """Return the pool for the database on disk, replacing it after a re-import."""
+        signature = self._file_signature()
+        if self._pool is not None and self._signature == signature:
+            return self._pool
+
+        with self._lock:
+            if self._pool is None or self._signature != signature:
+                pool = queue.LifoQueue(maxsize=self.pool_size)
+                for _ in range(self.pool_size):
+                    pool.put(self._connect())
+
+                conn = pool.get()
+                try:
+                    rows = conn.execute("SELECT table_name, column_name FROM column_kinds WHERE kind = 'bool'")
+                    bool_columns: Dict[str, List[str]] = {}
+                    for row in rows:
+                        bool_columns.setdefault(row['table_name'], []).append(row['column_name'])
+                    bloom = self._build_bloom(conn)
+                finally:
+                    pool.put(conn)
+
+                old_pool = self._pool
+                self._pool, self._signature, self._bool_columns = pool, signature, bool_columns
+                self._bloom = bloom
+                if old_pool is not None:
+                    # Close the idle connections now; ones still in use are closed as they are returned
+                    while True:
+                        try:
+                            old_pool.get_nowait().close()
+                        except queue.Empty:
+                            break
+                logger.info(f"Opened SQLite pool with {self.pool_size} connections to {self.db_path}")
+            return self._pool
+
+    def _build_bloom(self, conn: sqlite3.Connection) -> Optional[BloomFilter]:
+        """Build the Bloom filter over all customer IDs, or None if it is disabled."""
+        false_positive_rate = settings.get_settings().CUSTOMER_BLOOM_FPR
+        if false_positive_rate <= 0:
+            return None
+        try:
+            ids = [row[0] for row in conn.execute("SELECT customer_id FROM customers")]
+            return build_filter(ids, false_positive_rate, self.db_path)
+        except Exception as e:
+            logger.warning(f"Could not build customer Bloom filter, querying directly: {str(e)}")
+            return None
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        while True:
+            pool = self._current_pool()
+            try:
+                # Wake up now and then: a pool retired by a re-import is never refilled
+                conn = pool.get(timeout=_POOL_WAIT_SECONDS)
+            except queue.Empty:
+                continue
+            if pool is self._pool:
+                break
+            # Taken from a pool that was retired meanwhile; use the current one instead
+            conn.close()
+        try:
+            yield conn
+        finally:
+            if pool is self._pool:
+                pool.put(conn)
+            else:
+                conn.close()
+
+    def _to_dict(self, table: str, row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        data = dict(row)
+        for column in self._bool_columns.get(table, []):
+            if data.get(column) is not None:
+                data[column] = bool(data[column])
+        return data
+
+    def get_customer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM customers WHERE customer_id = ? ORDER BY rowid LIMIT 1",
+                (str(customer_id).strip(),)
+            ).fetchone()
+        return self._to_dict('customers', row)
+
+    def get_customers(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        ids = [str(customer_id).strip() for customer_id in customer_ids]
+        found: Dict[str, Dict[str, Any]] = {}
+        unique_ids = list(dict.fromkeys(ids))
+        with self._connection() as conn:
+            for start in range(0, len(unique_ids), _MAX_QUERY_PARAMS):
+                chunk = unique_ids[start:start + _MAX_QUERY_PARAMS]
+                rows = conn.execute(
+                    f"SELECT * FROM customers WHERE customer_id IN ({','.join('?' * len(chunk))}) ORDER BY rowid",
+                    chunk
+                )
+                for row in rows:
+                    # First row wins for duplicated ids, as in get_customer
+                    if row['customer_id'] not in found:
+                        found[row['customer_id']] = self._to_dict('customers', row)
+        return [None if customer_id not in found else dict(found[customer_id]) for customer_id in ids]
+
+    def first_customer(self) -> Dict[str, Any]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM customers ORDER BY rowid LIMIT 1").fetchone()
+        if row is None:
+            raise ValueError("Customer data file contains no data")
+        return self._to_dict('customers', row)
+
+    def _query_customer(self, customer_id: str) -> bool:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM customers WHERE customer_id = ? LIMIT 1",
+                (customer_id,)
+            ).fetchone()
+        return row is not None
+
+    def has_customer(self, customer_id: str) -> bool:
+        customer_id = str(customer_id).strip()
+        self._current_pool()
+        bloom = self._bloom
+        if bloom is not None:
+            return filtered_contains(bloom, customer_id, self._query_customer)
+        return self._query_customer(customer_id)
+
+    def bloom_stats(self) -> Optional[Dict[str, Any]]:
+        """Size and expected/observed false-positive rates of the Bloom filter, or None if disabled."""
+        self._current_pool()
+        if self._bloom is None:
+            return None
+        return {**self._bloom.stats(), **observed_stats()}
+
+    def customer_ids(self) -> List[str]:
+        with self._connection() as conn:
+            rows = conn.execute("SELECT customer_id FROM customers GROUP BY customer_id ORDER BY MIN(rowid)")
+            return [row[0] for row in rows]
+
+    def customer_frame(self) -> pd.DataFrame:
+        with self._connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM customers", conn)
+        for column in self._bool_columns.get('customers', []):
+            df[column] = df[column].astype(bool)
+        return df
+
+    def credentials_frame(self) -> pd.DataFrame:
+        with self._connection() as conn:
+            df = pd.read_sql_query("SELECT * FROM credentials", conn)
+        return df.drop(columns=['password_salt', 'password_hash'])
+
+    def _credential_row(self, username: str) -> Optional[sqlite3.Row]:
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT * FROM credentials WHERE username = ? ORDER BY rowid LIMIT 1",
+                (username,)
+            ).fetchone()
+
+    def get_credentials(self, username: str) -> Optional[Dict[str, Any]]:
+        user_data = self._to_dict('credentials', self._credential_row(username))
+        if user_data is not None:
+            del user_data['password_salt'], user_data['password_hash']
+        return user_data
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        row = self._credential_row(username)
+        if row is None or not verify_stored_password(password, row['password_salt'], row['password_hash']):
+            return None
+        user_data = self._to_dict('credentials', row)
+        del user_data['password_salt'], user_data['password_hash']
+        return user_data
+
+
+def main() -> None:
+    import argparse
+    from config.config import CUSTOMER_DATA_PATH, USER_CREDENTIALS_PATH, SQLITE_DB_PATH
+
+    parser = argparse.ArgumentParser(description="Import customer and credential CSVs into SQLite")
+    parser.add_argument('--customers', default=CUSTOMER_DATA_PATH, help="Customer CSV file")
+    parser.add_argument('--credentials', default=USER_CREDENTIALS_PATH, help="User credentials CSV file")
+    parser.add_argument('--output', default=SQLITE_DB_PATH, help="SQLite database path")
+    args = parser.parse_args()
+
+    output = import_csvs(args.customers, args.credentials, args.output)
+    print(f"SQLite database written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Pluggable storage backends for customer and credential data.
+
+The backend is chosen with STORAGE_BACKEND in config/config.py:
+    csv     customer_data.csv / user_credentials.csv through the in-process store
+    sqlite  indexed SQLite database built by ``python -m util.sqlite_store``
+    daemon  lookups served by ``python -m util.lookup_daemon`` over a Unix socket
+"""
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Any, Optional, List
+
+from config import config
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class CsvBackend:
+    """Storage backend reading the flat CSV files."""
+
+    name = 'csv'
+
+    def __init__(self, customer_path: Optional[str] = None, credentials_path: Optional[str] = None):
+        self.customer_path = customer_path or config.CUSTOMER_DATA_PATH
+        self.credentials_path = credentials_path or config.USER_CREDENTIALS_PATH
+
+    @property
+    def customers(self):
+        # Imported here so selecting a backend does not load pandas
+        from util.customer_store import get_customer_store
+        return get_customer_store(self.customer_path)
+
+    def get_customer(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        return self.customers.get(customer_id)
+
+    def get_customers(self, customer_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return self.customers.get_many(customer_ids)
+
+    def first_customer(self) -> Dict[str, Any]:
+        return self.customers.first()
+
+    def has_customer(self, customer_id: str) -> bool:
+        return self.customers.contains(customer_id)
+
+    def customer_ids(self) -> List[str]:
+        return self.customers.customer_ids()
+
+    def customer_frame(self) -> 'pd.DataFrame':
+        return self.customers.frame()
+
+    def credentials_frame(self) -> 'pd.DataFrame':
+        from util import encoding
+        return encoding.read_csv(self.credentials_path, dtype=str)
+
+    @property
+    def credentials(self):
+        from util.credential_index import get_credential_index
+        return get_credential_index(self.credentials_path)
+
+    def get_credentials(self, username: str) -> Optional[Dict[str, Any]]:
+        return self.credentials.get(username)
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, Any]]:
+        return self.credentials.authenticate(username, password)
+
+    def bloom_stats(self) -> Optional[Dict[str, Any]]:
+        return self.customers.bloom_stats()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name: Optional[str] = None):
+    """Create a storage backend by name ('csv', 'sqlite' or 'daemon'; defaults to STORAGE_BACKEND)."""
+    name = name or config.STORAGE_BACKEND
+    if name == 'csv':
+        return CsvBackend()
+    if name == 'sqlite':
+        from util.sqlite_store import SqliteBackend
+        return SqliteBackend(config.SQLITE_DB_PATH, pool_size=config.SQLITE_POOL_SIZE)
+    if name == 'daemon':
+        from util.lookup_daemon import DaemonBackend
+        return DaemonBackend(config.LOOKUP_SOCKET_PATH, pool_size=config.LOOKUP_POOL_SIZE,
+                             timeout=config.LOOKUP_TIMEOUT_SECONDS)
+    raise ValueError(f"Unknown STORAGE_BACKEND '{name}', expected 'csv', 'sqlite' or 'daemon'")
+
+
+def get_storage_backend():
+    """Get the process-wide storage backend selected in config."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                logger.info(f"Using '{_backend.name}' storage backend")
+    return _backend
@@ -0,0 +1,421 @@
+"""
+Synthetic customer portfolio generator for benchmarking.
+
+Writes a customer CSV with every column of data/customer_data.csv and,
+optionally, a matching credentials CSV. Rows are generated column-wise with
+numpy in fixed-size chunks; chunks are generated and formatted in worker
+processes and written in order, so the output for a given seed does not
+depend on the number of workers.
+
+Values follow simple, tunable distributions (see Distributions): a
+log-normal monthly income, a normal credit score that drives the loan
+history score and interest rate, an offer sized as a multiple of income,
+and an EMI computed from the offer, rate and maximum tenure.
+
+The CSV can also be turned into the binary formats the loaders read: a
+compiled snapshot (util.customer_snapshot), a SQLite database
+(util.sqlite_store) or hash shards (util.customer_shards):
+
+    python -m util.synthetic_data --rows 5000000 [--output data/synthetic_customers.csv]
+                                  [--credentials data/synthetic_credentials.csv]
+                                  [--seed 42] [--distributions dist.json]
+                                  [--snapshot] [--sqlite data/synthetic.db] [--shards 64]
+"""
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Column order and spelling of data/customer_data.csv
+CUSTOMER_COLUMNS = (
+    'customer_id', 'name', 'loan_offer', 'interest_rate', 'minimumTenure', 'maximumTenure', 'emi_amount',
+    'processing_fee', 'foreclosure_charges', 'offer_expiry', 'application_link', 'account_age_years',
+    'is_salary_account', 'avg_monthly_balance', 'credit_score', 'loan_history_score', 'monthly_income',
+    'employment_type', 'job_stability_years', 'is_festive_season', 'has_existing_loans', 'apr',
+)
+CREDENTIAL_COLUMNS = ('username', 'password', 'customer_id', 'email', 'role', 'name')
+
+DEFAULT_CHUNK_ROWS = 200000
+
+_FIRST_NAMES = np.array([
+    'Aarav', 'Aditi', 'Akhilesh', 'Ananya', 'Ankit', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gaurav',
+    'Harini', 'Ishaan', 'Kavya', 'Karan', 'Lakshmi', 'Meera', 'Mohammed', 'Neha', 'Nikhil', 'Pooja',
+    'Priya', 'Rahul', 'Rajesh', 'Ritu', 'Rohan', 'Sameer', 'Sanjana', 'Siddharth', 'Sneha', 'Suresh',
+    'Tanvi', 'Varun', 'Vikram', 'Yash', 'Zoya',
+], dtype=bytes)
+_LAST_NAMES = np.array([
+    'Agarwal', 'Bhat', 'Chatterjee', 'Das', 'Desai', 'Gupta', 'Iyer', 'Jain', 'Joshi', 'Kapoor',
+    'Khan', 'Kulkarni', 'Kumar', 'Menon', 'Mishra', 'Nair', 'Pachauri', 'Patel', 'Pillai', 'Rao',
+    'Reddy', 'Saxena', 'Shah', 'Sharma', 'Singh', 'Sinha', 'Verma', 'Yadav',
+], dtype=bytes)
+_LOWER_FIRST_NAMES = np.char.lower(_FIRST_NAMES)
+_LOWER_LAST_NAMES = np.char.lower(_LAST_NAMES)
+
+
+class Distributions(NamedTuple):
+    """Tunable parameters of the generated portfolio."""
+    income_median: float = 65000.0
+    income_sigma: float = 0.55
+    credit_score_mean: float = 735.0
+    credit_score_sd: float = 55.0
+    # Offer as a multiple of monthly income
+    offer_income_multiple: Tuple[float, float] = (4.0, 15.0)
+    min_offer: float = 50000.0
+    # Rate at a 700 score, change per score point, and the allowed range (% p.a.)
+    base_interest_rate: float = 13.0
+    rate_per_score_point: float = 0.02
+    interest_rate_range: Tuple[float, float] = (9.5, 24.0)
+    processing_fee_rate: Tuple[float, float] = (0.005, 0.02)
+    foreclosure_rate: Tuple[float, float] = (0.002, 0.005)
+    apr_spread: Tuple[float, float] = (0.5, 2.5)
+    minimum_tenures: Tuple[int, ...] = (6, 12, 18, 24)
+    tenure_spans: Tuple[int, ...] = (12, 24, 36)
+    offer_expiry_start: str = '2025-01-01'
+    offer_expiry_days: int = 365
+    salary_account_rate: float = 0.6
+    existing_loans_rate: float = 0.3
+    festive_season_rate: float = 0.2
+    employment_types: Tuple[str, ...] = ('salaried', 'mnc', 'government', 'self_employed', 'business_owner')
+    employment_weights: Tuple[float, ...] = (0.4, 0.25, 0.15, 0.12, 0.08)
+    application_link: str = 'https://uat.mb2.kotak.com/pl/ETB-login'
+    id_prefix: str = 'CUST'
+    id_width: int = 8
+    password: str = '123456'
+
+
+def load_distributions(path: Optional[str]) -> Distributions:
+    """Defaults overridden by a JSON object of Distributions fields."""
+    if not path:
+        return Distributions()
+    with open(path) as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(Distributions._fields)
+    if unknown:
+        raise ValueError(f"Unknown distribution fields: {sorted(unknown)}")
+    return Distributions(**{key: tuple(value) if isinstance(value, list) else value
+                            for key, value in overrides.items()})
+
+
+# Decimal places written for the float columns
+_DECIMALS = {'interest_rate': 2, 'account_age_years': 1, 'job_stability_years': 1, 'apr': 1}
+
+_COMMA = np.full((1, 1), ord(','), dtype=np.uint8)
+_NEWLINE = np.full((1, 1), ord('\n'), dtype=np.uint8)
+
+# Text columns are lists of parts: byte-string arrays, byte constants or digit matrices.
+# Everything is handled as (rows, width) uint8 matrices where a 0 byte is padding,
+# which is what lets a whole chunk be formatted without a per-row Python loop.
+
+
+def _bytes_matrix(values: np.ndarray) -> np.ndarray:
+    """(rows, width) uint8 view of a fixed-width byte-string array."""
+    return values.view(np.uint8).reshape(len(values), values.dtype.itemsize)
+
+
+def _digits(values: np.ndarray, width: Optional[int] = None) -> np.ndarray:
+    """
+    Decimal digits of non-negative integers as a uint8 matrix.
+
+    With a width the numbers are zero-padded to it; without one, leading
+    zeros become padding.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    pad = width is not None
+    if width is None:
+        width = len(str(int(values.max()))) if len(values) else 1
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    digits = (values[:, None] // powers % 10 + ord('0')).astype(np.uint8)
+    if not pad and width > 1:
+        # Blank leading zeros, always keeping the last digit
+        digits[:, :-1][values[:, None] < powers[:-1]] = 0
+    return digits
+
+
+def _text_parts(parts: List[Any], rows: int) -> List[np.ndarray]:
+    matrices = []
+    for part in parts:
+        if isinstance(part, bytes):
+            matrices.append(np.broadcast_to(np.frombuffer(part, dtype=np.uint8), (rows, len(part))))
+        elif part.dtype == np.uint8 and part.ndim == 2:
+            matrices.append(part)
+        else:
+            matrices.append(_bytes_matrix(part))
+    return matrices
+
+
+def _field_matrices(name: str, values: Any, rows: int) -> List[np.ndarray]:
+    """CSV text of one column as uint8 matrices."""
+    if isinstance(values, list):
+        return _text_parts(values, rows)
+    if values.dtype == bool:
+        return [_bytes_matrix(np.where(values, b'TRUE', b'FALSE'))]
+    if values.dtype.kind == 'f':
+        decimals = _DECIMALS[name]
+        scaled = np.round(values * 10 ** decimals).astype(np.int64)
+        return [_digits(scaled // 10 ** decimals), np.broadcast_to(np.uint8(ord('.')), (rows, 1)),
+                _digits(scaled % 10 ** decimals, decimals)]
+    return [_digits(values)]
+
+
+def _csv_bytes(columns: Dict[str, Any], rows: int) -> bytes:
+    """Format generated columns as CSV rows (values never need quoting)."""
+    if rows == 0:
+        return b''
+    matrices = []
+    for name, values in columns.items():
+        if matrices:
+            matrices.append(np.broadcast_to(_COMMA, (rows, 1)))
+        matrices.extend(_field_matrices(name, values, rows))
+    matrices.append(np.broadcast_to(_NEWLINE, (rows, 1)))
+    table = np.hstack(matrices)
+    # Row-major boolean indexing drops the padding and yields the rows back to back
+    return table[table != 0].tobytes()
+
+
+def _strings(parts: List[Any], rows: int) -> np.ndarray:
+    """Join text parts into a str array (for DataFrames)."""
+    table = np.hstack(_text_parts(parts, rows))
+    # Stable sort moves the padding of each row to its end
+    order = np.argsort(table == 0, axis=1, kind='stable')
+    packed = np.ascontiguousarray(np.take_along_axis(table, order, axis=1))
+    return packed.view(f'S{table.shape[1]}').ravel().astype(str)
+
+
+def _generate(start: int, rows: int, seed: int,
+              d: Distributions) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Customer and credential columns for one chunk; text columns are lists of parts."""
+    rng = np.random.default_rng([seed, start])
+
+    numbers = np.arange(start, start + rows, dtype=np.int64)
+    customer_id = [d.id_prefix.encode('utf-8'), _digits(numbers, d.id_width)]
+    first_index = rng.integers(0, len(_FIRST_NAMES), rows)
+    last_index = rng.integers(0, len(_LAST_NAMES), rows)
+    first = _FIRST_NAMES[first_index]
+    last = _LAST_NAMES[last_index]
+
+    income = np.maximum(np.round(rng.lognormal(np.log(d.income_median), d.income_sigma, rows), -2), 10000.0)
+    credit_score = np.clip(np.round(rng.normal(d.credit_score_mean, d.credit_score_sd, rows)), 300, 900).astype(np.int64)
+    history = np.array([b'excellent', b'good', b'average', b'poor'])[np.select(
+        [credit_score >= 800, credit_score >= 720, credit_score >= 650], [0, 1, 2], default=3
+    )]
+    weights = np.asarray(d.employment_weights, dtype=float)
+    employment_types = np.array([value.encode('utf-8') for value in d.employment_types])
+    employment = employment_types[rng.choice(len(weights), rows, p=weights / weights.sum())]
+
+    multiple = rng.uniform(*d.offer_income_multiple, rows)
+    loan_offer = np.maximum(np.round(income * multiple, -4), d.min_offer)
+    rate_noise = rng.normal(0.0, 0.4, rows)
+    interest_rate = np.round(np.clip(
+        d.base_interest_rate - (credit_score - 700) * d.rate_per_score_point + rate_noise,
+        *d.interest_rate_range
+    ), 2)
+    minimum_tenure = np.asarray(d.minimum_tenures)[rng.integers(0, len(d.minimum_tenures), rows)]
+    maximum_tenure = minimum_tenure + np.asarray(d.tenure_spans)[rng.integers(0, len(d.tenure_spans), rows)]
+
+    # Standard amortised EMI at the maximum tenure
+    monthly_rate = interest_rate / 1200
+    growth = np.power(1 + monthly_rate, maximum_tenure)
+    emi = np.round(loan_offer * monthly_rate * growth / (growth - 1))
+
+    expiry = (np.datetime64(d.offer_expiry_start, 'D')
+              + rng.integers(0, max(1, d.offer_expiry_days), rows).astype('timedelta64[D]'))
+
+    customers = {
+        'customer_id': customer_id,
+        'name': [first, b' ', last],
+        'loan_offer': loan_offer.astype(np.int64),
+        'interest_rate': interest_rate,
+        'minimumTenure': minimum_tenure,
+        'maximumTenure': maximum_tenure,
+        'emi_amount': emi.astype(np.int64),
+        'processing_fee': np.round(loan_offer * rng.uniform(*d.processing_fee_rate, rows)).astype(np.int64),
+        'foreclosure_charges': np.round(loan_offer * rng.uniform(*d.foreclosure_rate, rows)).astype(np.int64),
+        'offer_expiry': [expiry.astype('S10')],
+        'application_link': [d.application_link.encode('utf-8')],
+        'account_age_years': np.round(np.minimum(rng.gamma(2.0, 2.5, rows), 40.0), 1),
+        'is_salary_account': rng.random(rows) < d.salary_account_rate,
+        'avg_monthly_balance': np.round(income * rng.uniform(0.1, 1.5, rows), -2).astype(np.int64),
+        'credit_score': credit_score,
+        'loan_history_score': [history],
+        'monthly_income': income.astype(np.int64),
+        'employment_type': [employment],
+        'job_stability_years': np.round(np.minimum(rng.gamma(2.0, 2.0, rows), 35.0), 1),
+        'is_festive_season': rng.random(rows) < d.festive_season_rate,
+        'has_existing_loans': rng.random(rows) < d.existing_loans_rate,
+        'apr': np.round(interest_rate + rng.uniform(*d.apr_spread, rows), 1),
+    }
+
+    username = [_LOWER_FIRST_NAMES[first_index], b'.', _LOWER_LAST_NAMES[last_index], _digits(numbers)]
+    credentials = {
+        'username': username,
+        'password': [d.password.encode('utf-8')],
+        'customer_id': customer_id,
+        'email': username + [b'@example.com'],
+        'role': [b'customer'],
+        'name': [first],
+    }
+    return customers, credentials
+
+
+def generate_chunk(start: int, rows: int, seed: int,
+                   distributions: Distributions = Distributions()) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Generate customers start..start+rows-1 and their credentials.
+
+    The chunk depends only on (seed, start, rows), so chunks can be
+    generated independently and in any order.
+
+    Returns:
+        (customers, credentials) DataFrames with CUSTOMER_COLUMNS and CREDENTIAL_COLUMNS
+    """
+    frames = []
+    for columns in _generate(start, rows, seed, distributions):
+        frames.append(pd.DataFrame({
+            name: _strings(values, rows) if isinstance(values, list) else values
+            for name, values in columns.items()
+        }))
+    return frames[0], frames[1]
+
+
+def _render_chunk(start: int, rows: int, seed: int, distributions: Distributions,
+                  with_credentials: bool) -> Tuple[bytes, bytes]:
+    """Generate a chunk and format it as CSV bytes (runs in a worker process)."""
+    customers, credentials = _generate(start, rows, seed, distributions)
+    return _csv_bytes(customers, rows), _csv_bytes(credentials, rows) if with_credentials else b''
+
+
+def _chunks(rows: int, chunk_rows: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, rows, chunk_rows):
+        yield start, min(chunk_rows, rows - start)
+
+
+def write_portfolio(customers_path: str, rows: int, credentials_path: Optional[str] = None, seed: int = 42,
+                    distributions: Distributions = Distributions(), chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                    workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Write a synthetic customer CSV (and optionally credentials) of the given size.
+
+    Files are written next to their targets and renamed into place.
+
+    Args:
+        customers_path: Customer CSV to create or replace
+        rows: Number of customers
+        credentials_path: Credentials CSV to create or replace, or None to skip
+        seed: Random seed; the same seed and chunk_rows give the same files
+        distributions: Value distributions
+        chunk_rows: Rows generated per chunk
+        workers: Worker processes (None = CPU count, 1 = generate in this process)
+
+    Returns:
+        Dictionary with rows, bytes, seconds and mb_per_second
+    """
+    if rows < 0:
+        raise ValueError("rows must not be negative")
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    outputs = [(customers_path, CUSTOMER_COLUMNS)]
+    if credentials_path:
+        outputs.append((credentials_path, CREDENTIAL_COLUMNS))
+
+    tmp_paths = [f"{path}.tmp-{os.getpid()}" for path, _ in outputs]
+    files = []
+    try:
+        for (path, columns), tmp_path in zip(outputs, tmp_paths):
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            f = open(tmp_path, 'wb', buffering=8 * 1024 * 1024)
+            files.append(f)
+            f.write((','.join(columns) + '\n').encode('utf-8'))
+
+        def write(rendered: Tuple[bytes, bytes]) -> None:
+            for f, data in zip(files, rendered):
+                f.write(data)
+
+        chunks = _chunks(rows, chunk_rows)
+        with_credentials = credentials_path is not None
+        if workers == 1 or rows <= chunk_rows:
+            for start, count in chunks:
+                write(_render_chunk(start, count, seed, distributions, with_credentials))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                in_flight = []
+                for start, count in chunks:
+                    in_flight.append(executor.submit(_render_chunk, start, count, seed, distributions,
+                                                     with_credentials))
+                    # Bound the number of rendered chunks held in memory
+                    if len(in_flight) >= workers * 2:
+                        write(in_flight.pop(0).result())
+                for future in in_flight:
+                    write(future.result())
+    except Exception:
+        for f in files:
+            f.close()
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+
+    size = 0
+    for f, tmp_path, (path, _) in zip(files, tmp_paths, outputs):
+        f.close()
+        size += os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+    seconds = time.perf_counter() - started
+    stats = {
+        'rows': rows,
+        'bytes': size,
+        'seconds': round(seconds, 3),
+        'mb_per_second': round(size / (1024 * 1024) / seconds, 1) if seconds > 0 else None,
+    }
+    logger.info(f"Wrote {rows} synthetic customers to {customers_path}: {stats}")
+    return stats
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic customer portfolio")
+    parser.add_argument('--rows', type=int, default=1000000, help="Number of customers")
+    parser.add_argument('--output', default='data/synthetic_customers.csv', help="Customer CSV file")
+    parser.add_argument('--credentials', default=None, help="Also write a matching credentials CSV")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--distributions', default=None, help="JSON file overriding Distributions fields")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per generated chunk")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--snapshot', action='store_true', help="Also compile a memory-mapped snapshot")
+    parser.add_argument('--sqlite', default=None, help="Also import into this SQLite database (needs --credentials)")
+    parser.add_argument('--shards', type=int, default=None, help="Also split into this many hash shards")
+    args = parser.parse_args()
+
+    if args.sqlite and not args.credentials:
+        parser.error("--sqlite needs --credentials")
+
+    stats = write_portfolio(args.output, args.rows, args.credentials, args.seed,
+                            load_distributions(args.distributions), args.chunk_rows, args.workers)
+    print(f"Wrote {stats['rows']} customers ({stats['bytes'] / (1024 * 1024):.1f} MB) "
+          f"in {stats['seconds']:.2f}s, {stats['mb_per_second']} MB/s")
+
+    if args.snapshot:
+        from util.customer_snapshot import compile_snapshot, default_snapshot_path
+        from util.customer_store import CustomerStore
+        frame, signature = CustomerStore(args.output, use_snapshot=False).load_frame()
+        print(f"Snapshot written to {compile_snapshot(frame, signature, default_snapshot_path(args.output))}")
+    if args.sqlite:
+        from util.sqlite_store import import_csvs
+        print(f"SQLite database written to {import_csvs(args.output, args.credentials, args.sqlite)}")
+    if args.shards:
+        from util.customer_shards import default_shards_path, split_csv
+        print(f"Shards written to {split_csv(args.output, default_shards_path(args.output), args.shards)}")
+
+
+if __name__ == "__main__":
+    main()
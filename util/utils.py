@@ -1,23 +1,71 @@
+import atexit
+import itertools
 import logging
-import pandas as pd
-from typing import Dict, Any, Optional, List
-from config.config import LOG_FILE_PATH, CUSTOMER_DATA_PATH
-import os
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE_PATH),
-        logging.StreamHandler()
-    ]
-)
+import threading
+from typing import Dict, Any, Iterable, Iterator, Optional, List
+from config import config, settings
+from util import event_loop
+from util.customer_record import CustomerRecord
+from util.log_events import EventLogger
+from util.storage import get_storage_backend
+
+# pandas, numpy and the CSV validation pool are imported on first use, so
+# importing this module (and the Streamlit entry points) stays cheap.
 
 logger = logging.getLogger(__name__)
+events = EventLogger(logger)
+
+_init_lock = threading.Lock()
+_initialized = False
+_log_listener = None
+
+
+def configure_logging() -> None:
+    """
+    Send log records to LOG_FILE_PATH and the console through a background writer.
 
+    Logging calls only enqueue the record; the file rolls over by size and
+    age (see util.log_handlers).
+    """
+    global _log_listener
+    from util.log_handlers import start_queue_logging
+    current = settings.get_settings()
+    _log_listener = start_queue_logging(
+        current.LOG_LEVEL, config.LOG_FILE_PATH,
+        max_bytes=current.LOG_MAX_BYTES,
+        backup_count=current.LOG_BACKUP_COUNT,
+        rotate_seconds=current.LOG_ROTATE_SECONDS,
+        queue_size=current.LOG_QUEUE_SIZE
+    )
+    # Write out queued records on interpreter exit
+    atexit.register(_log_listener.stop)
+
+
+def init() -> None:
+    """
+    Prepare the process: create the data/log directories, configure logging
+    and start watching the settings file.
 
-def load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
+    Entry points call this once at startup; importing modules has no such
+    side effects. Safe to call more than once.
+    """
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        config.ensure_directories()
+        configure_logging()
+        settings.on_change(_apply_log_level)
+        settings.start_watching()
+        _initialized = True
+
+
+def _apply_log_level(old: settings.Settings, new: settings.Settings) -> None:
+    if new.LOG_LEVEL != old.LOG_LEVEL:
+        logging.getLogger().setLevel(new.LOG_LEVEL)
+
+
+def load_customer_data(customer_id: Optional[str] = None) -> CustomerRecord:
     """
     Load customer data from CSV file with proper validation and cleaning.
 
@@ -25,7 +73,7 @@ def load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
         customer_id: Optional customer ID to filter data
 
     Returns:
-        Dict containing cleaned customer data
+        CustomerRecord with the cleaned customer data
 
     Raises:
         FileNotFoundError: If CSV file doesn't exist
@@ -33,66 +81,32 @@ def load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
         Exception: For other data loading errors
     """
     try:
-        # Check if file exists
-        if not os.path.exists(CUSTOMER_DATA_PATH):
-            raise FileNotFoundError(f"Customer data file not found at {CUSTOMER_DATA_PATH}")
-
-        # Read CSV file with error handling
-        try:
-            df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='utf-8')
-            logger.info(f"Successfully loaded CSV file with {len(df)} rows")
-        except pd.errors.EmptyDataError:
-            raise ValueError("Customer data file is empty")
-        except UnicodeDecodeError:
-            # Try with different encoding if UTF-8 fails
-            try:
-                df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='latin-1')
-                logger.info(f"Successfully loaded CSV file with latin-1 encoding, {len(df)} rows")
-            except Exception as e:
-                raise ValueError(f"Error reading CSV file with multiple encodings: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error reading CSV file: {str(e)}")
-
-        # Validate dataframe
-        if df.empty:
-            raise ValueError("Customer data file contains no data")
-
-        # Clean column names (remove extra spaces, convert to lowercase)
-        df.columns = df.columns.str.strip().str.lower()
-
-        # Log column information for debugging
-        logger.info(f"Available columns: {list(df.columns)}")
-
-        # Check if customer_id column exists
-        if 'customer_id' not in df.columns:
-            raise ValueError("'customer_id' column not found in the data file")
+        backend = get_storage_backend()
 
         if customer_id:
             # Convert customer_id to string for consistent comparison
             customer_id = str(customer_id).strip()
-            df['customer_id'] = df['customer_id'].astype(str).str.strip()
 
-            customer_data = df[df['customer_id'] == customer_id]
-            if customer_data.empty:
-                available_ids = df['customer_id'].unique()[:5]
+            result = backend.get_customer(customer_id)
+            if result is None:
+                available_ids = backend.customer_ids()[:5]
                 raise ValueError(
                     f"Customer ID '{customer_id}' not found. "
-                    f"Available IDs (first 5): {list(available_ids)}"
+                    f"Available IDs (first 5): {available_ids}"
                 )
 
-            result = customer_data.iloc[0].to_dict()
             cleaned_result = _clean_customer_data(result)
-            logger.info(f"Successfully loaded data for customer: {cleaned_result}")
+            events.info('customer_loaded', customer_id=customer_id)
             return cleaned_result
 
         # For demo purposes, return first customer
-        result = df.iloc[0].to_dict()
+        result = backend.first_customer()
         cleaned_result = _clean_customer_data(result)
-        logger.info("Successfully loaded default customer data")
+        events.info('customer_loaded', customer_id=cleaned_result.customer_id, default=True)
         return cleaned_result
 
     except FileNotFoundError:
-        logger.error(f"Customer data file not found at {CUSTOMER_DATA_PATH}")
+        logger.error(f"Customer data file not found at {config.CUSTOMER_DATA_PATH}")
         raise
     except ValueError as e:
         logger.error(f"Data validation error: {str(e)}")
@@ -102,69 +116,83 @@ def load_customer_data(customer_id: Optional[str] = None) -> Dict[str, Any]:
         raise Exception(f"Failed to load customer data: {str(e)}")
 
 
-def _clean_customer_data(data: Dict[str, Any]) -> Dict[str, Any]:
+def load_customers(customer_ids: Iterable[str]) -> Dict[str, CustomerRecord]:
     """
-    Clean customer data by handling NaN values and ensuring proper data types.
+    Load many customers in one batched lookup.
 
     Args:
-        data: Raw customer data dictionary
+        customer_ids: Customer IDs to load; duplicates are loaded once
 
     Returns:
-        Cleaned customer data dictionary
+        Dict of customer_id to CustomerRecord in input order; IDs that are
+        not found are left out (and counted in the log)
+
+    Raises:
+        FileNotFoundError: If the customer data doesn't exist
     """
-    cleaned_data = {}
-
-    # Define expected data types and defaults
-    numeric_fields = {
-        'loan_offer': 0.0,
-        'emi_amount': 0.0,
-        'processing_fee': 0.0,
-        'foreclosure_charges': 0.0,
-        'interest_rate': 0.0,
-        'minimumTenure': 0,
-        'maximumTenure': 0,
-        'apr': 0.0
-    }
+    ids = list(dict.fromkeys(str(customer_id).strip() for customer_id in customer_ids))
+    try:
+        rows = get_storage_backend().get_customers(ids)
+    except FileNotFoundError:
+        logger.error(f"Customer data file not found at {config.CUSTOMER_DATA_PATH}")
+        raise
 
-    string_fields = {
-        'name': '',
-        'customer_id': '',
-        'offer_expiry': '',
-        'purpose': '',
-        'application_link': ''
+    customers = {
+        customer_id: CustomerRecord.from_mapping(row)
+        for customer_id, row in zip(ids, rows) if row is not None
     }
+    missing = len(ids) - len(customers)
+    if missing:
+        logger.warning(f"{missing} of {len(ids)} requested customer IDs were not found")
+    return customers
+
+
+def iter_customers(customer_ids: Optional[Iterable[str]] = None,
+                   chunk_size: int = 1000) -> Iterator[List[CustomerRecord]]:
+    """
+    Stream customers in chunks, for batch jobs over the portfolio.
+
+    Each chunk is resolved with a single load_customers lookup, so memory
+    stays bounded by chunk_size however many IDs are requested.
+
+    Args:
+        customer_ids: Customer IDs to load (any iterable, consumed lazily);
+            defaults to every customer
+        chunk_size: Number of customers per chunk
+
+    Yields:
+        Lists of up to chunk_size CustomerRecords; IDs that are not found are skipped
+    """
+    if customer_ids is None:
+        customer_ids = get_storage_backend().customer_ids()
+
+    ids = iter(customer_ids)
+    while True:
+        chunk = list(itertools.islice(ids, chunk_size))
+        if not chunk:
+            return
+        customers = load_customers(chunk)
+        if customers:
+            yield list(customers.values())
+
+
+def _clean_customer_data(data: Dict[str, Any]) -> CustomerRecord:
+    """
+    Convert a customer row to a CustomerRecord of native Python types.
 
-    for key, value in data.items():
-        # Handle pandas NaN values
-        if pd.isna(value) or value is None:
-            if key in numeric_fields:
-                cleaned_data[key] = numeric_fields[key]
-            elif key in string_fields:
-                cleaned_data[key] = string_fields[key]
-            else:
-                cleaned_data[key] = ''
-        else:
-            # Convert numpy types to native Python types
-            if hasattr(value, 'item'):  # numpy scalar
-                cleaned_data[key] = value.item()
-            elif key in numeric_fields:
-                # Ensure numeric fields are properly typed
-                try:
-                    if key == 'tenure':
-                        cleaned_data[key] = int(float(value))
-                    else:
-                        cleaned_data[key] = float(value)
-                except (ValueError, TypeError):
-                    logger.warning(f"Could not convert {key}={value} to number, using default")
-                    cleaned_data[key] = numeric_fields[key]
-            elif key in string_fields:
-                # Ensure string fields are properly typed
-                cleaned_data[key] = str(value).strip()
-            else:
-                cleaned_data[key] = value
-
-    # Log the cleaned data for debugging
-    logger.info(f"Cleaned customer data: {cleaned_data}")
+    Missing values, numeric coercion and category encoding are already
+    handled for the whole frame at load time (see util.customer_schema),
+    so this only unwraps numpy scalars and interns categories.
+
+    Args:
+        data: Customer row dictionary
+
+    Returns:
+        CustomerRecord with native Python values
+    """
+    cleaned_data = CustomerRecord.from_mapping(data)
+    # The record is only serialised if debug events of this logger are enabled and sampled
+    events.debug('customer_cleaned', customer=cleaned_data)
     return cleaned_data
 
 
@@ -179,8 +207,8 @@ def format_currency(amount: float) -> str:
         Formatted currency string
     """
     try:
-        # Handle None or NaN values
-        if pd.isna(amount) or amount is None:
+        # Handle None or NaN values (NaN is the only value not equal to itself)
+        if amount is None or amount != amount:
             return "₹0.00"
 
         # Convert to float if it's not already
@@ -205,8 +233,8 @@ def format_percentage(value: float) -> str:
         Formatted percentage string
     """
     try:
-        # Handle None or NaN values
-        if pd.isna(value) or value is None:
+        # Handle None or NaN values (NaN is the only value not equal to itself)
+        if value is None or value != value:
             return "0.0%"
 
         # Convert to float if it's not already
@@ -231,32 +259,10 @@ def get_all_customer_ids() -> List[str]:
         Exception: If unable to load customer data
     """
     try:
-        if not os.path.exists(CUSTOMER_DATA_PATH):
-            raise FileNotFoundError(f"Customer data file not found at {CUSTOMER_DATA_PATH}")
-
-        df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='utf-8')
-
-        # Clean column names
-        df.columns = df.columns.str.strip().str.lower()
-
-        if 'customer_id' not in df.columns:
-            raise ValueError("'customer_id' column not found in the data file")
-
-        customer_ids = df['customer_id'].astype(str).str.strip().unique().tolist()
+        customer_ids = get_storage_backend().customer_ids()
         logger.info(f"Found {len(customer_ids)} unique customer IDs")
         return customer_ids
 
-    except UnicodeDecodeError:
-        # Try with different encoding
-        try:
-            df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='latin-1')
-            df.columns = df.columns.str.strip().str.lower()
-            customer_ids = df['customer_id'].astype(str).str.strip().unique().tolist()
-            logger.info(f"Found {len(customer_ids)} unique customer IDs (latin-1 encoding)")
-            return customer_ids
-        except Exception as e:
-            logger.error(f"Error getting customer IDs with multiple encodings: {str(e)}")
-            raise
     except Exception as e:
         logger.error(f"Error getting customer IDs: {str(e)}")
         raise
@@ -273,208 +279,106 @@ def validate_customer_exists(customer_id: str) -> bool:
         True if customer exists, False otherwise
     """
     try:
-        if not os.path.exists(CUSTOMER_DATA_PATH):
-            return False
+        exists = get_storage_backend().has_customer(customer_id)
+        events.debug('customer_exists', customer_id=customer_id, exists=exists)
+        return exists
 
-        df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='utf-8')
+    except Exception as e:
+        logger.error(f"Error validating customer {customer_id}: {str(e)}")
+        return False
 
-        # Clean column names
-        df.columns = df.columns.str.strip().str.lower()
 
-        if 'customer_id' not in df.columns:
-            return False
+async def load_customer_data_async(customer_id: Optional[str] = None) -> CustomerRecord:
+    """load_customer_data for coroutines; the lookup runs on the bounded data executor."""
+    return await event_loop.run_blocking(load_customer_data, customer_id)
 
-        customer_id = str(customer_id).strip()
-        df['customer_id'] = df['customer_id'].astype(str).str.strip()
 
-        exists = customer_id in df['customer_id'].values
-        logger.debug(f"Customer {customer_id} exists: {exists}")
-        return exists
+async def load_customers_async(customer_ids: Iterable[str]) -> Dict[str, CustomerRecord]:
+    """load_customers for coroutines; the lookup runs on the bounded data executor."""
+    return await event_loop.run_blocking(load_customers, list(customer_ids))
 
-    except UnicodeDecodeError:
-        # Try with different encoding
-        try:
-            df = pd.read_csv(CUSTOMER_DATA_PATH, encoding='latin-1')
-            df.columns = df.columns.str.strip().str.lower()
-            customer_id = str(customer_id).strip()
-            df['customer_id'] = df['customer_id'].astype(str).str.strip()
-            exists = customer_id in df['customer_id'].values
-            logger.debug(f"Customer {customer_id} exists: {exists} (latin-1 encoding)")
-            return exists
-        except Exception as e:
-            logger.error(f"Error validating customer {customer_id} with multiple encodings: {str(e)}")
-            return False
-    except Exception as e:
-        logger.error(f"Error validating customer {customer_id}: {str(e)}")
-        return False
+
+async def get_all_customer_ids_async() -> List[str]:
+    """get_all_customer_ids for coroutines; the lookup runs on the bounded data executor."""
+    return await event_loop.run_blocking(get_all_customer_ids)
 
 
-def validate_csv_structure(file_path: str = None) -> Dict[str, Any]:
+async def validate_customer_exists_async(customer_id: str) -> bool:
+    """validate_customer_exists for coroutines; the lookup runs on the bounded data executor."""
+    return await event_loop.run_blocking(validate_customer_exists, customer_id)
+
+
+def validate_csv_structure(file_path: str = None,
+                           block_size: Optional[int] = None,
+                           workers: Optional[int] = None,
+                           use_cache: bool = True) -> Dict[str, Any]:
     """
     Validate the structure of the CSV file and return information about it.
 
+    The file is streamed in blocks and checked on a process pool, so memory
+    use does not grow with file size. Results of unchanged blocks are reused
+    from the file's validation cache, so repeat checks only re-read the file
+    and revalidate what changed (an untouched file is not read at all).
+
     Args:
         file_path: Path to CSV file (defaults to CUSTOMER_DATA_PATH)
+        block_size: Approximate bytes per validation block (defaults to VALIDATION_BLOCK_BYTES)
+        workers: Number of worker processes (defaults to VALIDATION_WORKERS, 0 = CPU count)
+        use_cache: Reuse and update cached block results
 
     Returns:
-        Dictionary with validation results
+        Dictionary with validation results, per-column stats and throughput
     """
     if file_path is None:
-        file_path = CUSTOMER_DATA_PATH
-
-    validation_result = {
-        'valid': False,
-        'errors': [],
-        'warnings': [],
-        'info': {}
-    }
+        file_path = config.CUSTOMER_DATA_PATH
+    current = settings.get_settings()
+    if block_size is None:
+        block_size = current.VALIDATION_BLOCK_BYTES
+    if workers is None:
+        workers = current.VALIDATION_WORKERS or None
 
     try:
-        if not os.path.exists(file_path):
-            validation_result['errors'].append(f"File not found: {file_path}")
-            return validation_result
-
-        # Try to read with UTF-8 first
-        try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-        except UnicodeDecodeError:
-            df = pd.read_csv(file_path, encoding='latin-1')
-            validation_result['warnings'].append("File read with latin-1 encoding instead of UTF-8")
-
-        # Clean column names
-        df.columns = df.columns.str.strip().str.lower()
-
-        # Basic info
-        validation_result['info']['total_rows'] = len(df)
-        validation_result['info']['total_columns'] = len(df.columns)
-        validation_result['info']['columns'] = list(df.columns)
-
-        # Check for required columns
-        required_columns = ['customer_id', 'name', 'loan_offer', 'interest_rate']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-
-        if missing_columns:
-            validation_result['errors'].append(f"Missing required columns: {missing_columns}")
-
-        # Check for empty data
-        if df.empty:
-            validation_result['errors'].append("CSV file is empty")
-
-        # Check for duplicate customer IDs
-        if 'customer_id' in df.columns:
-            duplicates = df['customer_id'].duplicated().sum()
-            if duplicates > 0:
-                validation_result['warnings'].append(f"Found {duplicates} duplicate customer IDs")
-
-        # Check for missing values in critical columns
-        for col in ['customer_id', 'name']:
-            if col in df.columns:
-                missing_count = df[col].isna().sum()
-                if missing_count > 0:
-                    validation_result['warnings'].append(f"Column '{col}' has {missing_count} missing values")
-
-        # Check for inconsistent data types in numeric columns
-        numeric_columns = ['loan_offer', 'interest_rate', 'tenure', 'emi_amount', 'processing_fee',
-                           'foreclosure_charges']
-        for col in numeric_columns:
-            if col in df.columns:
-                try:
-                    pd.to_numeric(df[col], errors='coerce')
-                except Exception:
-                    validation_result['warnings'].append(f"Column '{col}' contains non-numeric values")
-
-        validation_result['valid'] = len(validation_result['errors']) == 0
+        from util.csv_validation import stream_validate
+        validation_result = stream_validate(file_path, block_size, workers, use_cache=use_cache)
+        info = validation_result['info']
+        if 'rows_per_second' in info:
+            logger.info(f"Validated {info['total_rows']} rows in {info['elapsed_seconds']}s "
+                        f"({info['rows_per_second']} rows/s, {info['blocks_validated']} of "
+                        f"{info['blocks']} blocks checked)")
+        return validation_result
 
     except Exception as e:
-        validation_result['errors'].append(f"Error reading CSV file: {str(e)}")
-
-    return validation_result
+        return {
+            'valid': False,
+            'errors': [f"Error reading CSV file: {str(e)}"],
+            'warnings': [],
+            'info': {}
+        }
 
 
-def create_sample_csv(file_path: str = "sample_customer_data.csv") -> None:
+def create_sample_csv(file_path: str = "sample_customer_data.csv", rows: int = 5, seed: int = 42) -> None:
     """
-    Create a sample CSV file with customer data.
+    Create a sample CSV file with synthetic customer data.
+
+    Rows come from util.synthetic_data and cover every customer column; use
+    ``python -m util.synthetic_data`` for benchmark-sized portfolios.
 
     Args:
         file_path: Path where the sample CSV file will be created
+        rows: Number of customers
+        seed: Random seed
     """
-    sample_data = [
-        {
-            'customer_id': 'CUST001',
-            'name': 'John Doe',
-            'loan_offer': 500000,
-            'interest_rate': 10.5,
-            'tenure': 24,
-            'emi_amount': 23000,
-            'processing_fee': 2500,
-            'foreclosure_charges': 1000,
-            'offer_expiry': '2024-12-31',
-            'purpose': 'Home Renovation',
-            'application_link': 'https://example.com/apply/CUST001'
-        },
-        {
-            'customer_id': 'CUST002',
-            'name': 'Jane Smith',
-            'loan_offer': 750000,
-            'interest_rate': 9.8,
-            'tenure': 36,
-            'emi_amount': 24500,
-            'processing_fee': 3750,
-            'foreclosure_charges': 1500,
-            'offer_expiry': '2024-11-30',
-            'purpose': 'Business Expansion',
-            'application_link': 'https://example.com/apply/CUST002'
-        },
-        {
-            'customer_id': 'CUST003',
-            'name': 'Rajesh Kumar',
-            'loan_offer': 1000000,
-            'interest_rate': 11.2,
-            'tenure': 48,
-            'emi_amount': 26800,
-            'processing_fee': 5000,
-            'foreclosure_charges': 2000,
-            'offer_expiry': '2025-01-15',
-            'purpose': 'Education',
-            'application_link': 'https://example.com/apply/CUST003'
-        },
-        {
-            'customer_id': 'CUST004',
-            'name': 'Priya Sharma',
-            'loan_offer': 300000,
-            'interest_rate': 12.5,
-            'tenure': 18,
-            'emi_amount': 18500,
-            'processing_fee': 1500,
-            'foreclosure_charges': 750,
-            'offer_expiry': '2024-10-31',
-            'purpose': 'Personal',
-            'application_link': 'https://example.com/apply/CUST004'
-        },
-        {
-            'customer_id': 'CUST005',
-            'name': 'Mohammed Ali',
-            'loan_offer': 850000,
-            'interest_rate': 10.0,
-            'tenure': 30,
-            'emi_amount': 31200,
-            'processing_fee': 4250,
-            'foreclosure_charges': 1700,
-            'offer_expiry': '2025-02-28',
-            'purpose': 'Vehicle Purchase',
-            'application_link': 'https://example.com/apply/CUST005'
-        }
-    ]
-
     try:
-        df = pd.DataFrame(sample_data)
-        df.to_csv(file_path, index=False, encoding='utf-8')
+        from util import encoding
+        from util.synthetic_data import write_portfolio
+
+        write_portfolio(file_path, rows, seed=seed, workers=1)
         print(f"Sample CSV file created successfully at: {file_path}")
-        print(f"File contains {len(sample_data)} sample customer records")
+        print(f"File contains {rows} sample customer records")
 
         # Display the sample data
         print("\nSample data preview:")
-        print(df.to_string(index=False))
+        print(encoding.read_csv(file_path, nrows=10).to_string(index=False))
 
     except Exception as e:
         print(f"Error creating sample CSV file: {str(e)}")